@@ -182,5 +182,68 @@ CREATE TABLE IF NOT EXISTS PRODUCT_PERFORMANCE_FACT (
     FOREIGN KEY (DATE_KEY) REFERENCES DATE_DIM(DATE_KEY)
 );
 
+-- Product Recommendations Table (top-K co-purchased products per product)
+CREATE TABLE IF NOT EXISTS PRODUCT_RECOMMENDATIONS (
+    PRODUCT_ID NUMBER(10,0) NOT NULL,
+    RECOMMENDED_PRODUCT_ID NUMBER(10,0) NOT NULL,
+    RECOMMENDATION_RANK NUMBER(3,0) NOT NULL,
+    CO_OCCURRENCE_COUNT NUMBER(10,0) NOT NULL,
+    SUPPORT DECIMAL(10,8),
+    CONFIDENCE DECIMAL(10,8),
+    LIFT DECIMAL(12,4),
+    MODEL_RUN_DATE TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
+    PRIMARY KEY (PRODUCT_ID, RECOMMENDATION_RANK)
+)
+CLUSTER BY (PRODUCT_ID);
+
+-- Model Feature Importance Table (drivers per trained model version)
+CREATE TABLE IF NOT EXISTS MODEL_FEATURE_IMPORTANCE (
+    MODEL_NAME VARCHAR(50) NOT NULL,
+    MODEL_VERSION VARCHAR(64) NOT NULL,
+    FEATURE_NAME VARCHAR(100) NOT NULL,
+    PERMUTATION_IMPORTANCE FLOAT,
+    PERMUTATION_IMPORTANCE_STD FLOAT,
+    MEAN_ABS_SHAP FLOAT,
+    SAMPLE_SIZE NUMBER(10,0),
+    COMPUTED_AT TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
+    PRIMARY KEY (MODEL_NAME, MODEL_VERSION, FEATURE_NAME)
+);
+
+-- Model Registry Table (one row per model per training run)
+CREATE TABLE IF NOT EXISTS MODEL_REGISTRY (
+    REGISTRY_ID NUMBER(15,0) AUTOINCREMENT PRIMARY KEY,
+    RUN_ID VARCHAR(32) NOT NULL,
+    MODEL_NAME VARCHAR(50) NOT NULL,
+    MODEL_TYPE VARCHAR(100),
+    MODEL_VERSION VARCHAR(64),
+    STATUS VARCHAR(20) NOT NULL,
+    STARTED_AT TIMESTAMP_NTZ,
+    TRAINING_SECONDS FLOAT,
+    RUN_WALL_SECONDS FLOAT,
+    METRICS VARIANT,
+    ERROR_MESSAGE TEXT,
+    CREATED_DATE TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+);
+
+-- Sales Anomaly Alerts Table
+CREATE TABLE IF NOT EXISTS SALES_ANOMALY_ALERTS (
+    ALERT_ID NUMBER(15,0) AUTOINCREMENT PRIMARY KEY,
+    ALERT_DATE DATE NOT NULL UNIQUE,
+    ACTUAL_SALES NUMBER(15,2),
+    EXPECTED_SALES NUMBER(15,2),
+    Z_SCORE FLOAT,
+    DIRECTION VARCHAR(10),
+    SEVERITY VARCHAR(20),
+    DETECTED_AT TIMESTAMP_NTZ,
+    CREATED_DATE TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+);
+
+-- Sales Anomaly Detector State Table (one row per detector)
+CREATE TABLE IF NOT EXISTS SALES_ANOMALY_STATE (
+    DETECTOR_NAME VARCHAR(100) PRIMARY KEY,
+    STATE VARIANT NOT NULL,
+    UPDATED_AT TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP()
+);
+
 -- Note: Snowflake uses automatic clustering and micro-partitions for optimization
 -- No explicit indexes needed for regular tables
\ No newline at end of file
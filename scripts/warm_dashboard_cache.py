@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Dashboard Cache Warming Script
+Description: Pre-executes the dashboards' default-view queries into the shared disk cache after the nightly ETL
+Usage: python warm_dashboard_cache.py --cache-dir /mnt/dashboard-cache --ttl 21600
+"""
+
+import argparse
+import os
+import sys
+import logging
+import time
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+# Dashboards and their utilities live under streamlit/
+STREAMLIT_DIR = Path(__file__).parent.parent / 'streamlit'
+sys.path.append(str(STREAMLIT_DIR / 'utils'))
+sys.path.append(str(STREAMLIT_DIR / 'dashboards'))
+
+from disk_cache import DiskCache
+from query_cache import QueryCache, QueryLayer
+from snowflake_connection import SnowflakeConnectionPool
+from executive_dashboard import ExecutiveDashboard
+from sales_dashboard import SalesDashboard
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class WarmingQueryLayer(QueryLayer):
+    """Query layer that records failures the dashboard getters would otherwise only show on the page"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = []
+
+    def execute(self, sql, params=None):
+        try:
+            return super().execute(sql, params)
+        except Exception as e:
+            self.failures.append(str(e))
+            raise
+
+def warm_cache(cache_dir: str, ttl: int, single_scan: bool = False, cache_version: str = '',
+               as_of: Optional[date] = None) -> int:
+    """Run every default view for the day as_of (default today) once and report what was cached"""
+    layer = WarmingQueryLayer(
+        SnowflakeConnectionPool(max_size=2),
+        QueryCache(default_ttl=ttl),
+        DiskCache(cache_dir, default_ttl=ttl),
+        # Recent days only change with the next ETL run, so they keep the warmed TTL too
+        recent_ttl=ttl,
+        cache_version=cache_version
+    )
+
+    start = time.perf_counter()
+    views = {}
+    for name, dashboard in [('executive', ExecutiveDashboard(layer)), ('sales', SalesDashboard(layer))]:
+        kwargs = {'single_scan': single_scan, 'as_of': as_of} if name == 'sales' else {'as_of': as_of}
+        for view, result in dashboard.warm_default_views(**kwargs).items():
+            views[f'{name}.{view}'] = 0 if result is None else len(result)
+    layer.pool.close_all()
+
+    for view, rows in views.items():
+        logger.info(f"  {view}: {rows} rows")
+
+    if layer.failures:
+        for failure in layer.failures:
+            logger.error(f"❌ Query failed: {failure}")
+        return 1
+
+    stats = layer.cache.stats()
+    logger.info(f"✅ Warmed {stats['entries']} cached results in {time.perf_counter() - start:.1f}s")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the RetailWorks dashboard cache")
+    parser.add_argument(
+        "--cache-dir",
+        default=os.getenv('DASHBOARD_CACHE_DIR'),
+        help="Shared disk cache directory used by the dashboards (defaults to DASHBOARD_CACHE_DIR)"
+    )
+    parser.add_argument(
+        "--ttl",
+        type=int,
+        default=6 * 3600,
+        help="Seconds the warmed results stay valid; the data only changes with the next ETL run"
+    )
+    parser.add_argument(
+        "--single-scan",
+        action="store_true",
+        help="Also warm the combined query used when single-scan loading is switched on"
+    )
+    parser.add_argument(
+        "--cache-version",
+        default=os.getenv('DASHBOARD_CACHE_VERSION', ''),
+        help="Data version the dashboards key results by (defaults to DASHBOARD_CACHE_VERSION)"
+    )
+    parser.add_argument(
+        "--as-of",
+        type=date.fromisoformat,
+        default=None,
+        help="Day (YYYY-MM-DD) the default views are warmed for, defaults to today; "
+             "pass tomorrow's date when the job runs before midnight"
+    )
+
+    args = parser.parse_args()
+
+    if not args.cache_dir:
+        logger.error("❌ No cache directory: pass --cache-dir or set DASHBOARD_CACHE_DIR")
+        return 1
+
+    try:
+        return warm_cache(args.cache_dir, args.ttl, args.single_scan, args.cache_version, args.as_of)
+    except Exception as e:
+        logger.error(f"❌ Cache warming failed with error: {str(e)}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
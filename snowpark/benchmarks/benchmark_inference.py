@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Model Inference Benchmarks - Snowpark Application
+Description: Single-row latency, batch throughput and peak memory of the scoring paths
+Version: 1.0
+Date: 2026-10-18
+Usage: python benchmark_inference.py --batch-sizes 1 100 10000 1000000 --fail-on-regression
+"""
+
+import pandas as pd
+import numpy as np
+import sklearn
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LogisticRegression
+import argparse
+import joblib
+import json
+import logging
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Add src to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from ml_models import CustomerLifetimeValueModel, ChurnPredictionModel
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000, 1000000]
+DEFAULT_HISTORY_PATH = Path(__file__).parent / 'inference_history.json'
+
+# Artifact formats: (file suffix, save, load)
+ARTIFACT_FORMATS = {
+    'joblib': ('.pkl', lambda obj, path: joblib.dump(obj, path), joblib.load),
+    'joblib_compressed': ('.pkl.z', lambda obj, path: joblib.dump(obj, path, compress=3), joblib.load),
+    'pickle': (
+        '.pickle',
+        lambda obj, path: Path(path).write_bytes(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)),
+        lambda path: pickle.loads(Path(path).read_bytes())
+    )
+}
+
+
+def synthetic_features(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """Customer features shaped like prepare_clv_features / prepare_churn_features output"""
+    rng = np.random.default_rng(seed)
+    total_orders = rng.poisson(8, n_rows) + 1
+    avg_order_value = rng.lognormal(4.5, 0.6, n_rows)
+    lifespan = rng.integers(0, 1500, n_rows)
+    active_months = np.maximum(lifespan // 30, 1)
+    days_since_last_order = rng.exponential(60, n_rows).astype(int)
+    total_spent = total_orders * avg_order_value
+
+    return pd.DataFrame({
+        'customer_id': np.arange(n_rows),
+        'total_orders': total_orders,
+        'total_spent': total_spent,
+        'avg_order_value': avg_order_value,
+        'customer_lifespan_days': lifespan,
+        'categories_purchased': rng.integers(1, 12, n_rows),
+        'days_since_last_order': days_since_last_order,
+        'order_frequency': total_orders / (lifespan + 1),
+        'order_value_std': avg_order_value * rng.uniform(0.1, 0.8, n_rows),
+        'active_months': active_months,
+        'avg_monthly_spend': total_spent / active_months,
+        'annual_income': rng.normal(65000, 20000, n_rows).clip(10000),
+        'customer_type_encoded': rng.integers(0, 2, n_rows),
+        'segment_encoded': rng.integers(0, 4, n_rows),
+        'age_group_encoded': rng.integers(0, 6, n_rows),
+        'country_encoded': rng.integers(0, 20, n_rows),
+        'is_churned': (days_since_last_order > 90).astype(int)
+    })
+
+
+def build_clv_model(train_features: pd.DataFrame) -> CustomerLifetimeValueModel:
+    """CLV wrapper with the production scaler and forest settings"""
+    model = CustomerLifetimeValueModel(session=None)
+    X = model.scaler.fit_transform(train_features[model.FEATURE_COLUMNS])
+    model.model = RandomForestRegressor(**model.DEFAULT_PARAMS).fit(X, train_features['total_spent'])
+    return model
+
+
+def build_churn_model(train_features: pd.DataFrame) -> ChurnPredictionModel:
+    """Churn wrapper with the production scaler and classifier settings"""
+    model = ChurnPredictionModel(session=None)
+    X = model.scaler.fit_transform(train_features[model.FEATURE_COLUMNS])
+    model.model = LogisticRegression(**model.DEFAULT_PARAMS, max_iter=1000).fit(X, train_features['is_churned'])
+    return model
+
+
+# Model type -> (builder, scoring method)
+MODELS = {
+    'clv': (build_clv_model, 'predict_clv'),
+    'churn': (build_churn_model, 'predict_churn')
+}
+
+
+def _peak_memory_mb(fn: Callable) -> float:
+    """Peak Python/NumPy allocation of one call, in MB"""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024 ** 2
+
+
+def _timings(fn: Callable, repeats: int) -> np.ndarray:
+    """Wall-clock seconds of repeated calls"""
+    times = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - start
+    return times
+
+
+def benchmark_artifact(model_name: str, artifact_format: str, model, features: pd.DataFrame,
+                       batch_sizes: List[int], single_row_repeats: int, work_dir: str) -> Dict:
+    """Round-trip one model through an artifact format and measure its scoring path"""
+    suffix, save, load = ARTIFACT_FORMATS[artifact_format]
+    path = os.path.join(work_dir, f'{model_name}_model{suffix}')
+
+    save(model, path)
+    load_seconds = float(np.median(_timings(lambda: load(path), 3)))
+    predict = getattr(load(path), MODELS[model_name][1])
+
+    # Single-row latency: one customer scored per call, as in an online lookup
+    single_row = features.iloc[[0]]
+    predict(single_row)
+    latencies_ms = _timings(lambda: predict(single_row), single_row_repeats) * 1000
+
+    batches = []
+    for batch_size in batch_sizes:
+        batch = features.iloc[:batch_size]
+        # Keep small batches statistically stable without rerunning the large ones
+        repeats = int(np.clip(100000 // batch_size, 1, 20))
+        seconds = float(np.median(_timings(lambda: predict(batch), repeats)))
+        batches.append({
+            'batch_size': batch_size,
+            'seconds': seconds,
+            'rows_per_second': batch_size / seconds,
+            'peak_memory_mb': _peak_memory_mb(lambda: predict(batch))
+        })
+
+    return {
+        'model': model_name,
+        'artifact_format': artifact_format,
+        'artifact_bytes': os.path.getsize(path),
+        'load_seconds': load_seconds,
+        'latency_ms_p50': float(np.percentile(latencies_ms, 50)),
+        'latency_ms_p95': float(np.percentile(latencies_ms, 95)),
+        'latency_ms_p99': float(np.percentile(latencies_ms, 99)),
+        'batches': batches
+    }
+
+
+def _git_commit() -> Optional[str]:
+    """Current commit hash, when run from a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(batch_sizes: List[int], models: List[str], artifact_formats: List[str],
+                   train_rows: int = 20000, single_row_repeats: int = 200) -> Dict:
+    """Benchmark every (model, artifact format) pair and return one history record"""
+    features = synthetic_features(int(np.max(batch_sizes)))
+    train_features = synthetic_features(train_rows, seed=7)
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for model_name in models:
+            logger.info(f"Training {model_name} model on {train_rows} synthetic customers")
+            model = MODELS[model_name][0](train_features)
+
+            for artifact_format in artifact_formats:
+                logger.info(f"Benchmarking {model_name} ({artifact_format})")
+                results.append(benchmark_artifact(model_name, artifact_format, model, features,
+                                                  batch_sizes, single_row_repeats, work_dir))
+
+    return {
+        'run_time': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': _git_commit(),
+        'machine': {
+            'node': platform.node(),
+            'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__
+        },
+        'results': results
+    }
+
+
+def load_history(path: Path) -> List[Dict]:
+    """Previous benchmark runs, oldest first"""
+    if not path.exists():
+        return []
+    return json.loads(path.read_text())
+
+
+def append_history(run: Dict, path: Path) -> None:
+    """Add a run to the JSON history file"""
+    history = load_history(path)
+    history.append(run)
+    path.write_text(json.dumps(history, indent=2))
+
+
+def find_baseline(run: Dict, history: List[Dict]) -> Optional[Dict]:
+    """Most recent earlier run on the same hardware"""
+    same_machine = [
+        previous for previous in history
+        if previous['machine']['node'] == run['machine']['node']
+        and previous['machine']['cpu_count'] == run['machine']['cpu_count']
+    ]
+    return same_machine[-1] if same_machine else None
+
+
+def compare_runs(current: Dict, baseline: Dict, tolerance: float = 0.2) -> List[str]:
+    """Describe every metric that got worse than the baseline by more than the tolerance"""
+    previous = {(r['model'], r['artifact_format']): r for r in baseline['results']}
+    regressions = []
+
+    for result in current['results']:
+        key = (result['model'], result['artifact_format'])
+        if key not in previous:
+            continue
+        label = f"{key[0]}/{key[1]}"
+
+        old = previous[key]
+        if result['latency_ms_p50'] > old['latency_ms_p50'] * (1 + tolerance):
+            regressions.append(
+                f"{label} single-row p50 {old['latency_ms_p50']:.3f}ms -> {result['latency_ms_p50']:.3f}ms"
+            )
+
+        old_batches = {b['batch_size']: b for b in old['batches']}
+        for batch in result['batches']:
+            old_batch = old_batches.get(batch['batch_size'])
+            if old_batch is None:
+                continue
+            if batch['rows_per_second'] < old_batch['rows_per_second'] * (1 - tolerance):
+                regressions.append(
+                    f"{label} batch {batch['batch_size']} throughput "
+                    f"{old_batch['rows_per_second']:,.0f} -> {batch['rows_per_second']:,.0f} rows/s"
+                )
+            if batch['peak_memory_mb'] > old_batch['peak_memory_mb'] * (1 + tolerance):
+                regressions.append(
+                    f"{label} batch {batch['batch_size']} peak memory "
+                    f"{old_batch['peak_memory_mb']:.1f} -> {batch['peak_memory_mb']:.1f} MB"
+                )
+
+    return regressions
+
+
+def summary_table(run: Dict) -> pd.DataFrame:
+    """Flatten a run into one row per (model, format, batch size)"""
+    rows = []
+    for result in run['results']:
+        for batch in result['batches']:
+            rows.append({
+                'model': result['model'],
+                'format': result['artifact_format'],
+                'artifact_kb': result['artifact_bytes'] / 1024,
+                'load_ms': result['load_seconds'] * 1000,
+                'p50_ms': result['latency_ms_p50'],
+                'p99_ms': result['latency_ms_p99'],
+                'batch_size': batch['batch_size'],
+                'rows_per_s': batch['rows_per_second'],
+                'peak_mb': batch['peak_memory_mb']
+            })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ML model inference latency and throughput')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULT_BATCH_SIZES)
+    parser.add_argument('--models', nargs='+', choices=list(MODELS), default=list(MODELS))
+    parser.add_argument('--formats', nargs='+', choices=list(ARTIFACT_FORMATS), default=list(ARTIFACT_FORMATS))
+    parser.add_argument('--train-rows', type=int, default=20000)
+    parser.add_argument('--single-row-repeats', type=int, default=200)
+    parser.add_argument('--history', type=Path, default=DEFAULT_HISTORY_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Relative change that counts as a regression')
+    parser.add_argument('--no-save', action='store_true', help='Do not append this run to the history')
+    parser.add_argument('--fail-on-regression', action='store_true')
+
+    args = parser.parse_args()
+
+    run = run_benchmarks(args.batch_sizes, args.models, args.formats, args.train_rows, args.single_row_repeats)
+    print(summary_table(run).to_string(index=False, float_format=lambda v: f"{v:,.3f}"))
+
+    regressions = []
+    baseline = find_baseline(run, load_history(args.history))
+    if baseline is None:
+        logger.info("No earlier run on this machine to compare against")
+    else:
+        regressions = compare_runs(run, baseline, args.tolerance)
+        for regression in regressions:
+            logger.warning(f"Regression vs {baseline['run_time']}: {regression}")
+        if not regressions:
+            logger.info(f"No regressions vs {baseline['run_time']}")
+
+    if not args.no_save:
+        append_history(run, args.history)
+        logger.info(f"Appended run to {args.history}")
+
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,27 +8,124 @@ Date: 2025-07-19
 import pandas as pd
 import numpy as np
 from snowflake.snowpark import Session
-from snowflake.snowpark.functions import col, sum, avg, count, max, min, datediff, current_date
-from snowflake.ml.modeling.linear_model import LinearRegression
-from snowflake.ml.modeling.ensemble import RandomForestRegressor
-from snowflake.ml.modeling.metrics import mean_squared_error, r2_score
+from snowflake.snowpark.functions import col, current_timestamp, parse_json, when_matched, when_not_matched
+from snowflake.snowpark.types import PandasSeriesType, PandasDataFrameType, FloatType, IntegerType
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.ensemble import RandomForestRegressor as SklearnRandomForestRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline
+from scipy import sparse
+from joblib import Parallel, delayed
+from model_tuning import HyperparameterTuner
+from model_monitoring import RetrainingScheduler, refit_scaler, warm_start_fit
+from model_explainability import ExplainabilityJob
+from training_orchestrator import TrainingOrchestrator
 import joblib
+import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Tuple, Optional
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
+
+
+def _stream_chunks(frame, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Re-chunk a Snowpark DataFrame's result batches into lowercase pandas chunks of about chunk_size rows"""
+    buffer, buffered = [], 0
+    for batch in frame.to_pandas_batches():
+        buffer.append(batch.rename(columns=str.lower))
+        buffered += len(batch)
+        if buffered >= chunk_size:
+            yield pd.concat(buffer, ignore_index=True)
+            buffer, buffered = [], 0
+    if buffer:
+        yield pd.concat(buffer, ignore_index=True)
+
+
+# Shared training backend for the tree-based regression models
+REGRESSOR_BACKENDS = {
+    'random_forest': ('Random Forest', SklearnRandomForestRegressor),
+    'hist_gradient_boosting': ('Histogram Gradient Boosting', HistGradientBoostingRegressor)
+}
+
+BACKEND_PARAMS = {
+    'random_forest': {'n_estimators': 100, 'random_state': 42, 'n_jobs': -1},
+    'hist_gradient_boosting': {'max_iter': 200, 'learning_rate': 0.1, 'random_state': 42}
+}
+
+
+def _check_backend(backend: str) -> str:
+    """Validate a regression backend name"""
+    if backend not in REGRESSOR_BACKENDS:
+        raise ValueError(f"backend must be one of {list(REGRESSOR_BACKENDS)}")
+    return backend
+
+
+def _regressor_params(backend: str, model_params: Optional[Dict] = None) -> Dict:
+    """Backend defaults overridden by model params, dropping params the backend does not accept"""
+    accepted = REGRESSOR_BACKENDS[backend][1]().get_params()
+    ignored = sorted(set(model_params or {}) - set(accepted))
+    if ignored:
+        # e.g. forest params tuned before switching the model to gradient boosting
+        logging.getLogger(__name__).warning(f"Ignoring params not supported by {backend}: {', '.join(ignored)}")
+    params = {**BACKEND_PARAMS[backend], **(model_params or {})}
+    return {name: value for name, value in params.items() if name in accepted}
+
+
+def _make_regressor(backend: str, model_params: Optional[Dict] = None):
+    """Unfitted backend regressor"""
+    return REGRESSOR_BACKENDS[backend][1](**_regressor_params(backend, model_params))
+
+
+def _fit_regressor(backend: str, X, y, model_params: Optional[Dict] = None,
+                   warm_model=None) -> Tuple[object, float]:
+    """Fit a new backend regressor, or warm-start an existing one, and time it"""
+    start = time.perf_counter()
+    if warm_model is not None:
+        warm_start_fit(warm_model, X, y)
+        model = warm_model
+    else:
+        model = _make_regressor(backend, model_params).fit(X, y)
+    return model, time.perf_counter() - start
+
 
 class CustomerLifetimeValueModel:
     """Predict Customer Lifetime Value using historical purchase data"""
     
-    def __init__(self, session: Session):
+    FEATURE_COLUMNS = [
+        'total_orders', 'avg_order_value', 'customer_lifespan_days',
+        'categories_purchased', 'days_since_last_order', 'order_frequency',
+        'annual_income', 'customer_type_encoded', 'segment_encoded',
+        'age_group_encoded', 'country_encoded'
+    ]
+    
+    DEFAULT_PARAMS = dict(BACKEND_PARAMS['random_forest'])
+    
+    # Search space per backend, so tuned params always suit the backend they are trained with
+    PARAM_GRIDS = {
+        'random_forest': {
+            'n_estimators': [100, 200, 400],
+            'max_depth': [None, 10, 20],
+            'min_samples_leaf': [1, 5],
+            'max_features': ['sqrt', 1.0]
+        },
+        'hist_gradient_boosting': {
+            'max_iter': [100, 200, 400],
+            'learning_rate': [0.05, 0.1],
+            'max_depth': [None, 6, 12],
+            'min_samples_leaf': [10, 20]
+        }
+    }
+    
+    def __init__(self, session: Session, backend: str = 'random_forest'):
         self.session = session
         self.logger = logging.getLogger(__name__)
         self.model = None
         self.scaler = StandardScaler()
+        self.backend = _check_backend(backend)
         
     def prepare_clv_features(self) -> pd.DataFrame:
         """Prepare features for CLV prediction"""
@@ -92,16 +189,43 @@ class CustomerLifetimeValueModel:
             self.logger.error(f"Error preparing CLV features: {str(e)}")
             raise
     
-    def train_clv_model(self, features_df: pd.DataFrame) -> Dict:
+    def tune_clv_model(self, features_df: pd.DataFrame, search: str = 'grid',
+                       n_iter: int = 20, n_splits: int = 5, n_jobs: int = -1) -> Dict:
+        """Search CLV model hyperparameters with k-fold cross-validation"""
+        try:
+            # Scaling lives inside the pipeline so each fold is scaled on its own training part
+            estimator = Pipeline([
+                ('scaler', StandardScaler()),
+                ('model', _make_regressor(self.backend, {'n_jobs': 1} if self.backend == 'random_forest' else None))
+            ])
+            tuner = HyperparameterTuner(
+                estimator,
+                {f'model__{name}': values for name, values in self.PARAM_GRIDS[self.backend].items()},
+                scoring='r2',
+                cv='kfold',
+                n_splits=n_splits,
+                search=search,
+                n_iter=n_iter,
+                n_jobs=n_jobs
+            )
+            
+            results = tuner.fit(features_df[self.FEATURE_COLUMNS], features_df['total_spent'])
+            results['best_params'] = {
+                name.split('__', 1)[1]: value for name, value in results['best_params'].items()
+            }
+            
+            self.logger.info(f"CLV model tuning completed. Best params: {results['best_params']}")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error tuning CLV model: {str(e)}")
+            raise
+    
+    def train_clv_model(self, features_df: pd.DataFrame, model_params: Optional[Dict] = None,
+                        warm_start: bool = False) -> Dict:
         """Train Customer Lifetime Value prediction model"""
         try:
-            # Define feature columns
-            feature_columns = [
-                'total_orders', 'avg_order_value', 'customer_lifespan_days',
-                'categories_purchased', 'days_since_last_order', 'order_frequency',
-                'annual_income', 'customer_type_encoded', 'segment_encoded',
-                'age_group_encoded', 'country_encoded'
-            ]
+            feature_columns = self.FEATURE_COLUMNS
             
             X = features_df[feature_columns]
             y = features_df['total_spent']  # Target: total spent (proxy for CLV)
@@ -109,13 +233,20 @@ class CustomerLifetimeValueModel:
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
             
-            # Scale features
-            X_train_scaled = self.scaler.fit_transform(X_train)
+            warm_model = self.model if warm_start else None
+            if warm_model is not None:
+                # Drifted inputs move the scaling too; trees grown on the old scaling are only kept if it holds
+                self.scaler, scaling_moved = refit_scaler(self.scaler, X_train)
+                if scaling_moved:
+                    self.logger.info("Feature scaling moved since the last training; refitting CLV model")
+                    warm_model = None
+            else:
+                self.scaler = StandardScaler().fit(X_train)
+            X_train_scaled = self.scaler.transform(X_train)
             X_test_scaled = self.scaler.transform(X_test)
             
-            # Train Random Forest model
-            self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.model.fit(X_train_scaled, y_train)
+            self.model, training_seconds = _fit_regressor(self.backend, X_train_scaled, y_train,
+                                                          model_params, warm_model)
             
             # Make predictions
             y_pred = self.model.predict(X_test_scaled)
@@ -124,40 +255,40 @@ class CustomerLifetimeValueModel:
             mse = mean_squared_error(y_test, y_pred)
             r2 = r2_score(y_test, y_pred)
             
-            # Feature importance
-            feature_importance = dict(zip(feature_columns, self.model.feature_importances_))
+            # Feature importance (impurity based; boosting exposes none)
+            importances = getattr(self.model, 'feature_importances_', None)
+            feature_importance = dict(zip(feature_columns, importances)) if importances is not None else None
             
             results = {
-                'model_type': 'Random Forest',
+                'model_type': REGRESSOR_BACKENDS[self.backend][0],
                 'mse': float(mse),
                 'r2_score': float(r2),
                 'feature_importance': feature_importance,
                 'train_samples': len(X_train),
                 'test_samples': len(X_test),
+                'training_seconds': training_seconds,
                 'training_time': datetime.now()
             }
             
-            self.logger.info(f"CLV model trained successfully. R² Score: {r2:.4f}")
+            self.logger.info(f"CLV model trained successfully in {training_seconds:.1f}s. R² Score: {r2:.4f}")
             return results
             
         except Exception as e:
             self.logger.error(f"Error training CLV model: {str(e)}")
             raise
     
+    def evaluate_clv_model(self, features_df: pd.DataFrame) -> float:
+        """R² of the trained model on the given customers"""
+        predictions = self.predict_clv(features_df)['predicted_clv']
+        return float(r2_score(features_df['total_spent'], predictions))
+    
     def predict_clv(self, customer_features: pd.DataFrame) -> pd.DataFrame:
         """Predict CLV for new customers"""
         try:
             if self.model is None:
                 raise ValueError("Model not trained. Call train_clv_model first.")
             
-            feature_columns = [
-                'total_orders', 'avg_order_value', 'customer_lifespan_days',
-                'categories_purchased', 'days_since_last_order', 'order_frequency',
-                'annual_income', 'customer_type_encoded', 'segment_encoded',
-                'age_group_encoded', 'country_encoded'
-            ]
-            
-            X = customer_features[feature_columns]
+            X = customer_features[self.FEATURE_COLUMNS]
             X_scaled = self.scaler.transform(X)
             
             predictions = self.model.predict(X_scaled)
@@ -176,6 +307,22 @@ class CustomerLifetimeValueModel:
 class ChurnPredictionModel:
     """Predict customer churn probability"""
     
+    FEATURE_COLUMNS = [
+        'total_orders', 'total_spent', 'avg_order_value', 'days_since_last_order',
+        'categories_purchased', 'order_value_std', 'active_months', 
+        'order_frequency', 'avg_monthly_spend', 'annual_income',
+        'customer_type_encoded', 'segment_encoded', 'age_group_encoded'
+    ]
+    
+    DEFAULT_PARAMS = {'random_state': 42, 'class_weight': 'balanced'}
+    
+    OUT_OF_CORE_PARAMS = {'loss': 'log_loss', 'alpha': 1e-4, 'random_state': 42}
+    
+    PARAM_GRID = {
+        'C': [0.01, 0.1, 1.0, 10.0],
+        'class_weight': ['balanced', None]
+    }
+    
     def __init__(self, session: Session):
         self.session = session
         self.logger = logging.getLogger(__name__)
@@ -238,15 +385,42 @@ class ChurnPredictionModel:
             self.logger.error(f"Error preparing churn features: {str(e)}")
             raise
     
-    def train_churn_model(self, features_df: pd.DataFrame) -> Dict:
+    def tune_churn_model(self, features_df: pd.DataFrame, search: str = 'grid',
+                         n_iter: int = 20, n_splits: int = 5, n_jobs: int = -1) -> Dict:
+        """Search churn model hyperparameters with stratified k-fold cross-validation"""
+        try:
+            estimator = Pipeline([
+                ('scaler', StandardScaler()),
+                ('model', LogisticRegression(random_state=42, max_iter=1000))
+            ])
+            tuner = HyperparameterTuner(
+                estimator,
+                {f'model__{name}': values for name, values in self.PARAM_GRID.items()},
+                scoring='roc_auc',
+                cv='stratified',
+                n_splits=n_splits,
+                search=search,
+                n_iter=n_iter,
+                n_jobs=n_jobs
+            )
+            
+            results = tuner.fit(features_df[self.FEATURE_COLUMNS], features_df['is_churned'])
+            results['best_params'] = {
+                name.split('__', 1)[1]: value for name, value in results['best_params'].items()
+            }
+            
+            self.logger.info(f"Churn model tuning completed. Best params: {results['best_params']}")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error tuning churn model: {str(e)}")
+            raise
+    
+    def train_churn_model(self, features_df: pd.DataFrame, model_params: Optional[Dict] = None,
+                          warm_start: bool = False) -> Dict:
         """Train churn prediction model"""
         try:
-            feature_columns = [
-                'total_orders', 'total_spent', 'avg_order_value', 'days_since_last_order',
-                'categories_purchased', 'order_value_std', 'active_months', 
-                'order_frequency', 'avg_monthly_spend', 'annual_income',
-                'customer_type_encoded', 'segment_encoded', 'age_group_encoded'
-            ]
+            feature_columns = self.FEATURE_COLUMNS
             
             X = features_df[feature_columns]
             y = features_df['is_churned']
@@ -258,13 +432,20 @@ class ChurnPredictionModel:
             # Split data
             X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
             
-            # Scale features
-            X_train_scaled = self.scaler.fit_transform(X_train)
-            X_test_scaled = self.scaler.transform(X_test)
-            
-            # Train Logistic Regression model
-            self.model = LogisticRegression(random_state=42, class_weight='balanced')
-            self.model.fit(X_train_scaled, y_train)
+            if warm_start and self.model is not None:
+                # Rescale on the new data and start the solver from the current coefficients
+                self.scaler, _ = refit_scaler(self.scaler, X_train)
+                X_train_scaled = self.scaler.transform(X_train)
+                X_test_scaled = self.scaler.transform(X_test)
+                warm_start_fit(self.model, X_train_scaled, y_train)
+            else:
+                # Scale features
+                X_train_scaled = self.scaler.fit_transform(X_train)
+                X_test_scaled = self.scaler.transform(X_test)
+                
+                # Train Logistic Regression model
+                self.model = LogisticRegression(**{**self.DEFAULT_PARAMS, **(model_params or {})})
+                self.model.fit(X_train_scaled, y_train)
             
             # Make predictions
             y_pred = self.model.predict(X_test_scaled)
@@ -298,79 +479,756 @@ class ChurnPredictionModel:
         except Exception as e:
             self.logger.error(f"Error training churn model: {str(e)}")
             raise
+    
+    def _streaming_features_sql(self, days_threshold: int, holdout_percent: int) -> str:
+        """Churn features computed fully in the warehouse so they can be streamed in chunks"""
+        # DENSE_RANK over the sorted labels reproduces LabelEncoder codes without a pass in pandas,
+        # and hashing CUSTOMER_ID gives a holdout split that is stable across runs
+        return f"""
+            SELECT 
+                c.CUSTOMER_ID,
+                COUNT(DISTINCT sf.ORDER_ID) as total_orders,
+                SUM(sf.LINE_TOTAL) as total_spent,
+                AVG(sf.LINE_TOTAL) as avg_order_value,
+                DATEDIFF('day', MAX(d.DATE_ACTUAL), CURRENT_DATE()) as days_since_last_order,
+                COUNT(DISTINCT p.CATEGORY_NAME) as categories_purchased,
+                COALESCE(STDDEV(sf.LINE_TOTAL), 0) as order_value_std,
+                COUNT(DISTINCT DATE_TRUNC('month', d.DATE_ACTUAL)) as active_months,
+                total_orders / active_months as order_frequency,
+                total_spent / active_months as avg_monthly_spend,
+                COALESCE(c.ANNUAL_INCOME, MEDIAN(c.ANNUAL_INCOME) OVER ()) as annual_income,
+                DENSE_RANK() OVER (ORDER BY COALESCE(c.CUSTOMER_TYPE, 'Unknown')) - 1 as customer_type_encoded,
+                DENSE_RANK() OVER (ORDER BY COALESCE(c.SEGMENT_NAME, 'Unknown')) - 1 as segment_encoded,
+                DENSE_RANK() OVER (ORDER BY COALESCE(c.AGE_GROUP, 'Unknown')) - 1 as age_group_encoded,
+                IFF(days_since_last_order > {days_threshold}, 1, 0) as is_churned,
+                MOD(ABS(HASH(c.CUSTOMER_ID)), 100) < {holdout_percent} as is_holdout
+            FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.CUSTOMER_DIM c
+            LEFT JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf ON c.CUSTOMER_KEY = sf.CUSTOMER_KEY
+            LEFT JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
+            LEFT JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.PRODUCT_DIM p ON sf.PRODUCT_KEY = p.PRODUCT_KEY
+            WHERE c.IS_CURRENT = TRUE
+            GROUP BY c.CUSTOMER_ID, c.CUSTOMER_TYPE, c.SEGMENT_NAME, c.ANNUAL_INCOME, c.AGE_GROUP
+            HAVING total_orders > 0
+        """
+    
+    def train_churn_model_out_of_core(self, days_threshold: int = 90, holdout_percent: int = 20,
+                                      n_epochs: int = 5, chunk_size: int = 100000,
+                                      model_params: Optional[Dict] = None) -> Dict:
+        """Train churn model with SGD over chunked fetches, never holding all customers in memory"""
+        try:
+            features_sql = self._streaming_features_sql(days_threshold, holdout_percent)
+            
+            # Class balance of the training split from a single aggregate query
+            counts = self.session.sql(f"""
+                SELECT 
+                    COUNT(*) as n_train,
+                    SUM(is_churned) as n_train_churned
+                FROM ({features_sql})
+                WHERE NOT is_holdout
+            """).to_pandas().rename(columns=str.lower).iloc[0]
+            n_train, n_churned = int(counts['n_train']), int(counts['n_train_churned'])
+            if n_churned == 0 or n_churned == n_train:
+                raise ValueError("Training split needs both churned and active customers")
+            
+            # Same weighting as class_weight='balanced'
+            class_weight = {0: n_train / (2 * (n_train - n_churned)), 1: n_train / (2 * n_churned)}
+            churn_rate = n_churned / n_train
+            self.logger.info(f"Churn rate in training split: {churn_rate:.2%}")
+            
+            # Materialize once; every pass below streams the cached result
+            data = self.session.sql(features_sql).cache_result()
+            
+            def training_chunks():
+                for chunk in _stream_chunks(data, chunk_size):
+                    chunk = chunk[~chunk['is_holdout'].astype(bool)]
+                    if len(chunk):
+                        yield chunk[self.FEATURE_COLUMNS].to_numpy(dtype=float), chunk['is_churned'].to_numpy()
+            
+            # First pass: running mean/variance of the training features
+            self.scaler = StandardScaler()
+            for X_chunk, _ in training_chunks():
+                self.scaler.partial_fit(X_chunk)
+            
+            # SGD epochs over standardized chunks, shuffled within each chunk
+            self.model = SGDClassifier(
+                class_weight=class_weight, **{**self.OUT_OF_CORE_PARAMS, **(model_params or {})}
+            )
+            rng = np.random.default_rng(42)
+            classes = np.array([0, 1])
+            for _ in range(n_epochs):
+                for X_chunk, y_chunk in training_chunks():
+                    order = rng.permutation(len(y_chunk))
+                    self.model.partial_fit(self.scaler.transform(X_chunk[order]), y_chunk[order], classes=classes)
+            
+            # Score the hashed holdout chunk by chunk
+            y_test, y_pred_proba = [], []
+            for chunk in _stream_chunks(data, chunk_size):
+                chunk = chunk[chunk['is_holdout'].astype(bool)]
+                if len(chunk):
+                    X_scaled = self.scaler.transform(chunk[self.FEATURE_COLUMNS].to_numpy(dtype=float))
+                    y_test.append(chunk['is_churned'].to_numpy())
+                    y_pred_proba.append(self.model.predict_proba(X_scaled)[:, 1])
+            y_test, y_pred_proba = np.concatenate(y_test), np.concatenate(y_pred_proba)
+            y_pred = (y_pred_proba >= 0.5).astype(int)
+            
+            # Calculate metrics
+            from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+            
+            auc = roc_auc_score(y_test, y_pred_proba)
+            
+            results = {
+                'model_type': 'SGD Logistic Regression (out-of-core)',
+                'accuracy': float(accuracy_score(y_test, y_pred)),
+                'precision': float(precision_score(y_test, y_pred, zero_division=0)),
+                'recall': float(recall_score(y_test, y_pred)),
+                'f1_score': float(f1_score(y_test, y_pred)),
+                'auc_score': float(auc),
+                'churn_rate': float(churn_rate),
+                'class_weight': class_weight,
+                'n_epochs': n_epochs,
+                'train_samples': n_train,
+                'test_samples': len(y_test),
+                'training_time': datetime.now()
+            }
+            
+            self.logger.info(f"Out-of-core churn model trained successfully. AUC: {auc:.4f}")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error training out-of-core churn model: {str(e)}")
+            raise
+    
+    def evaluate_churn_model(self, features_df: pd.DataFrame) -> float:
+        """ROC AUC of the trained model on the given customers"""
+        from sklearn.metrics import roc_auc_score
+        
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_churn_model first.")
+        
+        X_scaled = self.scaler.transform(features_df[self.FEATURE_COLUMNS])
+        return float(roc_auc_score(features_df['is_churned'], self.model.predict_proba(X_scaled)[:, 1]))
+    
+    def predict_churn(self, customer_features: pd.DataFrame) -> pd.DataFrame:
+        """Score churn probability for customers"""
+        try:
+            if self.model is None:
+                raise ValueError("Model not trained. Call train_churn_model first.")
+            
+            X_scaled = self.scaler.transform(customer_features[self.FEATURE_COLUMNS])
+            
+            result_df = customer_features.copy()
+            result_df['churn_probability'] = self.model.predict_proba(X_scaled)[:, 1]
+            
+            return result_df
+            
+        except Exception as e:
+            self.logger.error(f"Error predicting churn: {str(e)}")
+            raise
+
+
+class CustomerSegmentationModel:
+    """Segment customers on RFM features with mini-batch k-means"""
+    
+    RFM_COLUMNS = ['recency_days', 'log_frequency', 'log_monetary']
+    
+    DEFAULT_PARAMS = {'random_state': 42}
+    
+    UDF_NAME = 'ASSIGN_CUSTOMER_SEGMENT'
+    
+    def __init__(self, session: Session, chunk_size: int = 50000, n_epochs: int = 3):
+        self.session = session
+        self.logger = logging.getLogger(__name__)
+        self.model = None
+        self.scaler = StandardScaler()
+        self.segment_ids = None
+        self.chunk_size = chunk_size
+        self.n_epochs = n_epochs
+    
+    def _rfm_sql(self) -> str:
+        """RFM features per customer, with frequency and monetary value on a log scale"""
+        # All dimension versions are joined so history recorded against older SCD rows still counts
+        return """
+            SELECT 
+                c.CUSTOMER_ID,
+                GREATEST(DATEDIFF('day', MAX(d.DATE_ACTUAL), CURRENT_DATE()), 0) as recency_days,
+                LN(1 + COUNT(DISTINCT sf.ORDER_ID)) as log_frequency,
+                LN(1 + GREATEST(SUM(sf.LINE_TOTAL), 0)) as log_monetary
+            FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.CUSTOMER_DIM c
+            JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf ON c.CUSTOMER_KEY = sf.CUSTOMER_KEY
+            JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
+            GROUP BY c.CUSTOMER_ID
+        """
+    
+    def get_segments(self) -> pd.DataFrame:
+        """Load the segment catalogue ordered from lowest to highest revenue band"""
+        segments = self.session.sql("""
+            SELECT SEGMENT_ID, SEGMENT_NAME, MIN_ANNUAL_REVENUE
+            FROM RETAILWORKS_DB.CUSTOMERS_SCHEMA.CUSTOMER_SEGMENTS
+            ORDER BY MIN_ANNUAL_REVENUE, SEGMENT_ID
+        """).to_pandas().rename(columns=str.lower)
+        
+        if segments.empty:
+            raise ValueError("CUSTOMER_SEGMENTS is empty")
+        return segments
+    
+    def _stream_rfm(self, rfm) -> Iterator[np.ndarray]:
+        """Yield RFM feature chunks of about chunk_size rows from the warehouse result batches"""
+        for chunk in _stream_chunks(rfm, self.chunk_size):
+            yield np.nan_to_num(chunk[self.RFM_COLUMNS].to_numpy(dtype=float))
+    
+    def train_segmentation_model(self, n_clusters: Optional[int] = None,
+                                 model_params: Optional[Dict] = None) -> Dict:
+        """Fit mini-batch k-means over RFM features streamed from the warehouse"""
+        try:
+            segments = self.get_segments()
+            n_clusters = n_clusters or len(segments)
+            
+            # Materialize the aggregate once; every pass below streams it in chunks
+            rfm = self.session.sql(self._rfm_sql()).cache_result()
+            
+            # First pass: running mean and variance for standardization
+            self.scaler = StandardScaler()
+            n_customers = 0
+            for chunk in self._stream_rfm(rfm):
+                self.scaler.partial_fit(chunk)
+                n_customers += len(chunk)
+            
+            # Further passes: mini-batch k-means updates, one chunk in memory at a time
+            self.model = MiniBatchKMeans(n_clusters=n_clusters, **{**self.DEFAULT_PARAMS, **(model_params or {})})
+            for _ in range(self.n_epochs):
+                for chunk in self._stream_rfm(rfm):
+                    self.model.partial_fit(self.scaler.transform(chunk))
+            
+            # Clusters ranked by spend map onto segments ranked by revenue band
+            centers = self.scaler.inverse_transform(self.model.cluster_centers_)
+            cluster_rank = np.empty(n_clusters, dtype=int)
+            cluster_rank[np.argsort(centers[:, 2], kind='stable')] = np.arange(n_clusters)
+            segment_position = cluster_rank * len(segments) // n_clusters
+            self.segment_ids = segments['segment_id'].to_numpy()[segment_position]
+            
+            profiles = pd.DataFrame({
+                'segment_id': self.segment_ids,
+                'segment_name': segments['segment_name'].to_numpy()[segment_position],
+                'recency_days': centers[:, 0],
+                'frequency': np.expm1(centers[:, 1]),
+                'monetary': np.expm1(centers[:, 2])
+            }).sort_values('monetary').reset_index(drop=True)
+            
+            results = {
+                'model_type': 'MiniBatchKMeans',
+                'n_clusters': n_clusters,
+                'n_customers': n_customers,
+                'n_epochs': self.n_epochs,
+                'segment_profiles': profiles,
+                'training_time': datetime.now()
+            }
+            
+            self.logger.info(f"Segmentation model trained on {n_customers} customers with {n_clusters} clusters")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error training segmentation model: {str(e)}")
+            raise
+    
+    def _segment_assigner(self) -> Callable:
+        """Self-contained RFM -> SEGMENT_ID function that can be shipped to a UDF"""
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_segmentation_model first.")
+        
+        mean = self.scaler.mean_.copy()
+        scale = self.scaler.scale_.copy()
+        centers = self.model.cluster_centers_.copy()
+        segment_ids = self.segment_ids.copy()
+        
+        def assign(values: np.ndarray) -> np.ndarray:
+            scaled = (np.nan_to_num(np.asarray(values, dtype=float)) - mean) / scale
+            distances = ((scaled[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+            return segment_ids[distances.argmin(axis=1)]
+        
+        return assign
+    
+    def predict_segments(self, rfm_df: pd.DataFrame) -> pd.DataFrame:
+        """Assign segments to customers already loaded in memory"""
+        result_df = rfm_df.copy()
+        result_df['segment_id'] = self._segment_assigner()(rfm_df[self.RFM_COLUMNS].to_numpy())
+        return result_df
+    
+    def assign_segments(self) -> Dict:
+        """Score every customer in the warehouse with a vectorized UDF and write back SEGMENT_ID"""
+        try:
+            assign = self._segment_assigner()
+            
+            def assign_batch(rfm: pd.DataFrame) -> pd.Series:
+                return pd.Series(assign(rfm.to_numpy()))
+            
+            self.session.udf.register(
+                assign_batch,
+                name=self.UDF_NAME,
+                return_type=PandasSeriesType(IntegerType()),
+                input_types=[PandasDataFrameType([FloatType()] * len(self.RFM_COLUMNS))],
+                packages=['numpy', 'pandas'],
+                is_permanent=False,
+                replace=True
+            )
+            
+            features = ', '.join(column.upper() for column in self.RFM_COLUMNS)
+            updated = self.session.sql(f"""
+                UPDATE RETAILWORKS_DB.CUSTOMERS_SCHEMA.CUSTOMERS t
+                SET SEGMENT_ID = s.SEGMENT_ID,
+                    MODIFIED_DATE = CURRENT_TIMESTAMP()
+                FROM (
+                    SELECT CUSTOMER_ID, {self.UDF_NAME}({features}) as SEGMENT_ID
+                    FROM ({self._rfm_sql()})
+                ) s
+                WHERE t.CUSTOMER_ID = s.CUSTOMER_ID
+                  AND NOT EQUAL_NULL(t.SEGMENT_ID, s.SEGMENT_ID)
+            """).collect()
+            
+            customers_updated = int(updated[0][0]) if updated else 0
+            self.logger.info(f"Updated SEGMENT_ID for {customers_updated} customers")
+            return {'customers_updated': customers_updated, 'assignment_time': datetime.now()}
+            
+        except Exception as e:
+            self.logger.error(f"Error assigning customer segments: {str(e)}")
+            raise
+
+
+class ProductRecommendationModel:
+    """Item-to-item recommendations from products bought together in the same order"""
+    
+    TABLE_NAME = 'RETAILWORKS_DB.ANALYTICS_SCHEMA.PRODUCT_RECOMMENDATIONS'
+    
+    def __init__(self, session: Session, top_k: int = 10, min_co_occurrence: int = 2):
+        self.session = session
+        self.logger = logging.getLogger(__name__)
+        self.top_k = top_k
+        self.min_co_occurrence = min_co_occurrence
+        self.recommendations = None
+        self.lookup = {}
+    
+    def prepare_order_baskets(self) -> pd.DataFrame:
+        """One row per distinct (order, product) pair from SALES_FACT"""
+        try:
+            # Products are keyed by PRODUCT_ID so every SCD version counts as the same item
+            baskets = self.session.sql("""
+                SELECT DISTINCT
+                    sf.ORDER_ID,
+                    p.PRODUCT_ID
+                FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
+                JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.PRODUCT_DIM p ON sf.PRODUCT_KEY = p.PRODUCT_KEY
+            """).to_pandas().rename(columns=str.lower)
+            
+            self.logger.info(f"Prepared {len(baskets)} order lines for recommendations")
+            return baskets
+            
+        except Exception as e:
+            self.logger.error(f"Error preparing order baskets: {str(e)}")
+            raise
+    
+    def train_recommendation_model(self, baskets: pd.DataFrame) -> Dict:
+        """Count co-purchases with a sparse product x product matrix and keep the top-K neighbours"""
+        try:
+            order_codes, _ = pd.factorize(baskets['order_id'])
+            product_codes, product_ids = pd.factorize(baskets['product_id'])
+            n_orders, n_products = int(order_codes.max()) + 1, len(product_ids)
+            
+            # Binary order x product incidence; its Gram matrix holds the co-purchase counts
+            incidence = sparse.csr_matrix(
+                (np.ones(len(order_codes), dtype=np.float32), (order_codes, product_codes)),
+                shape=(n_orders, n_products)
+            )
+            incidence.data[:] = 1.0
+            co_occurrence = (incidence.T @ incidence).tocsr()
+            product_orders = co_occurrence.diagonal()
+            co_occurrence.setdiag(0)
+            co_occurrence.data[co_occurrence.data < self.min_co_occurrence] = 0
+            co_occurrence.eliminate_zeros()
+            
+            rows = np.repeat(np.arange(n_products), np.diff(co_occurrence.indptr))
+            cols = co_occurrence.indices
+            counts = co_occurrence.data.astype(float)
+            confidence = counts / product_orders[rows]
+            lift = confidence / (product_orders[cols] / n_orders)
+            
+            # Rank neighbours within each product by count, then lift, and keep the first K
+            order = np.lexsort((-lift, -counts, rows))
+            rows, cols, counts, confidence, lift = rows[order], cols[order], counts[order], confidence[order], lift[order]
+            rank = np.arange(len(rows)) - co_occurrence.indptr[rows] + 1
+            keep = rank <= self.top_k
+            
+            self.recommendations = pd.DataFrame({
+                'product_id': product_ids[rows[keep]],
+                'recommended_product_id': product_ids[cols[keep]],
+                'recommendation_rank': rank[keep],
+                'co_occurrence_count': counts[keep].astype(int),
+                'support': counts[keep] / n_orders,
+                'confidence': confidence[keep],
+                'lift': lift[keep]
+            })
+            self.lookup = {
+                product_id: group[['recommended_product_id', 'co_occurrence_count', 'lift']].to_dict('records')
+                for product_id, group in self.recommendations.groupby('product_id', sort=False)
+            }
+            
+            results = {
+                'model_type': 'ItemCooccurrence',
+                'n_orders': n_orders,
+                'n_products': n_products,
+                'n_recommendations': len(self.recommendations),
+                'products_with_recommendations': len(self.lookup),
+                'training_time': datetime.now()
+            }
+            
+            self.logger.info(
+                f"Recommendation model trained on {n_orders} orders. "
+                f"{len(self.lookup)} of {n_products} products have recommendations"
+            )
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error training recommendation model: {str(e)}")
+            raise
+    
+    def recommend(self, product_id: int, k: Optional[int] = None) -> List[Dict]:
+        """Products most frequently bought with the given product"""
+        if self.recommendations is None:
+            raise ValueError("Model not trained. Call train_recommendation_model first.")
+        return self.lookup.get(product_id, [])[:k or self.top_k]
+    
+    def save_recommendations(self) -> int:
+        """Replace the PRODUCT_RECOMMENDATIONS table contents with the current top-K lists"""
+        try:
+            if self.recommendations is None:
+                raise ValueError("Model not trained. Call train_recommendation_model first.")
+            
+            staged = self.recommendations.rename(columns=str.upper)
+            staged['MODEL_RUN_DATE'] = pd.Timestamp(datetime.now())
+            columns = ', '.join(staged.columns)
+            
+            # Stage then INSERT OVERWRITE so readers never see a half-written table
+            self.session.create_dataframe(staged).write.save_as_table(
+                'PRODUCT_RECOMMENDATIONS_STAGE', mode='overwrite', table_type='temporary'
+            )
+            self.session.sql(f"""
+                INSERT OVERWRITE INTO {self.TABLE_NAME} ({columns})
+                SELECT {columns} FROM PRODUCT_RECOMMENDATIONS_STAGE
+            """).collect()
+            
+            self.logger.info(f"Saved {len(staged)} product recommendations")
+            return len(staged)
+            
+        except Exception as e:
+            self.logger.error(f"Error saving product recommendations: {str(e)}")
+            raise
+
+
+# Autoregressive feature layout shared by the forecasting models
+FORECAST_LAGS = (1, 7)
+FORECAST_WINDOWS = (7, 30)
+CALENDAR_COLUMNS = ['day_of_week', 'month_number', 'quarter_number', 'is_weekend', 'is_holiday']
+LAG_COLUMNS = [f'sales_lag_{k}' for k in FORECAST_LAGS] + [f'sales_ma_{w}' for w in FORECAST_WINDOWS]
+FORECAST_FEATURE_COLUMNS = CALENDAR_COLUMNS + ['trend', 'month_sin', 'month_cos'] + LAG_COLUMNS
+FORECAST_REACH = int(np.max(FORECAST_LAGS + FORECAST_WINDOWS))
+
+
+def _calendar_block(calendar: pd.DataFrame, trend: np.ndarray) -> np.ndarray:
+    """Calendar, trend and seasonal columns of the forecast design matrix"""
+    month = calendar['month_number'].to_numpy(dtype=float)
+    return np.column_stack([
+        calendar[CALENDAR_COLUMNS].to_numpy(dtype=float),
+        trend,
+        np.sin(2 * np.pi * month / 12),
+        np.cos(2 * np.pi * month / 12)
+    ])
+
+
+def _lag_features(values: np.ndarray) -> np.ndarray:
+    """Lags and trailing moving averages built only from strictly earlier periods"""
+    n = len(values)
+    block = np.full((n, len(LAG_COLUMNS)), np.nan)
+    cumulative = np.concatenate([[0.0], np.cumsum(values)])
+    
+    for j, k in enumerate(FORECAST_LAGS):
+        block[k:, j] = values[:n - k]
+    for j, w in enumerate(FORECAST_WINDOWS, start=len(FORECAST_LAGS)):
+        block[w:, j] = (cumulative[w:n] - cumulative[:n - w]) / w
+    
+    return block
+
+
+def _origin_lag_features(history: np.ndarray) -> np.ndarray:
+    """Lag features of the first period after the end of the history"""
+    lags = [history[-k] for k in FORECAST_LAGS]
+    windows = [history[-w:].mean() for w in FORECAST_WINDOWS]
+    return np.array(lags + windows)
+
+
+def _single_row_predictor(model):
+    """Low-overhead predict function for one row at a time"""
+    trees = getattr(model, 'estimators_', None)
+    if trees is not None and all(hasattr(tree, 'tree_') for tree in trees):
+        # Averaging the trees directly skips the forest's per-call validation and job dispatch
+        def predict(row: np.ndarray) -> float:
+            row = np.ascontiguousarray(row, dtype=np.float32)
+            return float(np.mean([tree.predict(row, check_input=False)[0] for tree in trees]))
+        return predict
+    return lambda row: float(model.predict(row)[0])
+
+
+def _recursive_forecast(model, history: np.ndarray, calendar_block: np.ndarray) -> np.ndarray:
+    """Roll a one-step model forward, feeding each prediction back into the lag buffer"""
+    horizon = len(calendar_block)
+    n_calendar = calendar_block.shape[1]
+    
+    # Append-only buffer: the tail of the history followed by the predictions
+    buffer = np.empty(FORECAST_REACH + horizon)
+    buffer[:FORECAST_REACH] = history[-FORECAST_REACH:]
+    window_sums = [buffer[FORECAST_REACH - w:FORECAST_REACH].sum() for w in FORECAST_WINDOWS]
+    
+    X = np.empty((horizon, n_calendar + len(LAG_COLUMNS)))
+    X[:, :n_calendar] = calendar_block
+    predictions = np.empty(horizon)
+    predict = _single_row_predictor(model)
+    
+    for step in range(horizon):
+        position = FORECAST_REACH + step
+        row = X[step:step + 1]
+        for j, k in enumerate(FORECAST_LAGS):
+            row[0, n_calendar + j] = buffer[position - k]
+        for j, w in enumerate(FORECAST_WINDOWS):
+            row[0, n_calendar + len(FORECAST_LAGS) + j] = window_sums[j] / w
+        
+        prediction = predict(row)
+        predictions[step] = buffer[position] = prediction
+        
+        # Slide each window by one period in O(1)
+        for j, w in enumerate(FORECAST_WINDOWS):
+            window_sums[j] += prediction - buffer[position - w]
+    
+    return predictions
+
+
+def _direct_forecast(models: List, history: np.ndarray, calendar_block: np.ndarray) -> np.ndarray:
+    """Predict each horizon with its own model from the lag features known at the origin"""
+    origin = _origin_lag_features(history)
+    X = np.hstack([calendar_block, np.tile(origin, (len(calendar_block), 1))])
+    return np.array([models[h].predict(X[h:h + 1])[0] for h in range(len(calendar_block))])
+
+
+def _fit_series_batch(values: np.ndarray, history_block: np.ndarray, future_block: np.ndarray,
+                      backend: str, model_params: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """Fit and roll forward a recursive forecaster for each series (row) of a batch"""
+    horizon = len(future_block)
+    forecasts = np.empty((len(values), horizon))
+    variances = np.empty(len(values))
+    rows = np.arange(FORECAST_REACH, values.shape[1])
+    
+    for i, series in enumerate(values):
+        if len(rows) < 2 or not series[rows].any():
+            # Too short or inactive: carry the recent level forward
+            forecasts[i] = series[-FORECAST_REACH:].mean()
+            variances[i] = series[-FORECAST_REACH:].var()
+            continue
+        
+        X = np.hstack([history_block[rows], _lag_features(series)[rows]])
+        model = _fit_regressor(backend, X, series[rows], model_params)[0]
+        
+        # Out-of-bag residuals give an honest per-series error variance for MinT weights;
+        # boosting has no out-of-bag sample, so it falls back to in-sample residuals
+        fitted = getattr(model, 'oob_prediction_', None)
+        if fitted is None:
+            fitted = model.predict(X)
+        variances[i] = np.nanvar(series[rows] - fitted)
+        forecasts[i] = _recursive_forecast(model, series, future_block)
+    
+    return forecasts, variances
 
 
 class SalesForecastingModel:
     """Sales forecasting using time series analysis"""
     
-    def __init__(self, session: Session):
+    FEATURE_COLUMNS = [
+        'order_count', 'avg_order_value', 'unique_customers',
+        'day_of_week', 'month_number', 'quarter_number', 'is_weekend', 'is_holiday',
+        'sales_lag_1', 'sales_lag_7', 'sales_ma_7', 'sales_ma_30',
+        'trend', 'month_sin', 'month_cos'
+    ]
+    
+    DEFAULT_PARAMS = dict(BACKEND_PARAMS['random_forest'])
+    
+    PARAM_GRIDS = {
+        'random_forest': {
+            'n_estimators': [100, 200],
+            'max_depth': [None, 8, 16],
+            'min_samples_leaf': [1, 3, 7],
+            'max_features': ['sqrt', 1.0]
+        },
+        'hist_gradient_boosting': {
+            'max_iter': [100, 200],
+            'learning_rate': [0.05, 0.1],
+            'max_depth': [None, 4, 8],
+            'min_samples_leaf': [5, 10, 20]
+        }
+    }
+    
+    PERIOD_EXPRESSIONS = {
+        'daily': 'DATE_ACTUAL',
+        'weekly': "DATE_TRUNC('week', DATE_ACTUAL)",
+        'monthly': "DATE_TRUNC('month', DATE_ACTUAL)"
+    }
+    
+    PERIOD_OFFSETS = {
+        'daily': pd.DateOffset(days=1),
+        'weekly': pd.DateOffset(weeks=1),
+        'monthly': pd.DateOffset(months=1)
+    }
+    
+    def __init__(self, session: Session, backend: str = 'random_forest'):
         self.session = session
         self.logger = logging.getLogger(__name__)
         self.model = None
+        self.forecaster = None
+        self.backend = _check_backend(backend)
+        
+    def _period_expression(self, granularity: str) -> str:
+        """SQL expression that truncates DATE_ACTUAL to the requested granularity"""
+        if granularity not in self.PERIOD_EXPRESSIONS:
+            raise ValueError("Granularity must be 'daily', 'weekly', or 'monthly'")
+        return self.PERIOD_EXPRESSIONS[granularity]
+    
+    def _calendar_sql(self, granularity: str, date_filter: str) -> str:
+        """SELECT producing one DATE_DIM row per period, with calendar flags as shares of days"""
+        period = self._period_expression(granularity)
         
+        # Weekly/monthly periods take their labels from the first day and
+        # report weekend/holiday flags as the share of days in the period
+        return f"""
+            SELECT 
+                {period} as date_period,
+                MIN_BY(DAY_OF_WEEK, DATE_ACTUAL) as day_of_week,
+                MIN_BY(MONTH_NUMBER, DATE_ACTUAL) as month_number,
+                MIN_BY(QUARTER_NUMBER, DATE_ACTUAL) as quarter_number,
+                AVG(IFF(IS_WEEKEND, 1, 0)) as is_weekend,
+                AVG(IFF(IS_HOLIDAY, 1, 0)) as is_holiday
+            FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM
+            WHERE {date_filter}
+            GROUP BY {period}
+        """
+    
+    def get_calendar(self, start_date, end_date, granularity: str = 'daily') -> pd.DataFrame:
+        """Build one calendar row per period between two dates from DATE_DIM"""
+        try:
+            date_filter = (
+                f"DATE_ACTUAL BETWEEN '{pd.Timestamp(start_date).date()}' AND '{pd.Timestamp(end_date).date()}'"
+            )
+            calendar = self.session.sql(
+                self._calendar_sql(granularity, date_filter) + " ORDER BY date_period"
+            ).to_pandas().rename(columns=str.lower)
+            
+            calendar['date_period'] = pd.to_datetime(calendar['date_period'])
+            return calendar
+            
+        except Exception as e:
+            self.logger.error(f"Error building calendar: {str(e)}")
+            raise
+    
     def prepare_sales_time_series(self, granularity: str = 'daily') -> pd.DataFrame:
-        """Prepare sales time series data"""
+        """Prepare a gap-filled sales time series with one row per calendar period"""
         try:
-            if granularity == 'daily':
-                date_format = 'DATE_ACTUAL'
-            elif granularity == 'weekly':
-                date_format = 'DATE_TRUNC(\'week\', DATE_ACTUAL)'
-            elif granularity == 'monthly':
-                date_format = 'DATE_TRUNC(\'month\', DATE_ACTUAL)'
-            else:
-                raise ValueError("Granularity must be 'daily', 'weekly', or 'monthly'")
+            date_format = self._period_expression(granularity)
             
+            # Drive the series from DATE_DIM so periods without sales appear as zeros
+            calendar_sql = self._calendar_sql(
+                granularity,
+                "DATE_ACTUAL BETWEEN (SELECT first_day FROM bounds) AND (SELECT last_day FROM bounds)"
+            )
             sales_data = self.session.sql(f"""
+                WITH bounds AS (
+                    SELECT MIN(d.DATE_ACTUAL) as first_day, MAX(d.DATE_ACTUAL) as last_day
+                    FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
+                    JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
+                ),
+                calendar AS ({calendar_sql}),
+                period_sales AS (
+                    SELECT 
+                        {date_format} as date_period,
+                        SUM(sf.LINE_TOTAL) as total_sales,
+                        COUNT(DISTINCT sf.ORDER_ID) as order_count,
+                        AVG(sf.LINE_TOTAL) as avg_order_value,
+                        COUNT(DISTINCT sf.CUSTOMER_KEY) as unique_customers
+                    FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
+                    JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
+                    GROUP BY {date_format}
+                )
                 SELECT 
-                    {date_format} as date_period,
-                    SUM(sf.LINE_TOTAL) as total_sales,
-                    COUNT(DISTINCT sf.ORDER_ID) as order_count,
-                    AVG(sf.LINE_TOTAL) as avg_order_value,
-                    COUNT(DISTINCT sf.CUSTOMER_KEY) as unique_customers,
-                    d.DAY_OF_WEEK,
-                    d.MONTH_NUMBER,
-                    d.QUARTER_NUMBER,
-                    d.IS_WEEKEND,
-                    d.IS_HOLIDAY
-                FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
-                JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
-                GROUP BY {date_format}, d.DAY_OF_WEEK, d.MONTH_NUMBER, d.QUARTER_NUMBER, d.IS_WEEKEND, d.IS_HOLIDAY
-                ORDER BY date_period
-            """).to_pandas()
+                    c.date_period,
+                    COALESCE(s.total_sales, 0) as total_sales,
+                    COALESCE(s.order_count, 0) as order_count,
+                    COALESCE(s.avg_order_value, 0) as avg_order_value,
+                    COALESCE(s.unique_customers, 0) as unique_customers,
+                    c.day_of_week,
+                    c.month_number,
+                    c.quarter_number,
+                    c.is_weekend,
+                    c.is_holiday
+                FROM calendar c
+                LEFT JOIN period_sales s ON c.date_period = s.date_period
+                ORDER BY c.date_period
+            """).to_pandas().rename(columns=str.lower)
             
             # Convert to datetime
             sales_data['date_period'] = pd.to_datetime(sales_data['date_period'])
             
-            # Create lag features
-            sales_data['sales_lag_1'] = sales_data['total_sales'].shift(1)
-            sales_data['sales_lag_7'] = sales_data['total_sales'].shift(7)
-            sales_data['sales_ma_7'] = sales_data['total_sales'].rolling(window=7).mean()
-            sales_data['sales_ma_30'] = sales_data['total_sales'].rolling(window=30).mean()
+            # One row per period, so row offsets are period offsets
+            lag_block = _lag_features(sales_data['total_sales'].to_numpy(dtype=float))
+            sales_data[LAG_COLUMNS] = lag_block
             
             # Create trend features
-            sales_data['trend'] = range(len(sales_data))
+            sales_data['trend'] = np.arange(len(sales_data))
             sales_data['month_sin'] = np.sin(2 * np.pi * sales_data['month_number'] / 12)
             sales_data['month_cos'] = np.cos(2 * np.pi * sales_data['month_number'] / 12)
             
-            self.logger.info(f"Prepared {granularity} sales time series with {len(sales_data)} records")
+            self.logger.info(f"Prepared {granularity} sales time series with {len(sales_data)} periods")
             return sales_data
             
         except Exception as e:
             self.logger.error(f"Error preparing sales time series: {str(e)}")
             raise
     
-    def train_sales_forecast_model(self, sales_data: pd.DataFrame) -> Dict:
+    def tune_sales_forecast_model(self, sales_data: pd.DataFrame, search: str = 'grid',
+                                  n_iter: int = 20, n_splits: int = 5, n_jobs: int = -1) -> Dict:
+        """Search forecast model hyperparameters with time-series cross-validation"""
+        try:
+            sales_data_clean = sales_data.dropna()
+            
+            tuner = HyperparameterTuner(
+                _make_regressor(self.backend, {'n_jobs': 1} if self.backend == 'random_forest' else None),
+                self.PARAM_GRIDS[self.backend],
+                scoring='neg_root_mean_squared_error',
+                cv='timeseries',
+                n_splits=n_splits,
+                search=search,
+                n_iter=n_iter,
+                n_jobs=n_jobs
+            )
+            
+            results = tuner.fit(sales_data_clean[self.FEATURE_COLUMNS], sales_data_clean['total_sales'])
+            
+            self.logger.info(f"Sales forecast model tuning completed. Best params: {results['best_params']}")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error tuning sales forecast model: {str(e)}")
+            raise
+    
+    def train_sales_forecast_model(self, sales_data: pd.DataFrame, model_params: Optional[Dict] = None,
+                                   warm_start: bool = False) -> Dict:
         """Train sales forecasting model"""
         try:
             # Remove rows with NaN values (due to lag features)
             sales_data_clean = sales_data.dropna()
             
-            feature_columns = [
-                'order_count', 'avg_order_value', 'unique_customers',
-                'day_of_week', 'month_number', 'quarter_number', 'is_weekend', 'is_holiday',
-                'sales_lag_1', 'sales_lag_7', 'sales_ma_7', 'sales_ma_30',
-                'trend', 'month_sin', 'month_cos'
-            ]
+            feature_columns = self.FEATURE_COLUMNS
             
             X = sales_data_clean[feature_columns]
             y = sales_data_clean['total_sales']
@@ -380,9 +1238,8 @@ class SalesForecastingModel:
             X_train, X_test = X[:split_point], X[split_point:]
             y_train, y_test = y[:split_point], y[split_point:]
             
-            # Train Random Forest model
-            self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.model.fit(X_train, y_train)
+            self.model, training_seconds = _fit_regressor(self.backend, X_train, y_train, model_params,
+                                                          self.model if warm_start else None)
             
             # Make predictions
             y_pred = self.model.predict(X_test)
@@ -393,24 +1250,466 @@ class SalesForecastingModel:
             mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
             
             results = {
-                'model_type': 'Random Forest (Time Series)',
+                'model_type': f'{REGRESSOR_BACKENDS[self.backend][0]} (Time Series)',
                 'mse': float(mse),
                 'r2_score': float(r2),
                 'mape': float(mape),
                 'train_samples': len(X_train),
                 'test_samples': len(X_test),
+                'training_seconds': training_seconds,
                 'training_time': datetime.now()
             }
             
-            self.logger.info(f"Sales forecast model trained successfully. R² Score: {r2:.4f}, MAPE: {mape:.2f}%")
+            self.logger.info(
+                f"Sales forecast model trained successfully in {training_seconds:.1f}s. "
+                f"R² Score: {r2:.4f}, MAPE: {mape:.2f}%"
+            )
             return results
             
         except Exception as e:
             self.logger.error(f"Error training sales forecast model: {str(e)}")
             raise
+    
+    def evaluate_sales_forecast_model(self, sales_data: pd.DataFrame) -> float:
+        """R² of the trained model on the given periods"""
+        if self.model is None:
+            raise ValueError("Model not trained. Call train_sales_forecast_model first.")
+        
+        sales_data_clean = sales_data.dropna()
+        predictions = self.model.predict(sales_data_clean[self.FEATURE_COLUMNS])
+        return float(r2_score(sales_data_clean['total_sales'], predictions))
+
+    def fit_forecaster(self, sales_data: pd.DataFrame, granularity: str = 'daily',
+                       strategy: str = 'recursive', max_horizon: int = 30,
+                       model_params: Optional[Dict] = None) -> Dict:
+        """Fit an autoregressive model that only uses features known ahead of time"""
+        try:
+            if strategy not in ('recursive', 'direct'):
+                raise ValueError("Strategy must be 'recursive' or 'direct'")
+            
+            history = sales_data.sort_values('date_period')
+            values = history['total_sales'].to_numpy(dtype=float)
+            if len(values) <= FORECAST_REACH + (max_horizon - 1 if strategy == 'direct' else 0):
+                raise ValueError(f"Not enough {granularity} history to fit a {strategy} forecaster")
+            
+            calendar_block = _calendar_block(history, np.arange(len(values)))
+            lag_block = _lag_features(values)
+            
+            if strategy == 'recursive':
+                rows = np.arange(FORECAST_REACH, len(values))
+                X = np.hstack([calendar_block[rows], lag_block[rows]])
+                models = [_fit_regressor(self.backend, X, values[rows], model_params)[0]]
+            else:
+                # Model h sees the calendar of its target and the lags known h periods earlier
+                models = []
+                for h in range(1, max_horizon + 1):
+                    rows = np.arange(FORECAST_REACH + h - 1, len(values))
+                    X = np.hstack([calendar_block[rows], lag_block[rows - h + 1]])
+                    models.append(_fit_regressor(self.backend, X, values[rows], model_params)[0])
+            
+            self.forecaster = {
+                'models': models,
+                'strategy': strategy,
+                'granularity': granularity,
+                'max_horizon': max_horizon if strategy == 'direct' else None,
+                'history': values[-FORECAST_REACH:],
+                'last_period': history['date_period'].iloc[-1],
+                'next_trend': len(values)
+            }
+            
+            results = {
+                'model_type': f'{REGRESSOR_BACKENDS[self.backend][0]} ({strategy.title()} Forecaster)',
+                'strategy': strategy,
+                'granularity': granularity,
+                'models_fitted': len(models),
+                'train_samples': len(values) - FORECAST_REACH,
+                'training_time': datetime.now()
+            }
+            
+            self.logger.info(f"Fitted {strategy} {granularity} forecaster with {len(models)} model(s)")
+            return results
+            
+        except Exception as e:
+            self.logger.error(f"Error fitting forecaster: {str(e)}")
+            raise
+    
+    def forecast(self, horizon: int, granularity: str = 'daily', strategy: str = 'recursive') -> pd.DataFrame:
+        """Forecast total sales for the next `horizon` periods"""
+        try:
+            if horizon < 1:
+                raise ValueError("Horizon must be at least one period")
+            
+            fitted = self.forecaster
+            if (fitted is None or fitted['granularity'] != granularity or fitted['strategy'] != strategy
+                    or (strategy == 'direct' and fitted['max_horizon'] < horizon)):
+                sales_data = self.prepare_sales_time_series(granularity)
+                self.fit_forecaster(sales_data, granularity, strategy, max_horizon=horizon)
+                fitted = self.forecaster
+            
+            offset = self.PERIOD_OFFSETS[granularity]
+            first_period = fitted['last_period'] + offset
+            last_day = fitted['last_period'] + offset * (horizon + 1) - pd.Timedelta(days=1)
+            calendar = self.get_calendar(first_period, last_day, granularity).head(horizon)
+            if len(calendar) < horizon:
+                raise ValueError(f"DATE_DIM does not cover a {horizon}-period {granularity} horizon")
+            
+            trend = np.arange(fitted['next_trend'], fitted['next_trend'] + horizon)
+            calendar_block = _calendar_block(calendar, trend)
+            
+            if strategy == 'recursive':
+                predictions = _recursive_forecast(fitted['models'][0], fitted['history'], calendar_block)
+            else:
+                predictions = _direct_forecast(fitted['models'], fitted['history'], calendar_block)
+            
+            forecast_df = pd.DataFrame({
+                'date_period': calendar['date_period'].to_numpy(),
+                'horizon': np.arange(1, horizon + 1),
+                'predicted_sales': predictions
+            })
+            
+            self.logger.info(f"Forecast {horizon} {granularity} periods using the {strategy} strategy")
+            return forecast_df
+            
+        except Exception as e:
+            self.logger.error(f"Error forecasting sales: {str(e)}")
+            raise
 
 
-def main():
+class HierarchicalSalesForecastingModel(SalesForecastingModel):
+    """Coherent sales forecasts by category, territory and top product"""
+    
+    # Small per-series models; the series themselves are fitted in parallel
+    SERIES_PARAMS = {
+        'random_forest': {'n_estimators': 30, 'max_depth': 10, 'min_samples_leaf': 2, 'oob_score': True, 'n_jobs': 1},
+        'hist_gradient_boosting': {'max_iter': 50, 'max_depth': 6, 'min_samples_leaf': 5}
+    }
+    
+    LEVELS = ['total', 'category', 'territory', 'product', 'bottom']
+    
+    def prepare_hierarchical_series(self, granularity: str = 'daily', top_n_products: int = 50) -> pd.DataFrame:
+        """Fetch bottom-level (category, product, territory) sales in one grouped query"""
+        try:
+            period = self._period_expression(granularity)
+            
+            # Products outside the top N are pooled into one "Other" series per category
+            series_data = self.session.sql(f"""
+                WITH top_products AS (
+                    SELECT p.PRODUCT_NUMBER
+                    FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
+                    JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.PRODUCT_DIM p ON sf.PRODUCT_KEY = p.PRODUCT_KEY
+                    GROUP BY p.PRODUCT_NUMBER
+                    ORDER BY SUM(sf.LINE_TOTAL) DESC
+                    LIMIT {int(top_n_products)}
+                )
+                SELECT 
+                    {period} as date_period,
+                    COALESCE(p.CATEGORY_NAME, 'Uncategorized') as category_name,
+                    IFF(tp.PRODUCT_NUMBER IS NULL, 'OTHER', p.PRODUCT_NUMBER) as product_name,
+                    COALESCE(sr.TERRITORY_NAME, 'Unassigned') as territory_name,
+                    SUM(sf.LINE_TOTAL) as total_sales
+                FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
+                JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
+                JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.PRODUCT_DIM p ON sf.PRODUCT_KEY = p.PRODUCT_KEY
+                LEFT JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_REP_DIM sr ON sf.SALES_REP_KEY = sr.SALES_REP_KEY
+                LEFT JOIN top_products tp ON p.PRODUCT_NUMBER = tp.PRODUCT_NUMBER
+                GROUP BY 1, 2, 3, 4
+                ORDER BY date_period
+            """).to_pandas().rename(columns=str.lower)
+            
+            series_data['date_period'] = pd.to_datetime(series_data['date_period'])
+            
+            self.logger.info(f"Prepared {len(series_data)} {granularity} bottom-level sales records")
+            return series_data
+            
+        except Exception as e:
+            self.logger.error(f"Error preparing hierarchical series: {str(e)}")
+            raise
+    
+    def build_hierarchy(self, bottom: pd.DataFrame) -> Tuple[pd.DataFrame, sparse.csr_matrix]:
+        """Build the series index for every level and the summing matrix onto the bottom series"""
+        index_frames = []
+        row_blocks = []
+        n_rows = 0
+        
+        groupings = [
+            ('total', []),
+            ('category', ['category_name']),
+            ('territory', ['territory_name']),
+            ('product', ['category_name', 'product_name']),
+            ('bottom', ['category_name', 'product_name', 'territory_name'])
+        ]
+        
+        for level, keys in groupings:
+            if keys:
+                # Groups are numbered in order of first appearance, matching drop_duplicates
+                codes = bottom.groupby(keys, sort=False).ngroup().to_numpy()
+                level_index = bottom[keys].drop_duplicates().reset_index(drop=True)
+            else:
+                codes = np.zeros(len(bottom), dtype=int)
+                level_index = pd.DataFrame(index=[0])
+            level_index.insert(0, 'level', level)
+            
+            index_frames.append(level_index)
+            row_blocks.append(codes + n_rows)
+            n_rows += len(level_index)
+        
+        rows = np.concatenate(row_blocks)
+        cols = np.tile(np.arange(len(bottom)), len(groupings))
+        summing_matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n_rows, len(bottom)))
+        
+        series_index = pd.concat(index_frames, ignore_index=True)
+        return series_index[['level', 'category_name', 'territory_name', 'product_name']], summing_matrix
+    
+    def reconcile(self, base_forecasts: np.ndarray, summing_matrix: sparse.csr_matrix,
+                  method: str = 'mint', variances: Optional[np.ndarray] = None) -> np.ndarray:
+        """Make forecasts add up across levels (bottom-up or MinT with diagonal weights)"""
+        n_bottom = summing_matrix.shape[1]
+        
+        if method == 'bottom_up':
+            return summing_matrix @ base_forecasts[-n_bottom:]
+        if method != 'mint':
+            raise ValueError("Reconciliation method must be 'bottom_up' or 'mint'")
+        
+        # MinT-WLS: G = (S' W^-1 S)^-1 S' W^-1 with W = diag(base forecast error variances)
+        weights = 1.0 / np.maximum(variances, 1e-8 * np.max(variances) + 1e-12)
+        weighted_transpose = summing_matrix.T.multiply(weights).tocsr()
+        normal_matrix = (weighted_transpose @ summing_matrix).toarray()
+        bottom = np.linalg.solve(normal_matrix, weighted_transpose @ base_forecasts)
+        return summing_matrix @ bottom
+    
+    def forecast_hierarchy(self, horizon: int, granularity: str = 'daily', method: str = 'mint',
+                           top_n_products: int = 50, n_jobs: int = -1,
+                           model_params: Optional[Dict] = None) -> pd.DataFrame:
+        """Forecast every series of the hierarchy in parallel and reconcile the levels"""
+        try:
+            series_data = self.prepare_hierarchical_series(granularity, top_n_products)
+            
+            # Gap-fill every bottom series onto the full period calendar
+            calendar = self.get_calendar(series_data['date_period'].min(), series_data['date_period'].max(),
+                                         granularity)
+            keys = ['category_name', 'product_name', 'territory_name']
+            wide = series_data.pivot_table(index=keys, columns='date_period', values='total_sales',
+                                           aggfunc='sum', fill_value=0.0)
+            wide = wide.reindex(columns=calendar['date_period'], fill_value=0.0)
+            
+            series_index, summing_matrix = self.build_hierarchy(wide.index.to_frame(index=False))
+            values = summing_matrix @ wide.to_numpy(dtype=float)
+            
+            offset = self.PERIOD_OFFSETS[granularity]
+            last_period = calendar['date_period'].iloc[-1]
+            future_calendar = self.get_calendar(last_period + offset,
+                                                last_period + offset * (horizon + 1) - pd.Timedelta(days=1),
+                                                granularity).head(horizon)
+            if len(future_calendar) < horizon:
+                raise ValueError(f"DATE_DIM does not cover a {horizon}-period {granularity} horizon")
+            
+            history_block = _calendar_block(calendar, np.arange(len(calendar)))
+            future_block = _calendar_block(future_calendar, np.arange(len(calendar), len(calendar) + horizon))
+            
+            # Bottom-up only needs the bottom level; MinT needs base forecasts everywhere
+            targets = np.arange(len(values)) if method == 'mint' else np.arange(len(values) - wide.shape[0], len(values))
+            params = {**self.SERIES_PARAMS[self.backend], **(model_params or {})}
+            n_batches = int(np.minimum(len(targets), 4 * joblib.cpu_count()))
+            batches = [batch for batch in np.array_split(targets, n_batches) if len(batch)]
+            
+            outcomes = Parallel(n_jobs=n_jobs, backend='loky')(
+                delayed(_fit_series_batch)(values[batch], history_block, future_block, self.backend, params)
+                for batch in batches
+            )
+            
+            base_forecasts = np.full((len(values), horizon), np.nan)
+            variances = np.zeros(len(values))
+            for batch, (batch_forecasts, batch_variances) in zip(batches, outcomes):
+                base_forecasts[batch] = batch_forecasts
+                variances[batch] = batch_variances
+            
+            reconciled = self.reconcile(base_forecasts, summing_matrix, method, variances)
+            
+            forecast_df = series_index.loc[series_index.index.repeat(horizon)].reset_index(drop=True)
+            forecast_df['date_period'] = np.tile(future_calendar['date_period'].to_numpy(), len(values))
+            forecast_df['horizon'] = np.tile(np.arange(1, horizon + 1), len(values))
+            forecast_df['base_forecast'] = base_forecasts.ravel()
+            forecast_df['reconciled_forecast'] = np.asarray(reconciled).ravel()
+            
+            self.logger.info(
+                f"Forecast {len(values)} series ({len(targets)} fitted) for {horizon} {granularity} periods "
+                f"with {method} reconciliation"
+            )
+            return forecast_df
+            
+        except Exception as e:
+            self.logger.error(f"Error forecasting sales hierarchy: {str(e)}")
+            raise
+
+
+class SalesAnomalyDetector:
+    """Streaming robust anomaly detection over the daily revenue series"""
+    
+    ALERTS_TABLE = 'RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_ANOMALY_ALERTS'
+    STATE_TABLE = 'RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_ANOMALY_STATE'
+    
+    # E|r| of a normal residual is sigma * sqrt(2 / pi), so this turns a mean absolute deviation into sigma
+    MAD_TO_SIGMA = 1.2533
+    
+    def __init__(self, session: Session, alpha: float = 0.1, gamma: float = 0.15, beta: float = 0.05,
+                 threshold: float = 3.5, huber_k: float = 2.5, warmup_days: int = 28,
+                 detector_name: str = 'daily_revenue'):
+        self.session = session
+        self.logger = logging.getLogger(__name__)
+        self.detector_name = detector_name
+        self.alpha = alpha
+        self.gamma = gamma
+        self.beta = beta
+        self.threshold = threshold
+        self.huber_k = huber_k
+        self.warmup_days = warmup_days
+        self.state = {'level': None, 'scale': None, 'seasonal': np.zeros(7), 'n_observed': 0, 'last_date': None}
+    
+    def update(self, date, value: float) -> Dict:
+        """Score one new day against the current state, then fold it in; constant time and memory"""
+        state = self.state
+        weekday = pd.Timestamp(date).dayofweek
+        
+        if state['level'] is None:
+            state.update(level=value, scale=np.maximum(abs(value) * 0.1, 1.0), n_observed=1,
+                         last_date=pd.Timestamp(date))
+            return {'date_period': pd.Timestamp(date), 'actual_sales': value, 'expected_sales': value,
+                    'z_score': 0.0, 'is_anomaly': False}
+        
+        expected = state['level'] + state['seasonal'][weekday]
+        residual = value - expected
+        sigma = self.MAD_TO_SIGMA * state['scale']
+        z_score = residual / sigma
+        is_anomaly = state['n_observed'] >= self.warmup_days and abs(z_score) > self.threshold
+        
+        # Huber-clip the residual so an outlier cannot drag the level, season or scale with it
+        clipped = float(np.clip(residual, -self.huber_k * sigma, self.huber_k * sigma))
+        state['level'] += self.alpha * clipped
+        state['seasonal'][weekday] += self.gamma * (1 - self.alpha) * clipped
+        state['scale'] += self.beta * (abs(clipped) - state['scale'])
+        state['n_observed'] += 1
+        state['last_date'] = pd.Timestamp(date)
+        
+        return {'date_period': pd.Timestamp(date), 'actual_sales': value, 'expected_sales': expected,
+                'z_score': float(z_score), 'is_anomaly': bool(is_anomaly)}
+    
+    def detect(self, sales_data: pd.DataFrame) -> pd.DataFrame:
+        """Score the days after the last one already processed"""
+        try:
+            new_days = sales_data.sort_values('date_period')
+            if self.state['last_date'] is not None:
+                new_days = new_days[new_days['date_period'] > self.state['last_date']]
+            
+            scored = pd.DataFrame(
+                [self.update(d, float(v)) for d, v in zip(new_days['date_period'], new_days['total_sales'])],
+                columns=['date_period', 'actual_sales', 'expected_sales', 'z_score', 'is_anomaly']
+            )
+            scored['direction'] = np.where(scored['z_score'] < 0, 'DROP', 'SPIKE')
+            scored['severity'] = np.select(
+                [scored['z_score'].abs() > 2 * self.threshold, scored['z_score'].abs() > 1.5 * self.threshold],
+                ['CRITICAL', 'HIGH'],
+                default='MEDIUM'
+            )
+            
+            self.logger.info(f"Scored {len(scored)} new days, {int(scored['is_anomaly'].sum())} anomalies")
+            return scored
+            
+        except Exception as e:
+            self.logger.error(f"Error detecting sales anomalies: {str(e)}")
+            raise
+    
+    def save_alerts(self, scored: pd.DataFrame) -> int:
+        """Merge flagged days into the alerts table, one alert per day"""
+        try:
+            alerts = scored[scored['is_anomaly']].drop(columns='is_anomaly').rename(
+                columns={'date_period': 'alert_date'}
+            )
+            if alerts.empty:
+                return 0
+            
+            alerts = alerts.assign(alert_date=alerts['alert_date'].dt.date,
+                                   detected_at=pd.Timestamp(datetime.now())).rename(columns=str.upper)
+            
+            # Days scored again (e.g. after a failure before the state was saved) update their alert
+            # instead of adding a duplicate
+            source = self.session.create_dataframe(alerts)
+            target = self.session.table(self.ALERTS_TABLE)
+            target.merge(
+                source,
+                target['ALERT_DATE'] == source['ALERT_DATE'],
+                [
+                    when_matched().update({c: source[c] for c in alerts.columns if c != 'ALERT_DATE'}),
+                    when_not_matched().insert({c: source[c] for c in alerts.columns})
+                ]
+            )
+            
+            self.logger.info(f"Saved {len(alerts)} sales anomaly alerts")
+            return len(alerts)
+            
+        except Exception as e:
+            self.logger.error(f"Error saving sales anomaly alerts: {str(e)}")
+            raise
+    
+    def state_to_json(self) -> str:
+        """Serialize the detector state"""
+        state = self.state
+        return json.dumps({
+            'level': None if state['level'] is None else float(state['level']),
+            'scale': None if state['scale'] is None else float(state['scale']),
+            'seasonal': [float(v) for v in state['seasonal']],
+            'n_observed': int(state['n_observed']),
+            'last_date': None if state['last_date'] is None else state['last_date'].isoformat()
+        })
+    
+    def state_from_json(self, record: str) -> None:
+        """Restore the detector state from state_to_json output"""
+        state = json.loads(record)
+        state['seasonal'] = np.array(state['seasonal'], dtype=float)
+        state['last_date'] = None if state['last_date'] is None else pd.Timestamp(state['last_date'])
+        self.state = state
+    
+    def save_state(self) -> None:
+        """Persist the detector state in the warehouse so the next run only processes new days"""
+        try:
+            source = self.session.create_dataframe(
+                [[self.detector_name, self.state_to_json()]], schema=['DETECTOR_NAME', 'STATE']
+            ).select(col('DETECTOR_NAME'), parse_json(col('STATE')).alias('STATE'))
+            target = self.session.table(self.STATE_TABLE)
+            target.merge(
+                source,
+                target['DETECTOR_NAME'] == source['DETECTOR_NAME'],
+                [
+                    when_matched().update({'STATE': source['STATE'], 'UPDATED_AT': current_timestamp()}),
+                    when_not_matched().insert({
+                        'DETECTOR_NAME': source['DETECTOR_NAME'],
+                        'STATE': source['STATE'],
+                        'UPDATED_AT': current_timestamp()
+                    })
+                ]
+            )
+            
+        except Exception as e:
+            self.logger.error(f"Error saving sales anomaly detector state: {str(e)}")
+            raise
+    
+    def load_state(self) -> bool:
+        """Restore the persisted detector state if one exists"""
+        try:
+            rows = self.session.table(self.STATE_TABLE).filter(
+                col('DETECTOR_NAME') == self.detector_name
+            ).select(col('STATE')).collect()
+            if not rows:
+                return False
+            
+            self.state_from_json(rows[0]['STATE'])
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error loading sales anomaly detector state: {str(e)}")
+            raise
+
+
+def main(tune: bool = False):
     """Main function to train and evaluate ML models"""
     # Configure logging
     logging.basicConfig(level=logging.INFO)
@@ -432,32 +1731,105 @@ def main():
         
         print("Training ML Models for RetailWorks...")
         
-        # Train CLV Model
-        print("\n1. Training Customer Lifetime Value Model...")
-        clv_model = CustomerLifetimeValueModel(session)
-        clv_features = clv_model.prepare_clv_features()
-        clv_results = clv_model.train_clv_model(clv_features)
-        print(f"CLV Model Results: {clv_results}")
+        # Models are only retrained when features drift or holdout scores degrade
+        scheduler = RetrainingScheduler()
+        explainer = ExplainabilityJob()
         
-        # Train Churn Model
-        print("\n2. Training Customer Churn Prediction Model...")
+        clv_model = CustomerLifetimeValueModel(session)
         churn_model = ChurnPredictionModel(session)
-        churn_features = churn_model.prepare_churn_features()
-        churn_results = churn_model.train_churn_model(churn_features)
-        print(f"Churn Model Results: {churn_results}")
-        
-        # Train Sales Forecast Model
-        print("\n3. Training Sales Forecasting Model...")
         forecast_model = SalesForecastingModel(session)
-        sales_data = forecast_model.prepare_sales_time_series('daily')
-        forecast_results = forecast_model.train_sales_forecast_model(sales_data)
-        print(f"Forecast Model Results: {forecast_results}")
+        segmentation_model = CustomerSegmentationModel(session)
+        recommendation_model = ProductRecommendationModel(session)
+        
+        def fit_clv(clv_features):
+            clv_params = clv_model.tune_clv_model(clv_features)['best_params'] if tune else None
+            return scheduler.run(
+                'clv', clv_model, clv_features,
+                lambda df, warm_start: clv_model.train_clv_model(df, clv_params, warm_start),
+                clv_model.evaluate_clv_model, 'r2_score', date_column='last_order_date'
+            )
+        
+        def fit_churn(churn_features):
+            churn_params = churn_model.tune_churn_model(churn_features)['best_params'] if tune else None
+            # No date column: churn labels are defined by recency, so customers with orders after the
+            # last training are all active and give no holdout to score; churn retrains on drift only
+            return scheduler.run(
+                'churn', churn_model, churn_features,
+                lambda df, warm_start: churn_model.train_churn_model(df, churn_params, warm_start),
+                churn_model.evaluate_churn_model, 'auc_score'
+            )
+        
+        def fit_forecast(sales_data):
+            forecast_params = forecast_model.tune_sales_forecast_model(sales_data)['best_params'] if tune else None
+            return scheduler.run(
+                'sales_forecast', forecast_model, sales_data.dropna(),
+                lambda df, warm_start: forecast_model.train_sales_forecast_model(df, forecast_params, warm_start),
+                forecast_model.evaluate_sales_forecast_model, 'r2_score', date_column='date_period'
+            )
+        
+        def fit_segmentation():
+            results = segmentation_model.train_segmentation_model()
+            results.update(segmentation_model.assign_segments())
+            return results
+        
+        def fit_recommendations(order_baskets):
+            results = recommendation_model.train_recommendation_model(order_baskets)
+            results['rows_saved'] = recommendation_model.save_recommendations()
+            return results
+        
+        def explain_models(clv_features, churn_features, clv, churn):
+            # Model drivers for the dashboards; computed locally so the session stays free meanwhile
+            return [
+                explainer.explain(name, model, features, target, scoring, id_column='customer_id')
+                for name, model, features, target, scoring in [
+                    ('clv', clv_model, clv_features, 'total_spent', 'r2'),
+                    ('churn', churn_model, churn_features, 'is_churned', 'roc_auc')
+                ]
+            ]
+        
+        def publish_explanations(explanations):
+            for explanation in explanations:
+                explainer.publish(session, explanation)
+        
+        def detect_anomalies(sales_data):
+            detector = SalesAnomalyDetector(session)
+            detector.load_state()
+            scored = detector.detect(sales_data)
+            alerts_saved = detector.save_alerts(scored)
+            detector.save_state()
+            return {'days_scored': len(scored), 'alerts_saved': alerts_saved}
+        
+        def save_models(clv, churn, sales_forecast, segmentation):
+            joblib.dump(clv_model, 'clv_model.pkl')
+            joblib.dump(churn_model, 'churn_model.pkl')
+            joblib.dump(forecast_model, 'forecast_model.pkl')
+            joblib.dump(segmentation_model, 'segmentation_model.pkl')
+        
+        # Each fit starts as soon as its data is ready; tasks that query or write through the shared
+        # session run one at a time, while local fits overlap with them and with each other
+        orchestrator = TrainingOrchestrator(session)
+        orchestrator.add_task('clv_features', clv_model.prepare_clv_features, uses_session=True)
+        orchestrator.add_task('churn_features', churn_model.prepare_churn_features, uses_session=True)
+        orchestrator.add_task('sales_data', lambda: forecast_model.prepare_sales_time_series('daily'), uses_session=True)
+        orchestrator.add_task('order_baskets', recommendation_model.prepare_order_baskets, uses_session=True)
+        orchestrator.add_task('clv', fit_clv, ['clv_features'], model=clv_model)
+        orchestrator.add_task('churn', fit_churn, ['churn_features'], model=churn_model)
+        orchestrator.add_task('sales_forecast', fit_forecast, ['sales_data'], model=forecast_model)
+        orchestrator.add_task('segmentation', fit_segmentation, model=segmentation_model, uses_session=True)
+        orchestrator.add_task('recommendations', fit_recommendations, ['order_baskets'], uses_session=True)
+        orchestrator.add_task('sales_anomalies', detect_anomalies, ['sales_data'], uses_session=True)
+        orchestrator.add_task('explanations', explain_models, ['clv_features', 'churn_features', 'clv', 'churn'])
+        orchestrator.add_task('publish_explanations', publish_explanations, ['explanations'], uses_session=True)
+        orchestrator.add_task('save_models', save_models, ['clv', 'churn', 'sales_forecast', 'segmentation'])
+        
+        run = orchestrator.run()
+        orchestrator.write_registry(run)
+        print(run['report'][['task_name', 'status', 'seconds', 'error_message']].to_string(index=False))
+        print(f"Wall time: {run['wall_seconds']:.1f}s (sum of task times: {run['task_seconds']:.1f}s)")
         
-        # Save models
-        print("\n4. Saving trained models...")
-        joblib.dump(clv_model, 'clv_model.pkl')
-        joblib.dump(churn_model, 'churn_model.pkl')
-        joblib.dump(forecast_model, 'forecast_model.pkl')
+        failed = run['report'].loc[run['report']['status'] != 'succeeded', 'task_name'].tolist()
+        if failed:
+            raise RuntimeError(f"Training tasks did not complete: {', '.join(failed)}")
         
         print("All models trained and saved successfully!")
         
@@ -465,6 +1837,8 @@ def main():
         print(f"ML model training failed: {str(e)}")
         raise
     finally:
+        if 'explainer' in locals():
+            explainer.close()
         if 'session' in locals():
             session.close()
 
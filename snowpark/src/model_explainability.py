@@ -0,0 +1,188 @@
+"""
+Model Explainability - Snowpark Application
+Description: Cached permutation importance and SHAP values for trained ML models
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+from sklearn.inspection import permutation_importance
+from joblib import Parallel, delayed
+from concurrent.futures import Future, ThreadPoolExecutor
+import joblib
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+
+def _shap_chunk(estimator, background: np.ndarray, X_chunk: np.ndarray) -> np.ndarray:
+    """SHAP values of one chunk of rows; runs inside a pool worker"""
+    # Imported lazily so the rest of the job works when shap is not installed
+    import shap
+
+    if hasattr(estimator, 'estimators_') or hasattr(estimator, 'tree_'):
+        explainer = shap.TreeExplainer(estimator)
+        values = explainer.shap_values(X_chunk, check_additivity=False)
+    else:
+        explainer = shap.LinearExplainer(estimator, background)
+        values = explainer.shap_values(X_chunk)
+
+    # Classifiers report one set of values per class; keep the positive class
+    if isinstance(values, list):
+        values = values[-1]
+    values = np.asarray(values)
+    return values[..., -1] if values.ndim == 3 else values
+
+
+def shap_available() -> bool:
+    """Whether the optional shap package can be imported"""
+    try:
+        import shap  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ExplainabilityJob:
+    """Compute feature drivers for a model wrapper once per model version and cache them on disk"""
+
+    def __init__(self, cache_dir: str = 'explainability_cache', sample_size: int = 2000,
+                 n_repeats: int = 5, n_jobs: int = -1, random_state: int = 42):
+        self.cache_dir = cache_dir
+        self.sample_size = sample_size
+        self.n_repeats = n_repeats
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def model_version(model) -> str:
+        """Content hash of the fitted estimator and scaler of a model wrapper"""
+        return joblib.hash((model.model, getattr(model, 'scaler', None)))
+
+    def _cache_path(self, model_name: str, version: str) -> str:
+        """Cache file of one model version"""
+        return os.path.join(self.cache_dir, f'{model_name}_{version}.pkl')
+
+    def load_cached(self, model_name: str, model) -> Optional[Dict]:
+        """Cached explanation of the wrapper's current model version, if computed"""
+        path = self._cache_path(model_name, self.model_version(model))
+        return joblib.load(path) if os.path.exists(path) else None
+
+    def explain(self, model_name: str, model, features_df: pd.DataFrame, target_column: str,
+                scoring: str, id_column: Optional[str] = None) -> Dict:
+        """Permutation importance and SHAP values for a sample of rows, reusing the cache when possible"""
+        try:
+            if model.model is None:
+                raise ValueError(f"{model_name} model is not trained")
+
+            version = self.model_version(model)
+            path = self._cache_path(model_name, version)
+            if os.path.exists(path):
+                self.logger.info(f"Using cached explanation for {model_name} version {version}")
+                return joblib.load(path)
+
+            start = time.perf_counter()
+            feature_columns = model.FEATURE_COLUMNS
+            sample = features_df.sample(min(self.sample_size, len(features_df)), random_state=self.random_state)
+            X = sample[feature_columns].astype(float)
+            scaler = getattr(model, 'scaler', None)
+            if scaler is not None:
+                # Scalers fit on a DataFrame check feature names, so only those get the named columns
+                X = scaler.transform(X if hasattr(scaler, 'feature_names_in_') else X.to_numpy())
+            X = np.asarray(X, dtype=float)
+            y = sample[target_column].to_numpy()
+
+            # Permutation importance: repeats are spread across the process pool
+            permutation = permutation_importance(
+                model.model, X, y, scoring=scoring, n_repeats=self.n_repeats,
+                random_state=self.random_state, n_jobs=self.n_jobs
+            )
+            importance = pd.DataFrame({
+                'feature': feature_columns,
+                'permutation_importance': permutation.importances_mean,
+                'permutation_importance_std': permutation.importances_std
+            })
+
+            shap_values = None
+            if shap_available():
+                # SHAP values: row chunks are explained in parallel worker processes
+                background = X[:min(len(X), 100)]
+                chunks = np.array_split(X, max(1, min(len(X) // 250, os.cpu_count() or 1)))
+                values = np.vstack(Parallel(n_jobs=self.n_jobs, backend='loky')(
+                    delayed(_shap_chunk)(model.model, background, chunk) for chunk in chunks
+                ))
+                shap_values = pd.DataFrame(values, columns=feature_columns, index=sample.index)
+                if id_column is not None:
+                    shap_values.insert(0, id_column, sample[id_column].to_numpy())
+                importance['mean_abs_shap'] = np.abs(values).mean(axis=0)
+            else:
+                self.logger.warning("shap is not installed; caching permutation importance only")
+                importance['mean_abs_shap'] = np.nan
+
+            explanation = {
+                'model_name': model_name,
+                'model_version': version,
+                'scoring': scoring,
+                'sample_size': len(sample),
+                'feature_importance': importance.sort_values('permutation_importance', ascending=False)
+                                                .reset_index(drop=True),
+                'shap_values': shap_values,
+                'computation_seconds': time.perf_counter() - start,
+                'computed_at': datetime.now()
+            }
+
+            # Write then rename so readers never load a partial cache file
+            joblib.dump(explanation, path + '.tmp')
+            os.replace(path + '.tmp', path)
+
+            self.logger.info(
+                f"Explained {model_name} version {version} on {len(sample)} rows "
+                f"in {explanation['computation_seconds']:.1f}s"
+            )
+            return explanation
+
+        except Exception as e:
+            self.logger.error(f"Error explaining {model_name} model: {str(e)}")
+            raise
+
+    def submit(self, model_name: str, model, features_df: pd.DataFrame, target_column: str,
+               scoring: str, id_column: Optional[str] = None) -> Future:
+        """Run explain() in the background and return its future"""
+        return self._executor.submit(self.explain, model_name, model, features_df, target_column,
+                                     scoring, id_column)
+
+    def close(self) -> None:
+        """Wait for submitted explanations and stop the background worker"""
+        self._executor.shutdown(wait=True)
+
+    def publish(self, session, explanation: Dict) -> int:
+        """Append an explanation's feature importance to MODEL_FEATURE_IMPORTANCE once per model version"""
+        try:
+            table = 'RETAILWORKS_DB.ANALYTICS_SCHEMA.MODEL_FEATURE_IMPORTANCE'
+            existing = session.sql(f"""
+                SELECT COUNT(*) as row_count FROM {table}
+                WHERE MODEL_NAME = '{explanation['model_name']}'
+                  AND MODEL_VERSION = '{explanation['model_version']}'
+            """).collect()
+            if existing and existing[0][0] > 0:
+                return 0
+
+            rows = explanation['feature_importance'].rename(columns={'feature': 'feature_name'})
+            rows.insert(0, 'model_version', explanation['model_version'])
+            rows.insert(0, 'model_name', explanation['model_name'])
+            rows['sample_size'] = explanation['sample_size']
+            rows['computed_at'] = pd.Timestamp(explanation['computed_at'])
+
+            session.create_dataframe(rows.rename(columns=str.upper)).write.mode("append").save_as_table(table)
+            self.logger.info(f"Published {len(rows)} feature importances for {explanation['model_name']}")
+            return len(rows)
+
+        except Exception as e:
+            self.logger.error(f"Error publishing feature importance: {str(e)}")
+            raise
@@ -0,0 +1,243 @@
+"""
+Model Monitoring - Snowpark Application
+Description: Feature drift detection and drift-gated incremental retraining
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+from scipy.stats import ks_2samp
+from sklearn.preprocessing import StandardScaler
+import joblib
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+def population_stability_index(reference: np.ndarray, current: np.ndarray, bins: int = 10) -> float:
+    """PSI between two samples, binned on the reference deciles"""
+    reference = reference[~np.isnan(reference)]
+    current = current[~np.isnan(current)]
+    if len(reference) == 0 or len(current) == 0:
+        return 0.0
+
+    edges = np.unique(np.quantile(reference, np.linspace(0, 1, bins + 1)))
+    if len(edges) < 2:
+        # Constant reference: compare the share of values equal to it
+        ref_share = np.array([1.0, 0.0])
+        cur_equal = np.mean(current == edges[0])
+        cur_share = np.array([cur_equal, 1.0 - cur_equal])
+    else:
+        edges[0], edges[-1] = -np.inf, np.inf
+        ref_share = np.histogram(reference, edges)[0] / len(reference)
+        cur_share = np.histogram(current, edges)[0] / len(current)
+
+    # Floor empty bins so the log term stays finite
+    ref_share = np.clip(ref_share, 1e-4, None)
+    cur_share = np.clip(cur_share, 1e-4, None)
+    return float(np.sum((cur_share - ref_share) * np.log(cur_share / ref_share)))
+
+
+def warm_start_fit(estimator, X, y, extra_estimators: int = 50, max_estimators: int = 500) -> bool:
+    """
+    Continue training a fitted estimator when it supports warm start, else refit it
+
+    Ensembles grow by extra_estimators per call; once that would pass max_estimators the estimator is
+    refit from scratch at its current size instead, so repeated retrains cannot grow it without bound.
+    """
+    params = estimator.get_params() if hasattr(estimator, 'get_params') else {}
+    if 'warm_start' not in params:
+        estimator.fit(X, y)
+        return False
+
+    updates = {'warm_start': True}
+    size_param = None
+    if 'n_estimators' in params:
+        # Forests keep their trees and grow extra ones on the new data
+        size_param = 'n_estimators'
+    elif 'max_iter' in params and 'learning_rate' in params:
+        # Boosting continues from the current ensemble for more iterations
+        size_param = 'max_iter'
+
+    if size_param is not None:
+        size = params[size_param] + extra_estimators
+        if size > max_estimators:
+            estimator.set_params(**{'warm_start': False, size_param: min(params[size_param], max_estimators)})
+            estimator.fit(X, y)
+            return False
+        updates[size_param] = size
+
+    estimator.set_params(**updates)
+    estimator.fit(X, y)
+    return True
+
+
+def refit_scaler(scaler, X, tolerance: float = 0.05):
+    """
+    Refit a fitted StandardScaler on new data
+
+    Returns the new scaler and whether any feature's mean or scale moved by more than tolerance
+    (in units of the old scale), in which case models fit on the old scaling no longer line up with it.
+    """
+    refitted = StandardScaler().fit(X)
+    old_scale = np.where(scaler.scale_ > 0, scaler.scale_, 1.0)
+    mean_shift = np.abs(refitted.mean_ - scaler.mean_) / old_scale
+    scale_shift = np.abs(refitted.scale_ - scaler.scale_) / old_scale
+    moved = bool(np.max(mean_shift, initial=0.0) > tolerance or np.max(scale_shift, initial=0.0) > tolerance)
+    return refitted, moved
+
+
+class RetrainingScheduler:
+    """Retrain models only when features drift or holdout error degrades"""
+
+    def __init__(self, state_path: str = 'model_monitoring_state.pkl', psi_threshold: float = 0.2,
+                 ks_pvalue_threshold: float = 0.01, ks_statistic_threshold: float = 0.1,
+                 degradation_threshold: float = 0.1, min_new_rows: int = 30, sample_size: int = 5000):
+        self.state_path = state_path
+        self.psi_threshold = psi_threshold
+        self.ks_pvalue_threshold = ks_pvalue_threshold
+        self.ks_statistic_threshold = ks_statistic_threshold
+        self.degradation_threshold = degradation_threshold
+        self.min_new_rows = min_new_rows
+        self.sample_size = sample_size
+        self.logger = logging.getLogger(__name__)
+        self.state = joblib.load(state_path) if os.path.exists(state_path) else {}
+        # Models may be retrained concurrently by the training orchestrator; reentrant so
+        # record_training can hold it across its update and save()
+        self._lock = threading.RLock()
+
+    def save(self) -> None:
+        """Persist the training profiles"""
+        with self._lock:
+            joblib.dump(self.state, self.state_path + '.tmp')
+            os.replace(self.state_path + '.tmp', self.state_path)
+
+    def record_training(self, model_name: str, features_df: pd.DataFrame, feature_columns: List[str],
+                        score: float, higher_is_better: bool = True, estimator=None, scaler=None,
+                        watermark=None) -> None:
+        """Store the reference feature sample, baseline score and fitted objects of a training run"""
+        sample = features_df[feature_columns]
+        if len(sample) > self.sample_size:
+            sample = sample.sample(self.sample_size, random_state=42)
+
+        profile = {
+            'feature_columns': list(feature_columns),
+            'reference_sample': sample.to_numpy(dtype=float),
+            'baseline_score': float(score),
+            'higher_is_better': higher_is_better,
+            'estimator': estimator,
+            'scaler': scaler,
+            'watermark': watermark,
+            'trained_at': datetime.now()
+        }
+        # Held across the update and the save so a concurrent save() never pickles a changing dict
+        with self._lock:
+            self.state[model_name] = profile
+            self.save()
+
+    def feature_drift(self, model_name: str, features_df: pd.DataFrame) -> pd.DataFrame:
+        """PSI and two-sample KS test of every feature against the training reference"""
+        profile = self.state[model_name]
+        current = features_df[profile['feature_columns']].to_numpy(dtype=float)
+        if len(current) > self.sample_size:
+            current = current[np.random.default_rng(42).choice(len(current), self.sample_size, replace=False)]
+
+        rows = []
+        for j, feature in enumerate(profile['feature_columns']):
+            reference_values = profile['reference_sample'][:, j]
+            current_values = current[:, j]
+            ks = ks_2samp(reference_values[~np.isnan(reference_values)], current_values[~np.isnan(current_values)])
+            psi = population_stability_index(reference_values, current_values)
+
+            # Large samples make KS p-values tiny for trivial shifts, so require a material statistic too
+            drifted = psi > self.psi_threshold or (
+                ks.pvalue < self.ks_pvalue_threshold and ks.statistic > self.ks_statistic_threshold
+            )
+            rows.append({
+                'feature': feature,
+                'psi': psi,
+                'ks_statistic': float(ks.statistic),
+                'ks_pvalue': float(ks.pvalue),
+                'drifted': drifted
+            })
+
+        return pd.DataFrame(rows)
+
+    def should_retrain(self, model_name: str, features_df: pd.DataFrame,
+                       current_score: Optional[float] = None) -> Dict:
+        """Decide whether drift or degradation since the last training warrants a retrain"""
+        profile = self.state.get(model_name)
+        if profile is None:
+            return {'retrain': True, 'reasons': ['no previous training recorded'], 'drift': None}
+
+        reasons = []
+        drift = self.feature_drift(model_name, features_df)
+        drifted = drift.loc[drift['drifted'], 'feature'].tolist()
+        if drifted:
+            reasons.append(f"feature drift: {', '.join(drifted)}")
+
+        degradation = None
+        if current_score is not None:
+            baseline = profile['baseline_score']
+            change = (baseline - current_score) if profile['higher_is_better'] else (current_score - baseline)
+            degradation = change / max(abs(baseline), 1e-12)
+            if degradation > self.degradation_threshold:
+                reasons.append(f"holdout score degraded {degradation:.1%} ({baseline:.4f} -> {current_score:.4f})")
+
+        return {
+            'retrain': bool(reasons),
+            'reasons': reasons,
+            'drift': drift,
+            'degradation': degradation
+        }
+
+    def run(self, model_name: str, model, features_df: pd.DataFrame, train: Callable, evaluate: Callable,
+            score_key: str, higher_is_better: bool = True, date_column: Optional[str] = None) -> Dict:
+        """Retrain a model wrapper when needed, warm-starting from its last fitted estimator"""
+        try:
+            profile = self.state.get(model_name)
+            current_score = None
+
+            if profile is not None:
+                # Restore the last fitted estimator so it can be scored and warm-started
+                model.model = profile['estimator']
+                if profile['scaler'] is not None:
+                    model.scaler = profile['scaler']
+
+                # Score only rows newer than the last training; without a date column the rows the
+                # model was trained on cannot be told apart, so only drift can trigger a retrain
+                if date_column is not None and profile['watermark'] is not None:
+                    new_data = features_df[features_df[date_column] > profile['watermark']]
+                    if len(new_data) >= self.min_new_rows:
+                        current_score = float(evaluate(new_data))
+                    else:
+                        self.logger.info(
+                            f"Skipping {model_name} degradation check: {len(new_data)} new rows, "
+                            f"fewer than {self.min_new_rows}"
+                        )
+                else:
+                    self.logger.info(f"Skipping {model_name} degradation check: no date column or watermark")
+
+            decision = self.should_retrain(model_name, features_df, current_score)
+            if not decision['retrain']:
+                self.logger.info(f"Skipping {model_name} retraining: no drift or degradation detected")
+                return {'retrained': False, 'current_score': current_score, 'decision': decision}
+
+            self.logger.info(f"Retraining {model_name}: {'; '.join(decision['reasons'])}")
+            results = train(features_df, warm_start=profile is not None)
+
+            self.record_training(
+                model_name, features_df, model.FEATURE_COLUMNS, results[score_key], higher_is_better,
+                estimator=model.model, scaler=getattr(model, 'scaler', None),
+                watermark=features_df[date_column].max() if date_column is not None else None
+            )
+
+            results.update({'retrained': True, 'current_score': current_score, 'decision': decision})
+            return results
+
+        except Exception as e:
+            self.logger.error(f"Error in scheduled retraining of {model_name}: {str(e)}")
+            raise
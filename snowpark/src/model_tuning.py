@@ -0,0 +1,173 @@
+"""
+Model Tuning - Snowpark Application
+Description: Parallel hyperparameter search and cross-validation for ML models
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import (
+    KFold, StratifiedKFold, TimeSeriesSplit, ParameterGrid, ParameterSampler
+)
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+
+def _evaluate_fold(estimator, params: Dict, X: np.ndarray, y: np.ndarray,
+                   train_idx: np.ndarray, test_idx: np.ndarray, scoring: str) -> Tuple[float, float]:
+    """Fit one configuration on one fold and score it on the held-out part"""
+    model = clone(estimator).set_params(**params)
+
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - start
+
+    score = get_scorer(scoring)(model, X[test_idx], y[test_idx])
+    return float(score), fit_time
+
+
+class HyperparameterTuner:
+    """Grid or random search with k-fold cross-validation across a process pool"""
+
+    CV_STRATEGIES = ('kfold', 'stratified', 'timeseries')
+
+    def __init__(self, estimator, param_space: Dict, scoring: str,
+                 cv: str = 'kfold', n_splits: int = 5, search: str = 'grid',
+                 n_iter: int = 20, n_jobs: int = -1, prune_after: int = 1,
+                 prune_fraction: float = 0.5, random_state: int = 42):
+        if cv not in self.CV_STRATEGIES:
+            raise ValueError(f"cv must be one of {self.CV_STRATEGIES}")
+        if search not in ('grid', 'random'):
+            raise ValueError("search must be 'grid' or 'random'")
+
+        self.estimator = estimator
+        self.param_space = param_space
+        self.scoring = scoring
+        self.cv = cv
+        self.n_splits = n_splits
+        self.search = search
+        self.n_iter = n_iter
+        self.n_jobs = n_jobs
+        self.prune_after = prune_after
+        self.prune_fraction = prune_fraction
+        self.random_state = random_state
+        self.logger = logging.getLogger(__name__)
+        self.results_ = None
+
+    def _candidate_params(self) -> List[Dict]:
+        """Expand the parameter space into the list of configurations to evaluate"""
+        if self.search == 'grid':
+            return list(ParameterGrid(self.param_space))
+        return list(ParameterSampler(self.param_space, n_iter=self.n_iter,
+                                     random_state=self.random_state))
+
+    def _splitter(self):
+        """Build the cross-validation splitter for the configured strategy"""
+        if self.cv == 'timeseries':
+            # Folds always train on the past and validate on the future
+            return TimeSeriesSplit(n_splits=self.n_splits)
+        if self.cv == 'stratified':
+            return StratifiedKFold(n_splits=self.n_splits, shuffle=True,
+                                   random_state=self.random_state)
+        return KFold(n_splits=self.n_splits, shuffle=True, random_state=self.random_state)
+
+    def _run_round(self, parallel: Parallel, candidates: List[Dict], config_ids: List[int],
+                   folds: List[Tuple[np.ndarray, np.ndarray]], X: np.ndarray, y: np.ndarray,
+                   scores: Dict[int, List[float]], fit_times: Dict[int, List[float]]) -> None:
+        """Evaluate every (configuration, fold) pair of a round as independent pool tasks"""
+        tasks = [(config_id, fold) for config_id in config_ids for fold in folds]
+        outcomes = parallel(
+            delayed(_evaluate_fold)(self.estimator, candidates[config_id], X, y,
+                                    train_idx, test_idx, self.scoring)
+            for config_id, (train_idx, test_idx) in tasks
+        )
+
+        for (config_id, _), (score, fit_time) in zip(tasks, outcomes):
+            scores[config_id].append(score)
+            fit_times[config_id].append(fit_time)
+
+    def fit(self, X, y) -> Dict:
+        """Run the search and return the best configuration and the results table"""
+        try:
+            start = time.perf_counter()
+            X = np.asarray(X, dtype=float)
+            y = np.asarray(y)
+
+            candidates = self._candidate_params()
+            folds = list(self._splitter().split(X, y))
+            scores = {i: [] for i in range(len(candidates))}
+            fit_times = {i: [] for i in range(len(candidates))}
+            alive = list(range(len(candidates)))
+            pruned = set()
+
+            self.logger.info(
+                f"Evaluating {len(candidates)} configurations x {len(folds)} folds "
+                f"({self.search} search, {self.cv} CV)"
+            )
+
+            with Parallel(n_jobs=self.n_jobs, backend='loky') as parallel:
+                # First round: a few folds for every configuration
+                early_folds = folds[:self.prune_after] if self.prune_fraction > 0 else folds
+                self._run_round(parallel, candidates, alive, early_folds, X, y, scores, fit_times)
+
+                remaining_folds = folds[len(early_folds):]
+                if remaining_folds:
+                    # Terminate configurations in the bottom quantile before spending the rest
+                    running_means = np.array([np.mean(scores[i]) for i in alive])
+                    threshold = np.quantile(running_means, self.prune_fraction)
+                    pruned = {i for i, m in zip(alive, running_means) if m < threshold}
+                    alive = [i for i in alive if i not in pruned]
+
+                    self.logger.info(f"Pruned {len(pruned)} configurations after {len(early_folds)} folds")
+                    self._run_round(parallel, candidates, alive, remaining_folds, X, y, scores, fit_times)
+
+            rows = []
+            for i, params in enumerate(candidates):
+                row = {f'param_{name}': value for name, value in params.items()}
+                row.update({
+                    'params': params,
+                    'mean_score': float(np.mean(scores[i])),
+                    'std_score': float(np.std(scores[i])),
+                    'folds_completed': len(scores[i]),
+                    'mean_fit_time': float(np.mean(fit_times[i])),
+                    'status': 'pruned' if i in pruned else 'completed'
+                })
+                rows.append(row)
+
+            results_table = pd.DataFrame(rows)
+            # Only fully cross-validated configurations compete for the best rank
+            completed = results_table['status'] == 'completed'
+            results_table['rank'] = results_table['mean_score'].where(completed).rank(
+                ascending=False, method='min'
+            )
+            results_table = results_table.sort_values(['rank', 'mean_score'], ascending=[True, False],
+                                                      na_position='last').reset_index(drop=True)
+            self.results_ = results_table
+
+            best = results_table.iloc[0]
+            results = {
+                'best_params': best['params'],
+                'best_score': float(best['mean_score']),
+                'scoring': self.scoring,
+                'n_configs': len(candidates),
+                'n_pruned': len(pruned),
+                'n_splits': len(folds),
+                'results': results_table,
+                'tuning_seconds': time.perf_counter() - start,
+                'tuning_time': datetime.now()
+            }
+
+            self.logger.info(
+                f"Best {self.scoring}: {results['best_score']:.4f} with {results['best_params']}"
+            )
+            return results
+
+        except Exception as e:
+            self.logger.error(f"Error during hyperparameter search: {str(e)}")
+            raise
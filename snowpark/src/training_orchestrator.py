@@ -0,0 +1,209 @@
+"""
+Training Orchestrator - Snowpark Application
+Description: Dependency-graph runner for ML training with a model registry report
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import numpy as np
+from snowflake.snowpark import Session
+from snowflake.snowpark.functions import col, parse_json
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import joblib
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+def _scalar_metrics(output) -> Dict:
+    """JSON-friendly scalar entries of a task's results dict"""
+    if not isinstance(output, dict):
+        return {}
+
+    metrics = {}
+    for name, value in output.items():
+        if isinstance(value, (bool, np.bool_)):
+            metrics[name] = bool(value)
+        elif isinstance(value, (int, float, np.integer, np.floating)):
+            metrics[name] = float(value) if np.isfinite(value) else None
+        elif isinstance(value, str):
+            metrics[name] = value
+    return metrics
+
+
+class TrainingOrchestrator:
+    """
+    Run training tasks as a dependency graph, starting each one as soon as its inputs are ready
+
+    Snowpark sessions are not safe to share between threads, so tasks registered with
+    uses_session=True run one at a time; only tasks that work on local data overlap.
+    """
+
+    def __init__(self, session: Session, max_workers: int = 4,
+                 registry_table: str = 'RETAILWORKS_DB.ANALYTICS_SCHEMA.MODEL_REGISTRY'):
+        self.session = session
+        self.max_workers = max_workers
+        self.registry_table = registry_table
+        self.logger = logging.getLogger(__name__)
+        self.tasks = {}
+        self._session_lock = threading.Lock()
+
+    def add_task(self, name: str, fn: Callable, depends_on: Optional[List[str]] = None,
+                 model=None, uses_session: bool = False) -> 'TrainingOrchestrator':
+        """Register a task; fn receives the outputs of its dependencies as keyword arguments"""
+        if name in self.tasks:
+            raise ValueError(f"Task {name} is already registered")
+
+        self.tasks[name] = {'fn': fn, 'depends_on': list(depends_on or []), 'model': model,
+                            'uses_session': uses_session}
+        return self
+
+    def _check_graph(self) -> None:
+        """Reject unknown dependencies and cycles"""
+        for name, task in self.tasks.items():
+            unknown = [d for d in task['depends_on'] if d not in self.tasks]
+            if unknown:
+                raise ValueError(f"Task {name} depends on unknown tasks: {unknown}")
+
+        # Kahn's algorithm: every task must be reachable from the dependency-free ones
+        remaining = {name: len(task['depends_on']) for name, task in self.tasks.items()}
+        ready = [name for name, count in remaining.items() if count == 0]
+        visited = 0
+        while ready:
+            current = ready.pop()
+            visited += 1
+            for name, task in self.tasks.items():
+                if current in task['depends_on']:
+                    remaining[name] -= 1
+                    if remaining[name] == 0:
+                        ready.append(name)
+
+        if visited != len(self.tasks):
+            raise ValueError("Task graph contains a cycle")
+
+    def _run_task(self, name: str, inputs: Dict):
+        """Execute one task and time it"""
+        task = self.tasks[name]
+        if task['uses_session']:
+            # Wait for any other task using the session; the wait is not counted as task time
+            with self._session_lock:
+                started_at = datetime.now()
+                start = time.perf_counter()
+                output = task['fn'](**inputs)
+                return output, started_at, time.perf_counter() - start
+
+        started_at = datetime.now()
+        start = time.perf_counter()
+        output = task['fn'](**inputs)
+        return output, started_at, time.perf_counter() - start
+
+    def run(self) -> Dict:
+        """Execute the graph with independent tasks running concurrently"""
+        self._check_graph()
+        run_id = uuid.uuid4().hex
+        start = time.perf_counter()
+
+        outputs, rows = {}, {}
+        pending = dict(self.tasks)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                # Tasks downstream of a failure are skipped rather than run on missing inputs
+                for name, task in list(pending.items()):
+                    failed = [d for d in task['depends_on'] if rows.get(d, {}).get('status') in ('failed', 'skipped')]
+                    if failed:
+                        rows[name] = {'status': 'skipped', 'error_message': f"upstream failed: {', '.join(failed)}"}
+                        del pending[name]
+                        self.logger.warning(f"Skipping {name}: upstream {failed} failed")
+
+                for name, task in list(pending.items()):
+                    if all(d in outputs for d in task['depends_on']):
+                        inputs = {d: outputs[d] for d in task['depends_on']}
+                        running[pool.submit(self._run_task, name, inputs)] = name
+                        del pending[name]
+                        self.logger.info(f"Started {name}")
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        output, started_at, seconds = future.result()
+                        outputs[name] = output
+                        rows[name] = {'status': 'succeeded', 'started_at': started_at, 'seconds': seconds,
+                                      'metrics': _scalar_metrics(output)}
+                        self.logger.info(f"Finished {name} in {seconds:.1f}s")
+                    except Exception as e:
+                        rows[name] = {'status': 'failed', 'error_message': str(e)}
+                        self.logger.error(f"Task {name} failed: {str(e)}")
+
+        wall_seconds = time.perf_counter() - start
+        report = pd.DataFrame([
+            {
+                'task_name': name,
+                'model_name': name if self.tasks[name]['model'] is not None else None,
+                'status': row['status'],
+                'started_at': row.get('started_at'),
+                'seconds': row.get('seconds', np.nan),
+                'metrics': row.get('metrics', {}),
+                'error_message': row.get('error_message')
+            }
+            for name, row in rows.items()
+        ])
+
+        self.logger.info(
+            f"Training run {run_id} finished in {wall_seconds:.1f}s "
+            f"({report['seconds'].sum():.1f}s of task time)"
+        )
+        return {
+            'run_id': run_id,
+            'report': report,
+            'outputs': outputs,
+            'wall_seconds': wall_seconds,
+            'task_seconds': float(report['seconds'].sum()),
+            'run_time': datetime.now()
+        }
+
+    def write_registry(self, run: Dict) -> int:
+        """Append one MODEL_REGISTRY row per model task of a run"""
+        try:
+            report = run['report']
+            models = report[report['model_name'].notna()].copy()
+            if models.empty:
+                return 0
+
+            models['model_version'] = [
+                joblib.hash((self.tasks[name]['model'].model, getattr(self.tasks[name]['model'], 'scaler', None)))
+                if status == 'succeeded' else None
+                for name, status in zip(models['task_name'], models['status'])
+            ]
+            models['model_type'] = [metrics.get('model_type') for metrics in models['metrics']]
+            models['metrics'] = [json.dumps(metrics) for metrics in models['metrics']]
+            models['run_id'] = run['run_id']
+            models['run_wall_seconds'] = run['wall_seconds']
+
+            registry = models[[
+                'run_id', 'model_name', 'model_type', 'model_version', 'status', 'started_at',
+                'seconds', 'run_wall_seconds', 'metrics', 'error_message'
+            ]].rename(columns={'seconds': 'training_seconds'}).rename(columns=str.upper)
+
+            # Metrics land as VARIANT so the report can be queried by key
+            self.session.create_dataframe(registry).select(
+                *[col(c) for c in registry.columns if c != 'METRICS'],
+                parse_json(col('METRICS')).alias('METRICS')
+            ).write.mode("append").save_as_table(self.registry_table, column_order="name")
+
+            self.logger.info(f"Registered {len(registry)} models for run {run['run_id']}")
+            return len(registry)
+
+        except Exception as e:
+            self.logger.error(f"Error writing model registry: {str(e)}")
+            raise
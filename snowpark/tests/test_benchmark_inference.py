@@ -0,0 +1,48 @@
+"""
+Inference Benchmark Tests
+Description: Unit tests for the inference benchmark suite and regression checks
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pytest
+import sys
+import os
+
+# Add benchmarks to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+# Skip the module when Snowpark ML is not installed
+benchmark_inference = pytest.importorskip("benchmark_inference")
+
+class TestInferenceBenchmarks:
+    """Test benchmark records and regression detection"""
+
+    @pytest.fixture
+    def run(self):
+        """Run a minimal benchmark for both model types"""
+        return benchmark_inference.run_benchmarks([1, 50], ['clv', 'churn'], ['joblib'],
+                                                  train_rows=300, single_row_repeats=5)
+
+    def test_run_covers_every_model_and_batch(self, run):
+        """Test each model reports latency, throughput and memory per batch size"""
+        assert [r['model'] for r in run['results']] == ['clv', 'churn']
+        for result in run['results']:
+            assert result['artifact_bytes'] > 0
+            assert result['latency_ms_p50'] > 0
+            assert [b['batch_size'] for b in result['batches']] == [1, 50]
+            assert all(b['rows_per_second'] > 0 and b['peak_memory_mb'] > 0 for b in result['batches'])
+
+    def test_regressions_against_baseline(self, run, tmp_path):
+        """Test slower throughput is reported and an identical run is not"""
+        history = tmp_path / 'history.json'
+        benchmark_inference.append_history(run, history)
+        baseline = benchmark_inference.find_baseline(run, benchmark_inference.load_history(history))
+
+        assert benchmark_inference.compare_runs(run, baseline) == []
+
+        run['results'][0]['batches'][1]['rows_per_second'] /= 2
+        regressions = benchmark_inference.compare_runs(run, baseline)
+
+        assert len(regressions) == 1
+        assert 'clv/joblib batch 50 throughput' in regressions[0]
@@ -0,0 +1,434 @@
+"""
+ML Models Tests
+Description: Unit tests for the customer analytics and forecasting models
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from unittest.mock import MagicMock, Mock
+import sys
+import os
+
+# Add src to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# Skip the module when Snowpark ML is not installed
+ml_models = pytest.importorskip("ml_models")
+from ml_models import (
+    SalesForecastingModel, HierarchicalSalesForecastingModel, CustomerSegmentationModel,
+    ProductRecommendationModel, ChurnPredictionModel, CustomerLifetimeValueModel, SalesAnomalyDetector,
+    BACKEND_PARAMS
+)
+
+def make_calendar(dates: pd.DatetimeIndex) -> pd.DataFrame:
+    """Build a DATE_DIM-shaped daily calendar"""
+    return pd.DataFrame({
+        'date_period': dates,
+        'day_of_week': dates.dayofweek + 1,
+        'month_number': dates.month,
+        'quarter_number': dates.quarter,
+        'is_weekend': (dates.dayofweek >= 5).astype(float),
+        'is_holiday': 0.0
+    })
+
+class TestRegressionBackends:
+    """Test the shared random forest / gradient boosting training backend"""
+
+    @pytest.fixture
+    def clv_features(self):
+        """Create encoded customer features with spend driven by order count"""
+        rng = np.random.default_rng(2)
+        df = pd.DataFrame({column: rng.normal(size=500) for column in CustomerLifetimeValueModel.FEATURE_COLUMNS})
+        df['total_spent'] = 200 * df['total_orders'] + rng.normal(0, 20, 500)
+        return df
+
+    @pytest.mark.parametrize("backend,model_type", [
+        ("random_forest", "Random Forest"),
+        ("hist_gradient_boosting", "Histogram Gradient Boosting")
+    ])
+    def test_train_clv_with_backend(self, clv_features, backend, model_type):
+        """Test each backend trains, scores and reports its training time"""
+        model = CustomerLifetimeValueModel(Mock(), backend=backend)
+        results = model.train_clv_model(clv_features)
+
+        assert results['model_type'] == model_type
+        assert results['r2_score'] > 0.9
+        assert results['training_seconds'] > 0
+        assert (results['feature_importance'] is None) == (backend == 'hist_gradient_boosting')
+
+    def test_forest_uses_all_cores_and_warm_starts(self, clv_features):
+        """Test the forest backend is parallel and warm starts keep the existing trees"""
+        model = CustomerLifetimeValueModel(Mock())
+        model.train_clv_model(clv_features)
+        first_tree = model.model.estimators_[0]
+
+        model.train_clv_model(clv_features, warm_start=True)
+
+        assert model.model.n_jobs == -1
+        assert len(model.model.estimators_) == 150
+        assert model.model.estimators_[0] is first_tree
+
+    def test_forest_params_ignored_by_boosting(self, clv_features):
+        """Test params tuned for the forest do not break a model switched to gradient boosting"""
+        model = CustomerLifetimeValueModel(Mock(), backend='hist_gradient_boosting')
+        results = model.train_clv_model(clv_features, {'n_estimators': 400, 'max_depth': 6})
+
+        assert results['r2_score'] > 0.9
+        assert model.model.max_depth == 6
+        assert CustomerLifetimeValueModel.DEFAULT_PARAMS is not BACKEND_PARAMS['random_forest']
+
+    def test_unknown_backend(self):
+        """Test unknown backends are rejected"""
+        with pytest.raises(ValueError):
+            SalesForecastingModel(Mock(), backend='xgboost')
+
+class TestSalesForecasting:
+    """Test multi-horizon sales forecasting"""
+
+    @pytest.fixture
+    def daily_history(self):
+        """Create two years of daily sales with a weekly pattern"""
+        dates = pd.date_range('2024-01-01', '2025-12-31', freq='D')
+        history = make_calendar(dates)
+        rng = np.random.default_rng(7)
+        history['total_sales'] = 1000 + 300 * history['is_weekend'] + rng.normal(0, 10, len(dates))
+        return history
+
+    @pytest.fixture
+    def forecast_model(self, daily_history):
+        """Create a forecasting model whose DATE_DIM lookups are served locally"""
+        model = SalesForecastingModel(Mock())
+        model.get_calendar = lambda start, end, granularity: make_calendar(pd.date_range(start, end, freq='D'))
+        model.prepare_sales_time_series = Mock(return_value=daily_history)
+        return model
+
+    def test_lag_features_use_only_earlier_periods(self):
+        """Test NumPy lag and moving-average features match shifted pandas windows"""
+        values = np.arange(60, dtype=float) ** 1.5
+        block = ml_models._lag_features(values)
+        series = pd.Series(values)
+
+        expected = np.column_stack([
+            series.shift(1), series.shift(7),
+            series.shift(1).rolling(7).mean(), series.shift(1).rolling(30).mean()
+        ])
+
+        assert np.allclose(block[30:], expected[30:])
+        assert np.isnan(block[0]).all()
+
+    def test_prepare_sales_time_series_one_row_per_period(self):
+        """Test the gap-filled weekly series gets lags by period offset"""
+        weeks = pd.date_range('2025-01-06', periods=40, freq='W-MON')
+        warehouse_rows = make_calendar(weeks).rename(columns=str.upper)
+        warehouse_rows['TOTAL_SALES'] = np.where(np.arange(40) % 5 == 0, 0.0, 100.0 + np.arange(40))
+        for column in ['ORDER_COUNT', 'AVG_ORDER_VALUE', 'UNIQUE_CUSTOMERS']:
+            warehouse_rows[column] = 1
+
+        session = Mock()
+        session.sql.return_value.to_pandas.return_value = warehouse_rows
+        sales_data = SalesForecastingModel(session).prepare_sales_time_series('weekly')
+
+        assert len(sales_data) == 40
+        assert "DATE_TRUNC('week', DATE_ACTUAL)" in session.sql.call_args[0][0]
+        assert sales_data['sales_lag_7'].iloc[10] == sales_data['total_sales'].iloc[3]
+        assert sales_data['sales_ma_7'].iloc[10] == pytest.approx(sales_data['total_sales'].iloc[3:10].mean())
+        assert sales_data['trend'].tolist() == list(range(40))
+
+    def test_recursive_forecast_horizon(self, forecast_model):
+        """Test recursive forecasting returns one row per future day"""
+        forecast = forecast_model.forecast(90)
+
+        assert len(forecast) == 90
+        assert forecast['date_period'].iloc[0] == pd.Timestamp('2026-01-01')
+        assert forecast['horizon'].tolist() == list(range(1, 91))
+
+        # The weekly pattern should carry into the forecast
+        weekend = forecast['date_period'].dt.dayofweek >= 5
+        assert forecast.loc[weekend, 'predicted_sales'].mean() > forecast.loc[~weekend, 'predicted_sales'].mean() + 150
+
+    def test_direct_forecast_fits_one_model_per_horizon(self, forecast_model, daily_history):
+        """Test the direct strategy trains a model per horizon step"""
+        results = forecast_model.fit_forecaster(daily_history, strategy='direct', max_horizon=5,
+                                                model_params={'n_estimators': 10})
+        forecast = forecast_model.forecast(5, strategy='direct')
+
+        assert results['models_fitted'] == 5
+        assert len(forecast) == 5
+        forecast_model.prepare_sales_time_series.assert_not_called()
+
+    def test_forecast_requires_calendar_coverage(self, forecast_model):
+        """Test a horizon beyond DATE_DIM raises instead of returning a short forecast"""
+        forecast_model.get_calendar = lambda start, end, granularity: make_calendar(pd.date_range(start, periods=3))
+
+        with pytest.raises(ValueError):
+            forecast_model.forecast(10)
+
+class TestHierarchicalForecasting:
+    """Test hierarchical forecasting and reconciliation"""
+
+    @pytest.fixture
+    def bottom_series(self):
+        """Create bottom-level sales for 2 categories x 2 product buckets x 2 territories"""
+        dates = pd.date_range('2025-01-01', '2025-06-30', freq='D')
+        rng = np.random.default_rng(3)
+        frames = []
+        for category in ['Electronics', 'Tools']:
+            for product in [f'{category[:3].upper()}-1', 'OTHER']:
+                for territory in ['East', 'West']:
+                    keep = rng.random(len(dates)) > 0.1
+                    frames.append(pd.DataFrame({
+                        'date_period': dates[keep],
+                        'category_name': category,
+                        'product_name': product,
+                        'territory_name': territory,
+                        'total_sales': rng.uniform(50, 500) + rng.normal(0, 5, keep.sum())
+                    }))
+        return pd.concat(frames, ignore_index=True)
+
+    @pytest.fixture
+    def hierarchy_model(self, bottom_series):
+        """Create a hierarchical model whose warehouse reads are served locally"""
+        model = HierarchicalSalesForecastingModel(Mock())
+        model.prepare_hierarchical_series = Mock(return_value=bottom_series)
+        model.get_calendar = lambda start, end, granularity: make_calendar(pd.date_range(start, end, freq='D'))
+        return model
+
+    def test_summing_matrix_shape(self, hierarchy_model, bottom_series):
+        """Test the summing matrix maps every level onto the bottom series"""
+        bottom = bottom_series[['category_name', 'product_name', 'territory_name']].drop_duplicates()
+        series_index, summing_matrix = hierarchy_model.build_hierarchy(bottom.reset_index(drop=True))
+
+        assert summing_matrix.shape == (1 + 2 + 2 + 4 + 8, 8)
+        assert series_index['level'].value_counts()['bottom'] == 8
+        assert summing_matrix[0].sum() == 8
+        assert (summing_matrix.sum(axis=1) >= 1).all()
+
+    @pytest.mark.parametrize("method", ["bottom_up", "mint"])
+    def test_reconciled_levels_add_up(self, hierarchy_model, method):
+        """Test reconciled forecasts are coherent across every level"""
+        forecast = hierarchy_model.forecast_hierarchy(7, method=method, n_jobs=1,
+                                                      model_params={'n_estimators': 5})
+        by_level = forecast.groupby(['level', 'date_period'])['reconciled_forecast'].sum().unstack()
+
+        for level in ['category', 'territory', 'product', 'bottom']:
+            assert np.allclose(by_level.loc[level], by_level.loc['total'])
+        assert forecast.loc[forecast['level'] == 'total', 'horizon'].tolist() == list(range(1, 8))
+
+    def test_boosting_backend_fits_every_series(self, hierarchy_model):
+        """Test the hierarchy is forecast with the model's configured backend"""
+        hierarchy_model.backend = 'hist_gradient_boosting'
+        forecast = hierarchy_model.forecast_hierarchy(7, n_jobs=1, model_params={'max_iter': 10})
+
+        assert forecast['base_forecast'].notna().all()
+        assert np.isfinite(forecast['reconciled_forecast']).all()
+
+class TestOutOfCoreChurn:
+    """Test chunked SGD churn training"""
+
+    @pytest.fixture
+    def churn_batches(self):
+        """Create warehouse result batches of customers whose churn depends on recency"""
+        rng = np.random.default_rng(5)
+        n = 4000
+        rows = pd.DataFrame({column: rng.normal(size=n) for column in ChurnPredictionModel.FEATURE_COLUMNS})
+        rows['days_since_last_order'] = rng.exponential(60, n)
+        rows['is_churned'] = (rows['days_since_last_order'] + rng.normal(0, 10, n) > 90).astype(int)
+        rows['is_holdout'] = np.arange(n) % 5 == 0
+        warehouse_rows = rows.rename(columns=str.upper)
+        return [warehouse_rows.iloc[start:start + 700] for start in range(0, n, 700)]
+
+    @pytest.fixture
+    def churn_model(self, churn_batches):
+        """Create a churn model whose aggregate and chunked queries are served from a mocked session"""
+        rows = pd.concat(churn_batches)
+        train = rows[~rows['IS_HOLDOUT']]
+        session = Mock()
+        session.sql.return_value.to_pandas.return_value = pd.DataFrame({
+            'N_TRAIN': [len(train)], 'N_TRAIN_CHURNED': [train['IS_CHURNED'].sum()]
+        })
+        session.sql.return_value.cache_result.return_value.to_pandas_batches.side_effect = lambda: iter(churn_batches)
+        return ChurnPredictionModel(session)
+
+    def test_streamed_training(self, churn_model, churn_batches):
+        """Test SGD training streams chunks, standardizes on training rows and scores the holdout"""
+        results = churn_model.train_churn_model_out_of_core(n_epochs=3, chunk_size=1000)
+        rows = pd.concat(churn_batches).rename(columns=str.lower)
+        train = rows[~rows['is_holdout']]
+        batches_mock = churn_model.session.sql.return_value.cache_result.return_value.to_pandas_batches
+
+        assert results['train_samples'] == len(train)
+        assert results['test_samples'] == len(rows) - len(train)
+        assert results['auc_score'] > 0.9
+        assert results['class_weight'][1] == pytest.approx(len(train) / (2 * train['is_churned'].sum()))
+        assert np.allclose(churn_model.scaler.mean_, train[ChurnPredictionModel.FEATURE_COLUMNS].mean())
+        assert batches_mock.call_count == 1 + 3 + 1
+
+        scored = churn_model.predict_churn(rows.head(10))
+        assert scored['churn_probability'].between(0, 1).all()
+
+    def test_single_class_training_split(self, churn_model):
+        """Test a training split without churned customers is rejected"""
+        churn_model.session.sql.return_value.to_pandas.return_value = pd.DataFrame({
+            'N_TRAIN': [100], 'N_TRAIN_CHURNED': [0]
+        })
+
+        with pytest.raises(ValueError):
+            churn_model.train_churn_model_out_of_core()
+
+class TestCustomerSegmentation:
+    """Test streamed mini-batch segmentation and UDF write-back"""
+
+    @pytest.fixture
+    def rfm_batches(self):
+        """Create warehouse result batches for low, mid and high value customers"""
+        rng = np.random.default_rng(11)
+        groups = [(300, 1, 50), (60, 5, 2000), (10, 40, 80000)]
+        frames = [pd.DataFrame({
+            'CUSTOMER_ID': np.arange(i * 1000, i * 1000 + 600),
+            'RECENCY_DAYS': rng.normal(recency, 2, 600).clip(0),
+            'LOG_FREQUENCY': np.log1p(rng.poisson(orders, 600)),
+            'LOG_MONETARY': np.log1p(rng.normal(spend, spend * 0.05, 600))
+        }) for i, (recency, orders, spend) in enumerate(groups)]
+        rfm = pd.concat(frames, ignore_index=True).sample(frac=1, random_state=0)
+        return [rfm.iloc[start:start + 250] for start in range(0, len(rfm), 250)]
+
+    @pytest.fixture
+    def segmentation_model(self, rfm_batches):
+        """Create a segmentation model reading segments and RFM batches from a mocked session"""
+        session = Mock()
+        session.sql.return_value.to_pandas.return_value = pd.DataFrame({
+            'SEGMENT_ID': [3, 1, 2],
+            'SEGMENT_NAME': ['Standard', 'Premium', 'Enterprise'],
+            'MIN_ANNUAL_REVENUE': [0, 10000, 100000]
+        })
+        session.sql.return_value.cache_result.return_value.to_pandas_batches.side_effect = lambda: iter(rfm_batches)
+        return CustomerSegmentationModel(session, chunk_size=500, n_epochs=2)
+
+    def test_clusters_map_to_segments_by_spend(self, segmentation_model, rfm_batches):
+        """Test clusters are fitted from streamed chunks and ranked onto revenue bands"""
+        results = segmentation_model.train_segmentation_model()
+        rfm = pd.concat(rfm_batches).rename(columns=str.lower)
+
+        assert results['n_customers'] == 1800
+        assert results['segment_profiles']['segment_id'].tolist() == [3, 1, 2]
+        assert np.allclose(segmentation_model.scaler.mean_, rfm[CustomerSegmentationModel.RFM_COLUMNS].mean())
+
+        predicted = segmentation_model.predict_segments(rfm)
+        assert (predicted.loc[predicted['customer_id'] >= 2000, 'segment_id'] == 2).all()
+        assert (predicted.loc[predicted['customer_id'] < 1000, 'segment_id'] == 3).all()
+
+    def test_assign_segments_writes_back_with_udf(self, segmentation_model):
+        """Test assignment registers a vectorized UDF and updates SEGMENT_ID in the warehouse"""
+        segmentation_model.train_segmentation_model()
+        segmentation_model.session.sql.return_value.collect.return_value = [(1800, 0)]
+
+        results = segmentation_model.assign_segments()
+        register_kwargs = segmentation_model.session.udf.register.call_args[1]
+        update_sql = segmentation_model.session.sql.call_args[0][0]
+
+        assert results['customers_updated'] == 1800
+        assert register_kwargs['name'] == CustomerSegmentationModel.UDF_NAME
+        assert 'UPDATE RETAILWORKS_DB.CUSTOMERS_SCHEMA.CUSTOMERS' in update_sql
+        assert f"{CustomerSegmentationModel.UDF_NAME}(RECENCY_DAYS" in update_sql
+
+        batch = pd.DataFrame([[300.0, np.log1p(1), np.log1p(50)], [10.0, np.log1p(40), np.log1p(80000)]])
+        assign_batch = segmentation_model.session.udf.register.call_args[0][0]
+        assert assign_batch(batch).tolist() == [3, 2]
+
+class TestProductRecommendations:
+    """Test sparse co-purchase recommendations"""
+
+    @pytest.fixture
+    def baskets(self):
+        """Create orders where products 1 and 2 are usually bought together"""
+        orders = [[1, 2], [1, 2], [1, 2, 3], [1, 3], [2, 3], [4], [1, 2, 4], [3, 4]]
+        return pd.DataFrame(
+            [(order_id, product_id) for order_id, products in enumerate(orders) for product_id in products],
+            columns=['order_id', 'product_id']
+        )
+
+    def test_top_k_neighbours(self, baskets):
+        """Test neighbours are ranked by co-purchase count and capped at K"""
+        model = ProductRecommendationModel(Mock(), top_k=2, min_co_occurrence=1)
+        results = model.train_recommendation_model(baskets)
+        recommendations = model.recommendations.set_index(['product_id', 'recommended_product_id'])
+
+        assert results['n_orders'] == 8
+        assert [r['recommended_product_id'] for r in model.recommend(1)] == [2, 3]
+        assert recommendations.loc[(1, 2), 'co_occurrence_count'] == 4
+        assert recommendations.loc[(1, 2), 'confidence'] == pytest.approx(4 / 5)
+        assert recommendations.loc[(1, 2), 'lift'] == pytest.approx((4 / 5) / (5 / 8))
+        assert model.recommendations.groupby('product_id').size().max() == 2
+
+    def test_min_co_occurrence_filters_pairs(self, baskets):
+        """Test pairs bought together too rarely are not recommended"""
+        model = ProductRecommendationModel(Mock(), min_co_occurrence=2)
+        model.train_recommendation_model(baskets)
+
+        assert model.recommend(4) == []
+        assert model.recommend(99) == []
+
+class TestSalesAnomalyDetector:
+    """Test streaming anomaly detection over daily sales"""
+
+    @pytest.fixture
+    def sales_data(self):
+        """Create 120 days of weekly-seasonal sales with a drop on day 100"""
+        rng = np.random.default_rng(7)
+        dates = pd.date_range('2024-01-01', periods=120, freq='D')
+        sales = 10000 + 2000 * (dates.dayofweek >= 5) + rng.normal(0, 300, len(dates))
+        sales[100] = 3000
+        return pd.DataFrame({'date_period': dates, 'total_sales': sales})
+
+    def test_flags_injected_drop_only(self, sales_data):
+        """Test the injected drop is flagged and ordinary weekend peaks are not"""
+        scored = SalesAnomalyDetector(Mock()).detect(sales_data)
+
+        flagged = scored[scored['is_anomaly']]
+        assert flagged['date_period'].tolist() == [sales_data['date_period'][100]]
+        assert flagged['direction'].iloc[0] == 'DROP'
+        assert flagged['severity'].iloc[0] == 'CRITICAL'
+
+    def test_incremental_detection_matches_full_pass(self, sales_data):
+        """Test a restored state only scores new days and matches a single pass"""
+        full = SalesAnomalyDetector(Mock()).detect(sales_data)
+
+        detector = SalesAnomalyDetector(MagicMock())
+        detector.detect(sales_data.iloc[:90])
+        detector.save_state()
+        record = detector.session.create_dataframe.call_args[0][0][0][1]
+
+        restored = SalesAnomalyDetector(Mock())
+        restored.session.table.return_value.filter.return_value.select.return_value.collect.return_value = [
+            {'STATE': record}
+        ]
+        assert restored.load_state()
+        scored = restored.detect(sales_data)
+
+        assert len(scored) == 30
+        np.testing.assert_allclose(scored['z_score'], full['z_score'].iloc[90:])
+
+    def test_missing_state_scores_full_history(self, sales_data):
+        """Test a detector without a saved state starts from the first day"""
+        detector = SalesAnomalyDetector(Mock())
+        detector.session.table.return_value.filter.return_value.select.return_value.collect.return_value = []
+
+        assert not detector.load_state()
+        assert len(detector.detect(sales_data)) == len(sales_data)
+
+    def test_save_alerts_merges_flagged_days(self, sales_data):
+        """Test only flagged days are merged into the alerts table, keyed by date"""
+        detector = SalesAnomalyDetector(MagicMock())
+        scored = detector.detect(sales_data)
+
+        assert detector.save_alerts(scored) == 1
+        alerts = detector.session.create_dataframe.call_args[0][0]
+        assert list(alerts.columns) == [
+            'ALERT_DATE', 'ACTUAL_SALES', 'EXPECTED_SALES', 'Z_SCORE', 'DIRECTION', 'SEVERITY', 'DETECTED_AT'
+        ]
+        detector.session.table.assert_called_with(SalesAnomalyDetector.ALERTS_TABLE)
+        detector.session.table.return_value.merge.assert_called_once()
+        detector.session.create_dataframe.return_value.write.mode.assert_not_called()
@@ -0,0 +1,114 @@
+"""
+Model Explainability Tests
+Description: Unit tests for cached permutation importance and SHAP computation
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from unittest.mock import Mock
+import warnings
+import sys
+import os
+
+# Add src to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+pytest.importorskip("sklearn")
+
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from model_explainability import ExplainabilityJob
+
+class TestExplainabilityJob:
+    """Test feature driver computation and caching by model version"""
+
+    @pytest.fixture
+    def features(self):
+        """Create customers whose spend depends mostly on total_orders"""
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            'customer_id': np.arange(400),
+            'total_orders': rng.poisson(10, 400).astype(float),
+            'annual_income': rng.normal(60000, 15000, 400),
+            'noise': rng.normal(size=400)
+        })
+        df['total_spent'] = 120 * df['total_orders'] + 0.001 * df['annual_income'] + rng.normal(0, 5, 400)
+        df['is_churned'] = (df['total_orders'] < 9).astype(int)
+        return df
+
+    def make_wrapper(self, estimator, features, target):
+        """Wrap a fitted estimator the way the ml_models classes do"""
+        wrapper = Mock(FEATURE_COLUMNS=['total_orders', 'annual_income', 'noise'])
+        wrapper.scaler = StandardScaler().fit(features[wrapper.FEATURE_COLUMNS])
+        wrapper.model = estimator.fit(wrapper.scaler.transform(features[wrapper.FEATURE_COLUMNS]), features[target])
+        return wrapper
+
+    @pytest.fixture
+    def job(self, tmp_path):
+        """Create a job caching to a temporary directory"""
+        return ExplainabilityJob(cache_dir=str(tmp_path), sample_size=200, n_repeats=3, n_jobs=2)
+
+    def test_permutation_importance_ranks_drivers(self, job, features):
+        """Test the dominant feature ranks first and SHAP values cover every sampled row"""
+        pytest.importorskip("shap")
+        wrapper = self.make_wrapper(RandomForestRegressor(n_estimators=20, random_state=0), features, 'total_spent')
+
+        explanation = job.explain('clv', wrapper, features, 'total_spent', 'r2', id_column='customer_id')
+        importance = explanation['feature_importance']
+
+        assert importance['feature'].iloc[0] == 'total_orders'
+        assert importance.set_index('feature')['mean_abs_shap'].idxmax() == 'total_orders'
+        assert explanation['shap_values'].shape == (200, 4)
+
+    def test_linear_model_shap(self, job, features):
+        """Test classifiers without trees are explained with the linear explainer"""
+        pytest.importorskip("shap")
+        wrapper = self.make_wrapper(LogisticRegression(), features, 'is_churned')
+
+        explanation = job.explain('churn', wrapper, features, 'is_churned', 'roc_auc')
+
+        assert explanation['shap_values'].shape == (200, 3)
+        assert explanation['feature_importance']['feature'].iloc[0] == 'total_orders'
+
+    def test_cached_by_model_version(self, job, features, monkeypatch):
+        """Test a second request for the same version is served from the cache, a new version is not"""
+        monkeypatch.setattr('model_explainability.shap_available', lambda: False)
+        wrapper = self.make_wrapper(LogisticRegression(), features, 'is_churned')
+
+        first = job.explain('churn', wrapper, features, 'is_churned', 'roc_auc')
+        second = job.submit('churn', wrapper, features, 'is_churned', 'roc_auc').result()
+
+        assert second['computed_at'] == first['computed_at']
+        assert job.load_cached('churn', wrapper)['model_version'] == first['model_version']
+
+        wrapper.model = LogisticRegression(C=0.01).fit(
+            wrapper.scaler.transform(features[wrapper.FEATURE_COLUMNS]), features['is_churned']
+        )
+        assert job.load_cached('churn', wrapper) is None
+
+    def test_named_scaler_gets_feature_names(self, job, features, monkeypatch):
+        """Test a scaler fit on a DataFrame is not warned about missing feature names"""
+        monkeypatch.setattr('model_explainability.shap_available', lambda: False)
+        wrapper = self.make_wrapper(LogisticRegression(), features, 'is_churned')
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UserWarning)
+            explanation = job.explain('churn', wrapper, features, 'is_churned', 'roc_auc')
+
+        assert len(explanation['feature_importance']) == 3
+
+    def test_close_stops_background_worker(self, job, features, monkeypatch):
+        """Test close waits for submitted work and refuses new submissions"""
+        monkeypatch.setattr('model_explainability.shap_available', lambda: False)
+        wrapper = self.make_wrapper(LogisticRegression(), features, 'is_churned')
+        future = job.submit('churn', wrapper, features, 'is_churned', 'roc_auc')
+
+        job.close()
+
+        assert future.done()
+        with pytest.raises(RuntimeError):
+            job.submit('churn', wrapper, features, 'is_churned', 'roc_auc')
@@ -0,0 +1,174 @@
+"""
+Model Monitoring Tests
+Description: Unit tests for drift detection and drift-gated retraining
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+from unittest.mock import Mock
+import threading
+import sys
+import os
+
+# Add src to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+pytest.importorskip("sklearn")
+
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+from model_monitoring import RetrainingScheduler, population_stability_index, refit_scaler, warm_start_fit
+
+class TestDriftDetection:
+    """Test PSI/KS drift checks and retraining decisions"""
+
+    @pytest.fixture
+    def features(self):
+        """Create a reference feature table"""
+        rng = np.random.default_rng(0)
+        return pd.DataFrame({
+            'total_orders': rng.poisson(10, 2000).astype(float),
+            'avg_order_value': rng.normal(100, 20, 2000)
+        })
+
+    @pytest.fixture
+    def scheduler(self, tmp_path):
+        """Create a scheduler persisting to a temporary file"""
+        return RetrainingScheduler(state_path=str(tmp_path / 'state.pkl'))
+
+    def test_psi_detects_shift(self):
+        """Test PSI is near zero for the same distribution and large for a shifted one"""
+        rng = np.random.default_rng(1)
+        reference = rng.normal(0, 1, 5000)
+
+        assert population_stability_index(reference, rng.normal(0, 1, 5000)) < 0.02
+        assert population_stability_index(reference, rng.normal(1, 1, 5000)) > 0.2
+
+    def test_retrain_without_previous_training(self, scheduler, features):
+        """Test a model with no recorded training is always trained"""
+        decision = scheduler.should_retrain('clv', features)
+
+        assert decision['retrain']
+
+    def test_drift_triggers_retrain(self, scheduler, features):
+        """Test a shifted feature is reported and triggers a retrain"""
+        scheduler.record_training('clv', features, list(features.columns), 0.8)
+        shifted = features.assign(avg_order_value=features['avg_order_value'] * 1.5)
+
+        decision = scheduler.should_retrain('clv', shifted)
+        drift = decision['drift'].set_index('feature')
+
+        assert decision['retrain']
+        assert drift.loc['avg_order_value', 'drifted']
+        assert not drift.loc['total_orders', 'drifted']
+
+    def test_degradation_triggers_retrain(self, scheduler, features):
+        """Test a holdout score drop beyond the threshold triggers a retrain"""
+        scheduler.record_training('clv', features, list(features.columns), 0.8)
+
+        assert not scheduler.should_retrain('clv', features, current_score=0.78)['retrain']
+        assert scheduler.should_retrain('clv', features, current_score=0.6)['retrain']
+
+    def test_state_persists(self, scheduler, features):
+        """Test training profiles survive a scheduler restart"""
+        scheduler.record_training('clv', features, list(features.columns), 0.8)
+
+        restored = RetrainingScheduler(state_path=scheduler.state_path)
+
+        assert restored.state['clv']['baseline_score'] == 0.8
+
+    def test_run_skips_stable_model(self, scheduler, features):
+        """Test the scheduled run does not retrain when nothing changed"""
+        model = Mock(FEATURE_COLUMNS=list(features.columns))
+        train = Mock(return_value={'r2_score': 0.8})
+        scheduler.record_training('clv', features, list(features.columns), 0.8, estimator='fitted')
+
+        result = scheduler.run('clv', model, features, train, lambda df: 0.79, 'r2_score')
+
+        assert not result['retrained']
+        train.assert_not_called()
+        assert model.model == 'fitted'
+
+    def test_run_without_date_column_skips_degradation(self, scheduler, features):
+        """Test rows that cannot be told apart from the training data are not scored"""
+        model = Mock(FEATURE_COLUMNS=list(features.columns))
+        train = Mock(return_value={'r2_score': 0.8})
+        evaluate = Mock(return_value=0.1)
+        scheduler.record_training('clv', features, list(features.columns), 0.8, estimator='fitted')
+
+        result = scheduler.run('clv', model, features, train, evaluate, 'r2_score')
+
+        assert not result['retrained']
+        evaluate.assert_not_called()
+
+    def test_run_logs_too_few_new_rows(self, scheduler, features, caplog):
+        """Test a degradation check with fewer than min_new_rows new rows is skipped and logged"""
+        dated = features.assign(order_date=pd.date_range('2026-01-01', periods=len(features), freq='h'))
+        model = Mock(FEATURE_COLUMNS=list(features.columns))
+        evaluate = Mock(return_value=0.1)
+        scheduler.record_training('clv', dated, list(features.columns), 0.8, estimator='fitted',
+                                  watermark=dated['order_date'].iloc[-10])
+
+        with caplog.at_level('INFO', logger='model_monitoring'):
+            scheduler.run('clv', model, dated, Mock(), evaluate, 'r2_score', date_column='order_date')
+
+        evaluate.assert_not_called()
+        assert "9 new rows, fewer than 30" in caplog.text
+
+    def test_concurrent_recording_and_saving(self, scheduler, features):
+        """Test saves from other threads never see the state dict change mid-pickle"""
+        errors = []
+
+        def record(i):
+            try:
+                scheduler.record_training(f'model_{i}', features, list(features.columns), 0.8)
+                scheduler.save()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=record, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(RetrainingScheduler(state_path=scheduler.state_path).state) == 20
+
+    def test_warm_start_adds_trees(self):
+        """Test warm-started forests keep their trees and grow extra ones"""
+        rng = np.random.default_rng(2)
+        X, y = rng.normal(size=(100, 3)), rng.normal(size=100)
+        forest = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+        first_tree = forest.estimators_[0]
+
+        assert warm_start_fit(forest, X, y, extra_estimators=5)
+        assert len(forest.estimators_) == 15
+        assert forest.estimators_[0] is first_tree
+
+    def test_warm_start_refits_at_size_ceiling(self):
+        """Test a forest is refit at its current size rather than grown past max_estimators"""
+        rng = np.random.default_rng(3)
+        X, y = rng.normal(size=(100, 3)), rng.normal(size=100)
+        forest = RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y)
+        first_tree = forest.estimators_[0]
+
+        assert not warm_start_fit(forest, X, y, extra_estimators=5, max_estimators=24)
+        assert len(forest.estimators_) == 20
+        assert forest.estimators_[0] is not first_tree
+
+    def test_refit_scaler_reports_moved_scaling(self):
+        """Test refitting the scaler flags shifted inputs but not a resample of the same distribution"""
+        rng = np.random.default_rng(4)
+        scaler = StandardScaler().fit(rng.normal(100, 20, size=(5000, 2)))
+
+        refitted, moved = refit_scaler(scaler, rng.normal(100, 20, size=(5000, 2)))
+        assert not moved
+        assert refitted is not scaler
+
+        refitted, moved = refit_scaler(scaler, rng.normal(130, 20, size=(5000, 2)))
+        assert moved
+        assert refitted.mean_[0] == pytest.approx(130, abs=2)
@@ -0,0 +1,94 @@
+"""
+Model Tuning Tests
+Description: Unit tests for hyperparameter search and cross-validation
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+pytest.importorskip("sklearn")
+
+from sklearn.linear_model import LogisticRegression, Ridge
+from model_tuning import HyperparameterTuner
+
+class TestHyperparameterTuner:
+    """Test grid/random search with cross-validation"""
+
+    @pytest.fixture
+    def regression_data(self):
+        """Create a small linear regression problem"""
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(120, 4))
+        y = X @ np.array([3.0, -2.0, 0.5, 0.0]) + rng.normal(scale=0.1, size=120)
+        return X, y
+
+    @pytest.fixture
+    def classification_data(self):
+        """Create a small imbalanced classification problem"""
+        rng = np.random.default_rng(1)
+        X = rng.normal(size=(200, 3))
+        y = (X[:, 0] + rng.normal(scale=0.5, size=200) > 0.8).astype(int)
+        return X, y
+
+    def test_grid_search_results_table(self, regression_data):
+        """Test every grid configuration appears once in the results table"""
+        X, y = regression_data
+        tuner = HyperparameterTuner(Ridge(), {'alpha': [0.01, 1.0, 100.0]}, scoring='r2',
+                                    n_splits=3, n_jobs=1, prune_fraction=0)
+
+        result = tuner.fit(X, y)
+
+        assert result['n_configs'] == 3
+        assert len(result['results']) == 3
+        assert set(result['results']['status']) == {'completed'}
+        assert (result['results']['folds_completed'] == 3).all()
+        assert result['best_params'] == {'alpha': 0.01}
+        assert result['results'].iloc[0]['rank'] == 1
+
+    def test_bad_configurations_are_pruned(self, regression_data):
+        """Test configurations below the quantile stop after the first fold"""
+        X, y = regression_data
+        tuner = HyperparameterTuner(Ridge(), {'alpha': [0.01, 0.1, 1e4, 1e5]}, scoring='r2',
+                                    n_splits=4, n_jobs=1, prune_after=1, prune_fraction=0.5)
+
+        result = tuner.fit(X, y)
+        table = result['results'].set_index('param_alpha')
+
+        assert result['n_pruned'] == 2
+        assert table.loc[1e5, 'status'] == 'pruned'
+        assert table.loc[1e5, 'folds_completed'] == 1
+        assert pd.isna(table.loc[1e5, 'rank'])
+        assert table.loc[0.01, 'folds_completed'] == 4
+
+    def test_random_search_samples_n_iter(self, classification_data):
+        """Test random search evaluates the requested number of configurations"""
+        X, y = classification_data
+        tuner = HyperparameterTuner(LogisticRegression(max_iter=500),
+                                    {'C': list(np.logspace(-3, 3, 20))},
+                                    scoring='roc_auc', cv='stratified', search='random',
+                                    n_iter=5, n_splits=3, n_jobs=2)
+
+        result = tuner.fit(X, y)
+
+        assert result['n_configs'] == 5
+        assert 0.5 < result['best_score'] <= 1.0
+
+    def test_timeseries_folds_never_look_ahead(self):
+        """Test time-series CV always validates on later rows than it trains on"""
+        tuner = HyperparameterTuner(Ridge(), {'alpha': [1.0]}, scoring='r2', cv='timeseries', n_splits=4)
+
+        for train_idx, test_idx in tuner._splitter().split(np.zeros((50, 1))):
+            assert train_idx.max() < test_idx.min()
+
+    def test_invalid_cv_strategy(self):
+        """Test unknown CV strategies are rejected"""
+        with pytest.raises(ValueError):
+            HyperparameterTuner(Ridge(), {'alpha': [1.0]}, scoring='r2', cv='bootstrap')
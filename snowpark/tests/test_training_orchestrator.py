@@ -0,0 +1,108 @@
+"""
+Training Orchestrator Tests
+Description: Unit tests for the dependency-graph training runner
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pytest
+import pandas as pd
+import time
+from unittest.mock import Mock
+import sys
+import os
+
+# Add src to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+pytest.importorskip("snowflake.snowpark")
+
+from training_orchestrator import TrainingOrchestrator
+
+def slow(seconds, value):
+    """Task that sleeps then returns a value"""
+    def task(**inputs):
+        time.sleep(seconds)
+        return value
+    return task
+
+class TestTrainingOrchestrator:
+    """Test task scheduling, failure handling and registry output"""
+
+    def test_independent_fits_run_concurrently(self):
+        """Test wall time tracks the slowest branch rather than the sum of tasks"""
+        orchestrator = TrainingOrchestrator(Mock(), max_workers=3)
+        orchestrator.add_task('features', slow(0.1, 'shared'))
+        for name in ['clv', 'churn', 'forecast']:
+            orchestrator.add_task(name, slow(0.3, {'r2_score': 0.9}), ['features'], model=Mock())
+
+        run = orchestrator.run()
+
+        assert set(run['report']['status']) == {'succeeded'}
+        assert run['wall_seconds'] < 0.7
+        assert run['task_seconds'] >= 1.0
+
+    def test_session_tasks_run_one_at_a_time(self):
+        """Test tasks using the shared session never overlap while local fits still run alongside them"""
+        orchestrator = TrainingOrchestrator(Mock(), max_workers=4)
+        for name in ['clv_features', 'churn_features', 'sales_data']:
+            orchestrator.add_task(name, slow(0.2, 'features'), uses_session=True)
+        orchestrator.add_task('segmentation_fit', slow(0.4, {}))
+
+        report = orchestrator.run()['report'].set_index('task_name')
+        sessions = report.loc[['clv_features', 'churn_features', 'sales_data']].sort_values('started_at')
+        ends = sessions['started_at'] + pd.to_timedelta(sessions['seconds'], unit='s')
+
+        assert (sessions['started_at'].iloc[1:].to_numpy() >= ends.iloc[:-1].to_numpy()).all()
+        assert report.loc['segmentation_fit', 'started_at'] < ends.iloc[0]
+
+    def test_dependency_outputs_are_passed(self):
+        """Test tasks receive their dependencies' outputs as keyword arguments"""
+        orchestrator = TrainingOrchestrator(Mock())
+        orchestrator.add_task('features', lambda: [1, 2, 3])
+        orchestrator.add_task('fit', lambda features: {'train_samples': len(features)}, ['features'])
+
+        run = orchestrator.run()
+
+        assert run['outputs']['fit'] == {'train_samples': 3}
+
+    def test_failures_skip_dependents(self):
+        """Test a failed task is reported and its dependents are skipped while others finish"""
+        def broken():
+            raise RuntimeError("warehouse unavailable")
+
+        orchestrator = TrainingOrchestrator(Mock())
+        orchestrator.add_task('features', broken)
+        orchestrator.add_task('fit', lambda features: {}, ['features'])
+        orchestrator.add_task('save', lambda fit: None, ['fit'])
+        orchestrator.add_task('other', lambda: {'ok': True})
+
+        status = orchestrator.run()['report'].set_index('task_name')['status']
+
+        assert status.to_dict() == {'features': 'failed', 'fit': 'skipped', 'save': 'skipped', 'other': 'succeeded'}
+
+    def test_cycles_are_rejected(self):
+        """Test cyclic graphs fail before any task runs"""
+        orchestrator = TrainingOrchestrator(Mock())
+        orchestrator.add_task('a', lambda b: None, ['b'])
+        orchestrator.add_task('b', lambda a: None, ['a'])
+
+        with pytest.raises(ValueError):
+            orchestrator.run()
+
+    def test_registry_rows_for_model_tasks(self):
+        """Test only model tasks are written to the registry, with their metrics"""
+        session = Mock()
+        orchestrator = TrainingOrchestrator(session)
+        orchestrator.add_task('features', lambda: None)
+        orchestrator.add_task('clv', lambda features: {'model_type': 'Random Forest', 'r2_score': 0.8},
+                              ['features'], model=Mock(model='fitted', scaler=None))
+
+        written = orchestrator.write_registry(orchestrator.run())
+        registry = session.create_dataframe.call_args[0][0]
+
+        assert written == 1
+        assert registry['MODEL_NAME'].tolist() == ['clv']
+        assert registry['MODEL_TYPE'].tolist() == ['Random Forest']
+        assert '"r2_score": 0.8' in registry['METRICS'].iloc[0]
+        session.create_dataframe.return_value.select.return_value.write.mode.assert_called_with("append")
@@ -11,14 +11,15 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import snowflake.connector
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
+from typing import Optional
 import sys
 import os
 
 # Add utils to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
-from snowflake_connection import get_snowflake_connection
-from chart_utils import create_kpi_card, format_currency, format_number
+from query_cache import get_query_layer, load_concurrently
+from chart_utils import create_kpi_card, format_currency, format_number, format_currency_series
 
 # Page configuration
 st.set_page_config(
@@ -52,14 +53,20 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 class ExecutiveDashboard:
-    def __init__(self):
-        self.conn = None
-        self.setup_connection()
+    # Default filters; the cache warmer pre-runs the queries behind them
+    DEFAULT_PERIOD = "Current Month"
+    DEFAULT_TREND_DAYS = 30
+    DEFAULT_TOP_CATEGORIES = 10
+    
+    def __init__(self, query_layer=None):
+        self.query_layer = query_layer
+        if query_layer is None:
+            self.setup_connection()
     
     def setup_connection(self):
-        """Setup Snowflake connection"""
+        """Setup the shared cached query layer"""
         try:
-            self.conn = get_snowflake_connection()
+            self.query_layer = get_query_layer()
         except Exception as e:
             st.error(f"Failed to connect to Snowflake: {str(e)}")
             st.stop()
@@ -67,7 +74,7 @@ class ExecutiveDashboard:
     def get_kpi_data(self, period_filter: str = "Current Month"):
         """Get KPI data for dashboard"""
         try:
-            query = f"""
+            query = """
                 SELECT 
                     period_type,
                     period_name,
@@ -79,20 +86,20 @@ class ExecutiveDashboard:
                     profit_margin_percent,
                     products_sold
                 FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.VW_EXECUTIVE_KPI_DASHBOARD
-                WHERE period_type = '{period_filter}'
+                WHERE period_type = %(period_filter)s
             """
             
-            df = pd.read_sql(query, self.conn)
+            df = self.query_layer.query(query, {'period_filter': period_filter})
             return df.iloc[0] if len(df) > 0 else None
             
         except Exception as e:
             st.error(f"Error fetching KPI data: {str(e)}")
             return None
     
-    def get_sales_trend_data(self, days: int = 30):
-        """Get sales trend data for specified number of days"""
+    def get_sales_trend_data(self, days: int = 30, as_of: Optional[date] = None):
+        """Get sales trend data for the specified number of days up to as_of (default today)"""
         try:
-            query = f"""
+            query = """
                 SELECT 
                     date_actual,
                     daily_revenue,
@@ -101,11 +108,12 @@ class ExecutiveDashboard:
                     is_weekend,
                     is_holiday
                 FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.VW_SALES_TREND_ANALYSIS
-                WHERE date_actual >= CURRENT_DATE() - {days}
+                WHERE date_actual >= %(as_of)s::DATE - %(days)s
                 ORDER BY date_actual
             """
             
-            df = pd.read_sql(query, self.conn)
+            # The anchor day is bound rather than CURRENT_DATE() so it is part of the cache key
+            df = self.query_layer.query(query, {'days': days, 'as_of': as_of or date.today()})
             df['date_actual'] = pd.to_datetime(df['date_actual'])
             return df
             
@@ -116,7 +124,7 @@ class ExecutiveDashboard:
     def get_top_categories_data(self, limit: int = 10):
         """Get top categories by revenue"""
         try:
-            query = f"""
+            query = """
                 SELECT 
                     category_name,
                     total_revenue,
@@ -125,10 +133,10 @@ class ExecutiveDashboard:
                     total_units_sold
                 FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.VW_CATEGORY_PERFORMANCE
                 ORDER BY total_revenue DESC
-                LIMIT {limit}
+                LIMIT %(limit)s
             """
             
-            df = pd.read_sql(query, self.conn)
+            df = self.query_layer.query(query, {'limit': limit})
             return df
             
         except Exception as e:
@@ -151,13 +159,37 @@ class ExecutiveDashboard:
                 ORDER BY total_revenue DESC
             """
             
-            df = pd.read_sql(query, self.conn)
+            df = self.query_layer.query(query)
             return df
             
         except Exception as e:
             st.error(f"Error fetching territory data: {str(e)}")
             return pd.DataFrame()
     
+    def get_sales_anomalies(self, days: int = 30, as_of: Optional[date] = None):
+        """Get sales anomaly alerts raised over the specified number of days up to as_of (default today)"""
+        try:
+            query = """
+                SELECT 
+                    alert_date,
+                    actual_sales,
+                    expected_sales,
+                    z_score,
+                    direction,
+                    severity
+                FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_ANOMALY_ALERTS
+                WHERE alert_date >= %(as_of)s::DATE - %(days)s
+                ORDER BY alert_date DESC
+            """
+            
+            df = self.query_layer.query(query, {'days': days, 'as_of': as_of or date.today()})
+            df['alert_date'] = pd.to_datetime(df['alert_date'])
+            return df
+            
+        except Exception as e:
+            st.error(f"Error fetching sales anomalies: {str(e)}")
+            return pd.DataFrame()
+    
     def render_kpi_section(self, kpi_data):
         """Render KPI cards section"""
         if kpi_data is None:
@@ -373,8 +405,8 @@ class ExecutiveDashboard:
             # Territory metrics table
             st.subheader("Territory Metrics")
             formatted_data = territory_data.copy()
-            formatted_data['total_revenue'] = formatted_data['total_revenue'].apply(format_currency)
-            formatted_data['revenue_per_customer'] = formatted_data['revenue_per_customer'].apply(format_currency)
+            formatted_data['total_revenue'] = format_currency_series(formatted_data['total_revenue'])
+            formatted_data['revenue_per_customer'] = format_currency_series(formatted_data['revenue_per_customer'])
             
             st.dataframe(
                 formatted_data[['territory_name', 'total_revenue', 'total_orders', 'revenue_per_customer']],
@@ -382,6 +414,53 @@ class ExecutiveDashboard:
                 height=350
             )
     
+    def render_sales_anomalies(self, anomaly_data):
+        """Render sales anomaly alerts"""
+        st.subheader("🚨 Sales Anomalies")
+        
+        if anomaly_data.empty:
+            st.success("No unusual daily sales detected in this period")
+            return
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric("Anomalous Days", format_number(len(anomaly_data)))
+        
+        with col2:
+            st.metric("Sales Drops", format_number((anomaly_data['direction'] == 'DROP').sum()))
+        
+        with col3:
+            st.metric("Critical Alerts", format_number((anomaly_data['severity'] == 'CRITICAL').sum()))
+        
+        formatted_data = anomaly_data.copy()
+        formatted_data['difference'] = format_currency_series(formatted_data['actual_sales'] - formatted_data['expected_sales'])
+        formatted_data['actual_sales'] = format_currency_series(formatted_data['actual_sales'])
+        formatted_data['expected_sales'] = format_currency_series(formatted_data['expected_sales'])
+        formatted_data['alert_date'] = formatted_data['alert_date'].dt.strftime('%Y-%m-%d')
+        formatted_data['z_score'] = formatted_data['z_score'].round(1)
+        
+        st.dataframe(
+            formatted_data[['alert_date', 'severity', 'direction', 'actual_sales', 'expected_sales',
+                            'difference', 'z_score']],
+            hide_index=True
+        )
+    
+    def warm_default_views(self, as_of: Optional[date] = None):
+        """
+        Run the queries behind the default filters so the first visitors hit the cache
+        
+        Args:
+            as_of (date): Day the trend and anomaly windows end on, defaults to today
+        """
+        return {
+            'kpi': self.get_kpi_data(self.DEFAULT_PERIOD),
+            'trend': self.get_sales_trend_data(self.DEFAULT_TREND_DAYS, as_of),
+            'category': self.get_top_categories_data(self.DEFAULT_TOP_CATEGORIES),
+            'territory': self.get_territory_performance_data(),
+            'anomaly': self.get_sales_anomalies(self.DEFAULT_TREND_DAYS, as_of)
+        }
+    
     def run(self):
         """Main dashboard function"""
         st.title("🏢 RetailWorks Executive Dashboard")
@@ -391,22 +470,33 @@ class ExecutiveDashboard:
         st.sidebar.header("📅 Filters")
         
         period_options = ["Current Month", "Current Quarter", "Year to Date"]
-        selected_period = st.sidebar.selectbox("Time Period", period_options)
+        selected_period = st.sidebar.selectbox("Time Period", period_options,
+                                               index=period_options.index(self.DEFAULT_PERIOD))
         
-        trend_days = st.sidebar.slider("Sales Trend Days", 7, 90, 30)
+        trend_days = st.sidebar.slider("Sales Trend Days", 7, 90, self.DEFAULT_TREND_DAYS)
         
-        top_categories = st.sidebar.slider("Top Categories", 5, 20, 10)
+        top_categories = st.sidebar.slider("Top Categories", 5, 20, self.DEFAULT_TOP_CATEGORIES)
         
         # Refresh button
         if st.sidebar.button("🔄 Refresh Data"):
+            self.query_layer.clear()
             st.rerun()
         
         # Load data
+        # Independent queries run concurrently, so the page waits only for the slowest one
         with st.spinner("Loading dashboard data..."):
-            kpi_data = self.get_kpi_data(selected_period)
-            trend_data = self.get_sales_trend_data(trend_days)
-            category_data = self.get_top_categories_data(top_categories)
-            territory_data = self.get_territory_performance_data()
+            data = load_concurrently({
+                'kpi': lambda: self.get_kpi_data(selected_period),
+                'trend': lambda: self.get_sales_trend_data(trend_days),
+                'category': lambda: self.get_top_categories_data(top_categories),
+                'territory': self.get_territory_performance_data,
+                'anomaly': lambda: self.get_sales_anomalies(trend_days)
+            })
+            kpi_data = data['kpi']
+            trend_data = data['trend']
+            category_data = data['category']
+            territory_data = data['territory']
+            anomaly_data = data['anomaly']
         
         # Render dashboard sections
         self.render_kpi_section(kpi_data)
@@ -417,6 +507,10 @@ class ExecutiveDashboard:
         
         st.markdown("---")
         
+        self.render_sales_anomalies(anomaly_data)
+        
+        st.markdown("---")
+        
         self.render_category_performance_chart(category_data)
         
         st.markdown("---")
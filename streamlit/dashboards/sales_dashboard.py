@@ -11,15 +11,17 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta, date
+from typing import Optional
 import sys
 import os
 
 # Add utils to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
-from snowflake_connection import get_snowflake_connection
+from query_cache import get_query_layer, load_concurrently
 from chart_utils import (
     create_kpi_card, format_currency, format_number, format_percentage,
-    create_trend_chart, create_bar_chart, create_combo_chart
+    format_currency_series, format_percentage_series,
+    create_trend_chart, create_bar_chart, create_combo_chart, create_scatter_plot
 )
 
 # Page configuration
@@ -31,14 +33,21 @@ st.set_page_config(
 )
 
 class SalesDashboard:
-    def __init__(self):
-        self.conn = None
-        self.setup_connection()
+    # Default date range in days; the cache warmer pre-runs the queries behind it
+    DEFAULT_RANGE_DAYS = 30
+    
+    # Session state entry holding the sections already loaded for the selected date range
+    SESSION_KEY = 'sales_dashboard_sections'
+    
+    def __init__(self, query_layer=None):
+        self.query_layer = query_layer
+        if query_layer is None:
+            self.setup_connection()
     
     def setup_connection(self):
-        """Setup Snowflake connection"""
+        """Setup the shared cached query layer"""
         try:
-            self.conn = get_snowflake_connection()
+            self.query_layer = get_query_layer()
         except Exception as e:
             st.error(f"Failed to connect to Snowflake: {str(e)}")
             st.stop()
@@ -46,7 +55,7 @@ class SalesDashboard:
     def get_sales_overview_data(self, start_date: date, end_date: date):
         """Get sales overview data for date range"""
         try:
-            query = f"""
+            query = """
                 SELECT 
                     COUNT(DISTINCT sf.ORDER_ID) as total_orders,
                     COUNT(DISTINCT sf.CUSTOMER_KEY) as unique_customers,
@@ -58,10 +67,10 @@ class SalesDashboard:
                     ROUND((SUM(sf.PROFIT) / NULLIF(SUM(sf.LINE_TOTAL), 0)) * 100, 2) as profit_margin_percent
                 FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
                 JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
-                WHERE d.DATE_ACTUAL BETWEEN '{start_date}' AND '{end_date}'
+                WHERE d.DATE_ACTUAL BETWEEN %(start_date)s AND %(end_date)s
             """
             
-            df = pd.read_sql(query, self.conn)
+            df = self.query_layer.query(query, {'start_date': start_date, 'end_date': end_date})
             return df.iloc[0] if len(df) > 0 else None
             
         except Exception as e:
@@ -71,7 +80,7 @@ class SalesDashboard:
     def get_daily_sales_data(self, start_date: date, end_date: date):
         """Get daily sales data for trend analysis"""
         try:
-            query = f"""
+            query = """
                 SELECT 
                     d.DATE_ACTUAL,
                     d.DAY_OF_WEEK_NAME,
@@ -84,14 +93,13 @@ class SalesDashboard:
                     SUM(sf.QUANTITY) as units_sold
                 FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
                 JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
-                WHERE d.DATE_ACTUAL BETWEEN '{start_date}' AND '{end_date}'
+                WHERE d.DATE_ACTUAL BETWEEN %(start_date)s AND %(end_date)s
                 GROUP BY d.DATE_ACTUAL, d.DAY_OF_WEEK_NAME, d.IS_WEEKEND, d.IS_HOLIDAY
                 ORDER BY d.DATE_ACTUAL
             """
             
-            df = pd.read_sql(query, self.conn)
-            df['date_actual'] = pd.to_datetime(df['date_actual'])
-            return df
+            # Widening the range only fetches the days not seen before
+            return self.query_layer.query_daily(query, start_date, end_date, 'date_actual')
             
         except Exception as e:
             st.error(f"Error fetching daily sales data: {str(e)}")
@@ -100,7 +108,7 @@ class SalesDashboard:
     def get_sales_rep_performance(self, start_date: date, end_date: date):
         """Get sales representative performance data"""
         try:
-            query = f"""
+            query = """
                 SELECT 
                     sr.SALES_REP_NAME,
                     sr.TERRITORY_NAME,
@@ -114,13 +122,13 @@ class SalesDashboard:
                 FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
                 JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_REP_DIM sr ON sf.SALES_REP_KEY = sr.SALES_REP_KEY
                 JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
-                WHERE d.DATE_ACTUAL BETWEEN '{start_date}' AND '{end_date}'
+                WHERE d.DATE_ACTUAL BETWEEN %(start_date)s AND %(end_date)s
                   AND sr.IS_CURRENT = TRUE
                 GROUP BY sr.SALES_REP_NAME, sr.TERRITORY_NAME, sr.REGION
                 ORDER BY total_revenue DESC
             """
             
-            df = pd.read_sql(query, self.conn)
+            df = self.query_layer.query(query, {'start_date': start_date, 'end_date': end_date})
             return df
             
         except Exception as e:
@@ -130,8 +138,9 @@ class SalesDashboard:
     def get_product_performance(self, start_date: date, end_date: date, limit: int = 20):
         """Get top performing products"""
         try:
-            query = f"""
+            query = """
                 SELECT 
+                    p.PRODUCT_ID,
                     p.PRODUCT_NAME,
                     p.CATEGORY_NAME,
                     p.SUPPLIER_NAME,
@@ -144,24 +153,50 @@ class SalesDashboard:
                 FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
                 JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.PRODUCT_DIM p ON sf.PRODUCT_KEY = p.PRODUCT_KEY
                 JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
-                WHERE d.DATE_ACTUAL BETWEEN '{start_date}' AND '{end_date}'
+                WHERE d.DATE_ACTUAL BETWEEN %(start_date)s AND %(end_date)s
                   AND p.IS_CURRENT = TRUE
-                GROUP BY p.PRODUCT_NAME, p.CATEGORY_NAME, p.SUPPLIER_NAME
+                GROUP BY p.PRODUCT_ID, p.PRODUCT_NAME, p.CATEGORY_NAME, p.SUPPLIER_NAME
                 ORDER BY total_revenue DESC
-                LIMIT {limit}
+                LIMIT %(limit)s
             """
             
-            df = pd.read_sql(query, self.conn)
+            df = self.query_layer.query(query, {'start_date': start_date, 'end_date': end_date, 'limit': limit})
             return df
             
         except Exception as e:
             st.error(f"Error fetching product performance data: {str(e)}")
             return pd.DataFrame()
     
+    def get_frequently_bought_with(self, product_id: int, limit: int = 10):
+        """Get precomputed co-purchase recommendations for a product"""
+        try:
+            query = """
+                SELECT 
+                    r.RECOMMENDATION_RANK as recommendation_rank,
+                    p.PRODUCT_NAME as product_name,
+                    p.CATEGORY_NAME as category_name,
+                    r.CO_OCCURRENCE_COUNT as co_occurrence_count,
+                    r.CONFIDENCE as confidence,
+                    r.LIFT as lift
+                FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.PRODUCT_RECOMMENDATIONS r
+                JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.PRODUCT_DIM p 
+                    ON r.RECOMMENDED_PRODUCT_ID = p.PRODUCT_ID AND p.IS_CURRENT = TRUE
+                WHERE r.PRODUCT_ID = %(product_id)s
+                  AND r.RECOMMENDATION_RANK <= %(limit)s
+                ORDER BY r.RECOMMENDATION_RANK
+            """
+            
+            df = self.query_layer.query(query, {'product_id': int(product_id), 'limit': int(limit)})
+            return df
+            
+        except Exception as e:
+            st.error(f"Error fetching product recommendations: {str(e)}")
+            return pd.DataFrame()
+    
     def get_customer_analysis(self, start_date: date, end_date: date):
         """Get customer analysis data"""
         try:
-            query = f"""
+            query = """
                 SELECT 
                     c.SEGMENT_NAME,
                     c.CUSTOMER_TYPE,
@@ -173,13 +208,13 @@ class SalesDashboard:
                 FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
                 JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.CUSTOMER_DIM c ON sf.CUSTOMER_KEY = c.CUSTOMER_KEY
                 JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
-                WHERE d.DATE_ACTUAL BETWEEN '{start_date}' AND '{end_date}'
+                WHERE d.DATE_ACTUAL BETWEEN %(start_date)s AND %(end_date)s
                   AND c.IS_CURRENT = TRUE
                 GROUP BY c.SEGMENT_NAME, c.CUSTOMER_TYPE
                 ORDER BY total_revenue DESC
             """
             
-            df = pd.read_sql(query, self.conn)
+            df = self.query_layer.query(query, {'start_date': start_date, 'end_date': end_date})
             return df
             
         except Exception as e:
@@ -189,7 +224,7 @@ class SalesDashboard:
     def get_monthly_comparison(self, year: int):
         """Get monthly sales comparison for the year"""
         try:
-            query = f"""
+            query = """
                 SELECT 
                     d.MONTH_NUMBER,
                     d.MONTH_NAME,
@@ -199,18 +234,135 @@ class SalesDashboard:
                     AVG(sf.LINE_TOTAL) as avg_order_value
                 FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
                 JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
-                WHERE d.YEAR_NUMBER = {year}
+                WHERE d.YEAR_NUMBER = %(year)s
                 GROUP BY d.MONTH_NUMBER, d.MONTH_NAME
                 ORDER BY d.MONTH_NUMBER
             """
             
-            df = pd.read_sql(query, self.conn)
+            df = self.query_layer.query(query, {'year': year})
             return df
             
         except Exception as e:
             st.error(f"Error fetching monthly comparison data: {str(e)}")
             return pd.DataFrame()
     
+    # GROUPING_ID bits are set for the aggregated-away columns (date, rep, product, segment)
+    CUBE_PANELS = {'overview': 15, 'daily': 7, 'reps': 11, 'products': 13, 'customers': 14}
+    
+    def get_dashboard_cube(self, start_date: date, end_date: date):
+        """Get every panel's aggregates for the date range in a single scan of SALES_FACT"""
+        try:
+            # Distinct counts are not additive, so each panel gets its own grouping set rather than
+            # rolling up a fine-grained date x product x rep x segment cube. The sets are totals for the
+            # whole range, so any change to the range is a new query; only section toggles are served
+            # from the cached result. Dimensions are left-joined with IS_CURRENT in the join so rows
+            # without a current dimension member still count towards the overview and daily trend.
+            query = """
+                SELECT 
+                    GROUPING_ID(d.DATE_ACTUAL, sr.SALES_REP_NAME, p.PRODUCT_ID, c.SEGMENT_NAME) as grouping_id,
+                    d.DATE_ACTUAL,
+                    d.DAY_OF_WEEK_NAME,
+                    d.IS_WEEKEND,
+                    d.IS_HOLIDAY,
+                    sr.SALES_REP_NAME,
+                    sr.TERRITORY_NAME,
+                    sr.REGION,
+                    p.PRODUCT_ID,
+                    p.PRODUCT_NAME,
+                    p.CATEGORY_NAME,
+                    p.SUPPLIER_NAME,
+                    c.SEGMENT_NAME,
+                    c.CUSTOMER_TYPE,
+                    COUNT(DISTINCT sf.ORDER_ID) as total_orders,
+                    COUNT(DISTINCT sf.CUSTOMER_KEY) as unique_customers,
+                    COUNT(DISTINCT sf.PRODUCT_KEY) as products_sold,
+                    SUM(sf.LINE_TOTAL) as total_revenue,
+                    SUM(sf.PROFIT) as total_profit,
+                    AVG(sf.LINE_TOTAL) as avg_order_value,
+                    SUM(sf.QUANTITY) as total_units_sold,
+                    AVG(sf.UNIT_PRICE) as avg_selling_price
+                FROM RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_FACT sf
+                JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.DATE_DIM d ON sf.ORDER_DATE_KEY = d.DATE_KEY
+                LEFT JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.SALES_REP_DIM sr 
+                    ON sf.SALES_REP_KEY = sr.SALES_REP_KEY AND sr.IS_CURRENT = TRUE
+                LEFT JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.PRODUCT_DIM p 
+                    ON sf.PRODUCT_KEY = p.PRODUCT_KEY AND p.IS_CURRENT = TRUE
+                LEFT JOIN RETAILWORKS_DB.ANALYTICS_SCHEMA.CUSTOMER_DIM c 
+                    ON sf.CUSTOMER_KEY = c.CUSTOMER_KEY AND c.IS_CURRENT = TRUE
+                WHERE d.DATE_ACTUAL BETWEEN %(start_date)s AND %(end_date)s
+                GROUP BY GROUPING SETS (
+                    (),
+                    (d.DATE_ACTUAL, d.DAY_OF_WEEK_NAME, d.IS_WEEKEND, d.IS_HOLIDAY),
+                    (sr.SALES_REP_NAME, sr.TERRITORY_NAME, sr.REGION),
+                    (p.PRODUCT_ID, p.PRODUCT_NAME, p.CATEGORY_NAME, p.SUPPLIER_NAME),
+                    (c.SEGMENT_NAME, c.CUSTOMER_TYPE)
+                )
+            """
+            
+            return self.query_layer.query(query, {'start_date': start_date, 'end_date': end_date})
+            
+        except Exception as e:
+            st.error(f"Error fetching sales dashboard data: {str(e)}")
+            return pd.DataFrame()
+    
+    def split_dashboard_cube(self, cube: pd.DataFrame, product_limit: int = 20):
+        """Derive each panel's data from the single-scan cube"""
+        if cube.empty:
+            return {'overview': None, 'daily': pd.DataFrame(), 'reps': pd.DataFrame(),
+                    'products': pd.DataFrame(), 'customers': pd.DataFrame()}
+        
+        cube = cube.assign(
+            profit_margin_percent=(cube['total_profit'] / cube['total_revenue'].where(cube['total_revenue'] != 0) * 100).round(2)
+        )
+        panels = {name: cube[cube['grouping_id'] == grouping_id] for name, grouping_id in self.CUBE_PANELS.items()}
+        
+        overview = panels['overview'][[
+            'total_orders', 'unique_customers', 'total_revenue', 'total_profit', 'avg_order_value',
+            'total_units_sold', 'products_sold', 'profit_margin_percent'
+        ]]
+        
+        daily = panels['daily'].rename(columns={
+            'total_orders': 'daily_orders', 'total_revenue': 'daily_revenue',
+            'total_profit': 'daily_profit', 'total_units_sold': 'units_sold'
+        })[[
+            'date_actual', 'day_of_week_name', 'is_weekend', 'is_holiday', 'daily_orders',
+            'daily_revenue', 'daily_profit', 'avg_order_value', 'units_sold'
+        ]].sort_values('date_actual')
+        daily['date_actual'] = pd.to_datetime(daily['date_actual'])
+        
+        # Rows whose dimension member is not current fall into a NULL group, as the inner joins dropped them
+        reps = panels['reps'].dropna(subset=['sales_rep_name'])[[
+            'sales_rep_name', 'territory_name', 'region', 'total_orders', 'unique_customers',
+            'total_revenue', 'total_profit', 'avg_order_value', 'profit_margin_percent'
+        ]].sort_values('total_revenue', ascending=False)
+        
+        products = panels['products'].dropna(subset=['product_id']).rename(
+            columns={'total_orders': 'orders_count'}
+        ).nlargest(product_limit, 'total_revenue')[[
+            'product_id', 'product_name', 'category_name', 'supplier_name', 'total_units_sold',
+            'total_revenue', 'total_profit', 'avg_selling_price', 'orders_count', 'profit_margin_percent'
+        ]]
+        products['product_id'] = products['product_id'].astype('int64')
+        
+        customers = panels['customers'].dropna(subset=['segment_name']).rename(
+            columns={'unique_customers': 'customer_count'}
+        )
+        customers['revenue_per_customer'] = (
+            customers['total_revenue'] / customers['customer_count'].where(customers['customer_count'] != 0)
+        ).round(2)
+        customers = customers[[
+            'segment_name', 'customer_type', 'customer_count', 'total_orders', 'total_revenue',
+            'avg_order_value', 'revenue_per_customer'
+        ]].sort_values('total_revenue', ascending=False)
+        
+        return {
+            'overview': overview.iloc[0] if len(overview) > 0 else None,
+            'daily': daily.reset_index(drop=True),
+            'reps': reps.reset_index(drop=True),
+            'products': products.reset_index(drop=True),
+            'customers': customers.reset_index(drop=True)
+        }
+    
     def render_sales_overview(self, overview_data):
         """Render sales overview KPIs"""
         if overview_data is None:
@@ -291,6 +443,14 @@ class SalesDashboard:
                 'Daily Revenue vs Orders'
             )
             st.plotly_chart(fig, use_container_width=True)
+            
+            # Long ranges are downsampled for the chart; the export keeps every day
+            st.download_button(
+                "Download daily sales (CSV)",
+                daily_data.to_csv(index=False),
+                file_name="daily_sales.csv",
+                mime="text/csv"
+            )
         
         with tab2:
             # Orders by day of week
@@ -373,14 +533,14 @@ class SalesDashboard:
         
         with col2:
             # Performance scatter plot
-            fig = px.scatter(
+            fig = create_scatter_plot(
                 rep_data,
-                x='total_orders',
-                y='avg_order_value',
-                size='total_revenue',
-                color='profit_margin_percent',
-                hover_name='sales_rep_name',
+                'total_orders',
+                'avg_order_value',
+                size_col='total_revenue',
+                color_col='profit_margin_percent',
                 title='Orders vs AOV (Size = Revenue, Color = Margin)',
+                hover_name='sales_rep_name',
                 labels={
                     'total_orders': 'Number of Orders',
                     'avg_order_value': 'Average Order Value ($)',
@@ -394,10 +554,10 @@ class SalesDashboard:
         
         # Format data for display
         display_data = rep_data.copy()
-        display_data['total_revenue'] = display_data['total_revenue'].apply(format_currency)
-        display_data['total_profit'] = display_data['total_profit'].apply(format_currency)
-        display_data['avg_order_value'] = display_data['avg_order_value'].apply(format_currency)
-        display_data['profit_margin_percent'] = display_data['profit_margin_percent'].apply(lambda x: f"{x:.1f}%")
+        display_data['total_revenue'] = format_currency_series(display_data['total_revenue'])
+        display_data['total_profit'] = format_currency_series(display_data['total_profit'])
+        display_data['avg_order_value'] = format_currency_series(display_data['avg_order_value'])
+        display_data['profit_margin_percent'] = format_percentage_series(display_data['profit_margin_percent'])
         
         st.dataframe(
             display_data,
@@ -413,7 +573,9 @@ class SalesDashboard:
         
         st.subheader("🛍️ Product Performance Analysis")
         
-        tab1, tab2, tab3 = st.tabs(["Top Products", "Category Analysis", "Profitability"])
+        tab1, tab2, tab3, tab4 = st.tabs(
+            ["Top Products", "Category Analysis", "Profitability", "Frequently Bought With"]
+        )
         
         with tab1:
             col1, col2 = st.columns(2)
@@ -473,14 +635,14 @@ class SalesDashboard:
         
         with tab3:
             # Profitability analysis
-            fig = px.scatter(
+            fig = create_scatter_plot(
                 product_data,
-                x='total_revenue',
-                y='profit_margin_percent',
-                size='total_units_sold',
-                color='category_name',
-                hover_name='product_name',
+                'total_revenue',
+                'profit_margin_percent',
+                size_col='total_units_sold',
+                color_col='category_name',
                 title='Revenue vs Profit Margin (Size = Units Sold)',
+                hover_name='product_name',
                 labels={
                     'total_revenue': 'Revenue ($)',
                     'profit_margin_percent': 'Profit Margin (%)',
@@ -488,6 +650,24 @@ class SalesDashboard:
                 }
             )
             st.plotly_chart(fig, use_container_width=True)
+        
+        with tab4:
+            # Co-purchase neighbours precomputed by the recommendation model
+            product_names = dict(zip(product_data['product_id'], product_data['product_name']))
+            product_id = st.selectbox(
+                "Product",
+                options=list(product_names),
+                format_func=product_names.get
+            )
+            recommendations = self.get_frequently_bought_with(product_id)
+            
+            if recommendations.empty:
+                st.info("No co-purchase recommendations for this product yet")
+            else:
+                display_data = recommendations.copy()
+                display_data['confidence'] = format_percentage_series(display_data['confidence'] * 100)
+                display_data['lift'] = display_data['lift'].round(2)
+                st.dataframe(display_data, hide_index=True)
     
     def render_customer_analysis(self, customer_data):
         """Render customer segment analysis"""
@@ -523,12 +703,63 @@ class SalesDashboard:
         st.subheader("Customer Segment Metrics")
         
         display_data = customer_data.copy()
-        display_data['total_revenue'] = display_data['total_revenue'].apply(format_currency)
-        display_data['avg_order_value'] = display_data['avg_order_value'].apply(format_currency)
-        display_data['revenue_per_customer'] = display_data['revenue_per_customer'].apply(format_currency)
+        display_data['total_revenue'] = format_currency_series(display_data['total_revenue'])
+        display_data['avg_order_value'] = format_currency_series(display_data['avg_order_value'])
+        display_data['revenue_per_customer'] = format_currency_series(display_data['revenue_per_customer'])
         
         st.dataframe(display_data, hide_index=True)
     
+    def load_sections(self, loaders, start_date: date, end_date: date):
+        """
+        Run each loader the first time its section is viewed for a date range, reusing the result on later reruns
+        
+        Args:
+            loaders (dict): Zero-argument callables keyed by section name
+            start_date (date): First day of the selected range
+            end_date (date): Last day of the selected range
+        
+        Returns:
+            Dict of each section's data under its name
+        """
+        memo = st.session_state.get(self.SESSION_KEY)
+        if memo is None or memo['range'] != (start_date, end_date):
+            # Only the current range is kept, so a session holds at most one copy of each section
+            memo = {'range': (start_date, end_date), 'sections': {}}
+            st.session_state[self.SESSION_KEY] = memo
+        
+        missing = {name: loader for name, loader in loaders.items() if name not in memo['sections']}
+        loaded = load_concurrently(missing)
+        for name, result in loaded.items():
+            # Getters return None or an empty frame on errors, which should be retried on the next rerun
+            if result is not None and not (isinstance(result, pd.DataFrame) and result.empty):
+                memo['sections'][name] = result
+        
+        return {name: loaded[name] if name in loaded else memo['sections'][name] for name in loaders}
+    
+    def warm_default_views(self, single_scan: bool = False, as_of: Optional[date] = None):
+        """
+        Run the queries behind the default date range so the first visitors hit the cache
+        
+        Args:
+            single_scan (bool): Also run the combined single-scan query
+            as_of (date): Day the default range ends on, defaults to today; a warming job running
+                before midnight passes the next day so its keys match the visitors' ranges
+        """
+        end_date = as_of or date.today()
+        start_date = end_date - timedelta(days=self.DEFAULT_RANGE_DAYS)
+        
+        views = {
+            'overview': self.get_sales_overview_data(start_date, end_date),
+            # The default section; its days are shared through the disk tier like the other results
+            'daily': self.get_daily_sales_data(start_date, end_date),
+            'reps': self.get_sales_rep_performance(start_date, end_date),
+            'products': self.get_product_performance(start_date, end_date),
+            'customers': self.get_customer_analysis(start_date, end_date)
+        }
+        if single_scan:
+            views['cube'] = self.get_dashboard_cube(start_date, end_date)
+        return views
+    
     def run(self):
         """Main dashboard function"""
         st.title("💰 RetailWorks Sales Dashboard")
@@ -540,7 +771,7 @@ class SalesDashboard:
         # Date range picker
         col1, col2 = st.sidebar.columns(2)
         with col1:
-            start_date = st.date_input("Start Date", value=date.today() - timedelta(days=30))
+            start_date = st.date_input("Start Date", value=date.today() - timedelta(days=self.DEFAULT_RANGE_DAYS))
         with col2:
             end_date = st.date_input("End Date", value=date.today())
         
@@ -550,9 +781,15 @@ class SalesDashboard:
         show_reps = st.sidebar.checkbox("Show Sales Rep Performance", value=True)
         show_products = st.sidebar.checkbox("Show Product Analysis", value=True)
         show_customers = st.sidebar.checkbox("Show Customer Analysis", value=True)
+        # Off by default: per-section queries reuse cached days when the range is widened and only run
+        # for the sections viewed, while the combined query rescans the whole range on every change
+        single_scan = st.sidebar.checkbox("Single-scan loading", value=False,
+                                          help="Load every section from one combined query")
         
         # Refresh button
         if st.sidebar.button("🔄 Refresh Data"):
+            self.query_layer.clear()
+            st.session_state.pop(self.SESSION_KEY, None)
             st.rerun()
         
         # Validate date range
@@ -560,40 +797,54 @@ class SalesDashboard:
             st.error("Start date must be before end date")
             return
         
-        # Load data
-        with st.spinner("Loading sales data..."):
-            overview_data = self.get_sales_overview_data(start_date, end_date)
-            
-            if show_trends:
-                daily_data = self.get_daily_sales_data(start_date, end_date)
-            
-            if show_reps:
-                rep_data = self.get_sales_rep_performance(start_date, end_date)
-            
-            if show_products:
-                product_data = self.get_product_performance(start_date, end_date)
-            
-            if show_customers:
-                customer_data = self.get_customer_analysis(start_date, end_date)
-        
-        # Render dashboard sections
-        self.render_sales_overview(overview_data)
-        
+        # Sections in display order: (name, loader, renderer)
+        sections = {}
         if show_trends:
-            st.markdown("---")
-            self.render_daily_trends(daily_data)
+            sections["📈 Daily Trends"] = ('daily', lambda: self.get_daily_sales_data(start_date, end_date), self.render_daily_trends)
         
         if show_reps:
-            st.markdown("---")
-            self.render_sales_rep_performance(rep_data)
+            sections["👥 Sales Reps"] = ('reps', lambda: self.get_sales_rep_performance(start_date, end_date), self.render_sales_rep_performance)
         
         if show_products:
-            st.markdown("---")
-            self.render_product_analysis(product_data)
+            sections["🛍️ Products"] = ('products', lambda: self.get_product_performance(start_date, end_date), self.render_product_analysis)
         
         if show_customers:
-            st.markdown("---")
-            self.render_customer_analysis(customer_data)
+            sections["👤 Customers"] = ('customers', lambda: self.get_customer_analysis(start_date, end_date), self.render_customer_analysis)
+        
+        # The overview renders above the section picker but waits for the picker to know what to load
+        overview_container = st.container()
+        
+        if single_scan:
+            # One scan serves every panel, so every enabled section is shown stacked
+            shown = list(sections.values())
+            with st.spinner("Loading sales data..."):
+                cube = self.load_sections(
+                    {'cube': lambda: self.get_dashboard_cube(start_date, end_date)}, start_date, end_date
+                )['cube']
+                data = self.split_dashboard_cube(cube)
+        else:
+            # Only the selected section is rendered, so only its query runs
+            shown = []
+            if sections:
+                st.markdown("---")
+                # A radio rather than st.tabs: Streamlit runs every tab's body on each rerun
+                selected = st.radio("Section", list(sections), horizontal=True, label_visibility="collapsed")
+                shown = [sections[selected]]
+            
+            with st.spinner("Loading sales data..."):
+                # The overview and the selected section load concurrently the first time they are viewed
+                loaders = {'overview': lambda: self.get_sales_overview_data(start_date, end_date)}
+                loaders.update({name: loader for name, loader, _ in shown})
+                data = self.load_sections(loaders, start_date, end_date)
+        
+        # Render dashboard sections
+        with overview_container:
+            self.render_sales_overview(data['overview'])
+        
+        for name, _, render_section in shown:
+            if single_scan:
+                st.markdown("---")
+            render_section(data[name])
         
         # Footer
         st.markdown("---")
@@ -0,0 +1,190 @@
+"""
+Chart Utilities Tests
+Description: Unit tests for chart downsampling, value formatting and figure caching
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add utils to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+pytest.importorskip("plotly")
+pytest.importorskip("streamlit")
+
+import plotly.io as pio
+from chart_utils import (
+    BASE_TEMPLATE, _figure_cache, clear_figure_cache, create_bar_chart, downsample_lttb, format_currency,
+    format_currency_series, format_number, format_number_series, format_percentage, format_percentage_series,
+    lttb_indices
+)
+
+class TestLTTB:
+    """Test largest-triangle-three-buckets downsampling"""
+
+    @pytest.fixture
+    def series(self):
+        """Noisy daily revenue with a single sharp peak"""
+        rng = np.random.default_rng(42)
+        y = 1000 + rng.normal(0, 10, 5000)
+        y[3217] = 5000
+        return pd.DataFrame({'date': pd.date_range('2020-01-01', periods=5000, freq='D'), 'revenue': y})
+
+    def test_keeps_requested_count_in_order(self, series):
+        """Test exactly n_out strictly increasing positions are returned"""
+        kept = lttb_indices(series['date'], series['revenue'], 500)
+
+        assert len(kept) == 500
+        assert np.all(np.diff(kept) > 0)
+
+    def test_keeps_endpoints(self, series):
+        """Test the first and last points are always kept"""
+        kept = lttb_indices(series['date'], series['revenue'], 100)
+
+        assert kept[0] == 0
+        assert kept[-1] == len(series) - 1
+
+    def test_preserves_peak(self, series):
+        """Test a single extreme point survives where striding would drop it"""
+        kept = lttb_indices(series['date'], series['revenue'], 200)
+
+        assert 3217 in kept
+        assert 3217 not in np.arange(0, len(series), len(series) // 200)
+
+    def test_accepts_date_objects(self, series):
+        """Test Snowflake DATE columns of datetime.date objects are bucketed like datetimes"""
+        kept = lttb_indices(series['date'].dt.date, series['revenue'], 200)
+
+        np.testing.assert_array_equal(kept, lttb_indices(series['date'], series['revenue'], 200))
+
+    def test_short_series_unchanged(self, series):
+        """Test series within the budget are returned as is"""
+        np.testing.assert_array_equal(lttb_indices(series['date'][:50], series['revenue'][:50], 100), np.arange(50))
+        assert downsample_lttb(series, 'date', 'revenue', max_points=len(series)) is series
+
+    def test_downsample_keeps_each_line(self, series):
+        """Test every line keeps its own extremes from a share of the budget"""
+        series['orders'] = 50.0
+        series.loc[1234, 'orders'] = 900.0
+
+        sampled = downsample_lttb(series, 'date', ['revenue', 'orders'], max_points=400)
+
+        assert len(sampled) <= 400
+        assert {1234, 3217} <= set(sampled.index)
+        assert sampled['date'].is_monotonic_increasing
+        assert len(series) == 5000
+
+class TestSeriesFormatters:
+    """Test the vectorized formatters match the scalar ones value for value"""
+
+    @pytest.fixture
+    def values(self):
+        """Values across every suffix tier, including half-way and tier-boundary rounding cases"""
+        rng = np.random.default_rng(7)
+        edge_cases = [
+            0.5, 1.5, 2.5, 999.5, 999.95, -999.5, -0.4, 0.0, -0.0,
+            1e3, 999949.9, 999950, 1e6, 999950000, 1e9, 999.95e9, np.inf, -np.inf, np.nan
+        ]
+        return pd.Series(np.concatenate([
+            rng.uniform(-1, 1, 20000) * 10.0 ** rng.integers(0, 12, 20000),
+            np.round(rng.uniform(-2000, 2000, 10000), 2),
+            np.arange(-2000, 2000) + 0.5,
+            np.arange(-2000, 2000) * 0.05,
+            edge_cases
+        ]))
+
+    @pytest.mark.parametrize('symbol', ['$', '€'])
+    def test_currency_matches_scalar(self, values, symbol):
+        """Test format_currency_series agrees with format_currency"""
+        expected = [format_currency(value, symbol) for value in values]
+
+        assert format_currency_series(values, symbol).tolist() == expected
+
+    def test_number_matches_scalar(self, values):
+        """Test format_number_series agrees with format_number"""
+        assert format_number_series(values).tolist() == [format_number(value) for value in values]
+
+    @pytest.mark.parametrize('decimal_places', [0, 1, 2])
+    def test_percentage_matches_scalar(self, values, decimal_places):
+        """Test format_percentage_series agrees with format_percentage"""
+        expected = [format_percentage(value, decimal_places) for value in values]
+
+        assert format_percentage_series(values, decimal_places).tolist() == expected
+
+    def test_keeps_series_index_and_accepts_arrays(self):
+        """Test Series results keep their index and arrays return arrays"""
+        values = pd.Series([1250.0, None], index=['west', 'east'])
+
+        result = format_currency_series(values)
+
+        assert result.to_dict() == {'west': '$1.2K', 'east': '$0'}
+        assert list(format_number_series(np.array([12.0, 3.4e6]))) == ['12', '3.4M']
+
+class TestCachedFigure:
+    """Test chart builders reuse cached figure specs"""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self):
+        """Start every test with no cached figures"""
+        clear_figure_cache()
+        yield
+        clear_figure_cache()
+
+    @pytest.fixture
+    def sales(self):
+        """Revenue by region"""
+        return pd.DataFrame({'region': ['West', 'East', 'North'], 'revenue': [120.0, 80.0, 95.0]})
+
+    def test_returns_independent_figures(self, sales):
+        """Test a cached figure can be modified without changing later ones"""
+        first = create_bar_chart(sales, 'region', 'revenue', title="Revenue")
+        first.update_layout(title="Changed")
+        first.data[0].y = (0, 0, 0)
+
+        second = create_bar_chart(sales, 'region', 'revenue', title="Revenue")
+
+        assert len(_figure_cache) == 1
+        assert second is not first
+        assert second.layout.title.text == "Revenue"
+        assert list(second.data[0].y) == [120.0, 80.0, 95.0]
+
+    def test_changed_data_misses(self, sales):
+        """Test a frame with different values builds a new figure"""
+        create_bar_chart(sales, 'region', 'revenue')
+        changed = sales.assign(revenue=[120.0, 80.0, 96.0])
+
+        fig = create_bar_chart(changed, 'region', 'revenue')
+
+        assert len(_figure_cache) == 2
+        assert list(fig.data[0].y) == [120.0, 80.0, 96.0]
+
+    def test_changed_theme_misses(self, sales):
+        """Test each theme is cached separately"""
+        default = create_bar_chart(sales, 'region', 'revenue')
+        dark = create_bar_chart(sales, 'region', 'revenue', theme="dark")
+
+        assert len(_figure_cache) == 2
+        assert default.layout.template.layout.paper_bgcolor != dark.layout.template.layout.paper_bgcolor
+
+    def test_unhashable_cells_build_uncached(self, sales):
+        """Test frames holding lists or dicts still chart, without being cached"""
+        sales['tags'] = [['online'], ['store'], {'channel': 'mixed'}]
+
+        fig = create_bar_chart(sales, 'region', 'revenue', theme="dark")
+
+        assert list(fig.data[0].y) == [120.0, 80.0, 95.0]
+        assert len(_figure_cache) == 0
+
+    def test_builders_only_set_transparent_backgrounds(self, sales):
+        """Test unthemed charts keep plotly's default fonts and grid colours"""
+        fig = create_bar_chart(sales, 'region', 'revenue')
+        template = fig.layout.template.layout
+
+        assert template.plot_bgcolor == template.paper_bgcolor == 'rgba(0,0,0,0)'
+        assert template.font == pio.templates['plotly'].layout.font
+        assert template.xaxis.gridcolor == pio.templates['plotly'].layout.xaxis.gridcolor
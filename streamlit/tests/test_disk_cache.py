@@ -0,0 +1,107 @@
+"""
+Disk Cache Tests
+Description: Unit tests for the Parquet result cache shared across dashboard replicas
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pytest
+import pandas as pd
+import time
+import sys
+import os
+
+# Add utils to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+pytest.importorskip("pyarrow")
+
+from disk_cache import DiskCache
+
+def frame(rows=100):
+    """Small result with numeric and string columns"""
+    return pd.DataFrame({'region': ['West'] * rows, 'total_revenue': [float(i) for i in range(rows)]})
+
+def set_mtime(cache, key, mtime):
+    """Backdate a cache file's last access"""
+    os.utime(cache._path(key), (mtime, mtime))
+
+class TestDiskCache:
+    """Test atomic writes, expiry metadata and least recently used eviction"""
+
+    def test_round_trip_keeps_data_and_remaining_ttl(self, tmp_path):
+        """Test a stored result is read back with the lifetime left from its metadata"""
+        cache = DiskCache(str(tmp_path))
+        cache.put('sales', frame(), ttl=120)
+
+        df, remaining = cache.get('sales')
+
+        pd.testing.assert_frame_equal(df, frame())
+        assert 110 < remaining <= 120
+
+    def test_expiry_is_stored_in_file_metadata(self, tmp_path):
+        """Test a second cache over the same directory honours the expiry written by the first"""
+        DiskCache(str(tmp_path), default_ttl=60).put('sales', frame())
+
+        _, remaining = DiskCache(str(tmp_path), default_ttl=1).get('sales')
+
+        assert remaining > 50
+
+    def test_expired_entry_is_a_miss_left_for_eviction(self, tmp_path):
+        """Test an expired entry is not served and its file is not deleted by the read"""
+        cache = DiskCache(str(tmp_path))
+        cache.put('sales', frame(), ttl=0.05)
+        time.sleep(0.1)
+
+        assert cache.get('sales') is None
+        assert os.path.exists(cache._path('sales'))
+
+    def test_write_leaves_no_temporary_files(self, tmp_path):
+        """Test results are renamed into place, leaving only complete Parquet files"""
+        cache = DiskCache(str(tmp_path))
+        cache.put('sales', frame())
+        cache.put('sales', frame(10))
+
+        assert sorted(os.listdir(tmp_path)) == ['sales.parquet']
+        assert len(cache.get('sales')[0]) == 10
+
+    def test_failed_write_keeps_previous_entry(self, tmp_path):
+        """Test a result that cannot be written leaves the existing file intact and no temporary file"""
+        cache = DiskCache(str(tmp_path))
+        cache.put('sales', frame())
+
+        cache.put('sales', pd.DataFrame({'mixed': [1, 'a']}))
+
+        assert sorted(os.listdir(tmp_path)) == ['sales.parquet']
+        assert len(cache.get('sales')[0]) == 100
+
+    def test_evicts_least_recently_used_by_mtime(self, tmp_path):
+        """Test files are removed oldest modification time first until the cache fits"""
+        cache = DiskCache(str(tmp_path))
+        for key in ['a', 'b', 'c']:
+            cache.put(key, frame())
+        now = time.time()
+        set_mtime(cache, 'a', now - 300)
+        set_mtime(cache, 'b', now - 200)
+        set_mtime(cache, 'c', now - 100)
+        cache.get('a')
+
+        # Sizes can differ by a byte with the length of the stored expiry, so budget exactly a and c
+        cache.max_bytes = os.path.getsize(cache._path('a')) + os.path.getsize(cache._path('c'))
+        removed = cache.evict()
+
+        assert removed == 1
+        assert not os.path.exists(cache._path('b'))
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+
+    def test_clear_deletes_every_entry(self, tmp_path):
+        """Test clear removes all cached files"""
+        cache = DiskCache(str(tmp_path))
+        cache.put('a', frame())
+        cache.put('b', frame())
+
+        cache.clear()
+
+        assert cache.get('a') is None
+        assert os.listdir(tmp_path) == []
@@ -0,0 +1,295 @@
+"""
+Query Cache Tests
+Description: Unit tests for the cached, parameterized dashboard query layer
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pytest
+import pandas as pd
+import threading
+import time
+import sys
+import os
+from contextlib import contextmanager
+from datetime import date
+
+# Add utils to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+pytest.importorskip("streamlit")
+pytest.importorskip("pyarrow")
+
+from disk_cache import DiskCache
+from query_cache import QueryCache, QueryLayer, cache_key, normalize_sql
+
+class StubPool:
+    """Connection pool whose cursors return a fixed result and count the queries run"""
+
+    def __init__(self, result=None, delay=0):
+        self.result = result if result is not None else pd.DataFrame({'TOTAL_REVENUE': [100.0, 250.0]})
+        self.delay = delay
+        self.executed = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        pool = self
+
+        class Cursor:
+            def execute(self, sql, params=None):
+                with pool._lock:
+                    pool.executed.append((sql, params))
+                time.sleep(pool.delay)
+
+            def fetch_pandas_all(self):
+                return pool.result.copy()
+
+            def close(self):
+                pass
+
+        class Connection:
+            def cursor(self):
+                return Cursor()
+
+        yield Connection()
+
+def frame(rows, text='x' * 50):
+    """DataFrame of object strings, whose deep memory usage grows with the row count"""
+    return pd.DataFrame({'name': [text] * rows})
+
+class TestCacheKey:
+    """Test query normalization and cache keys"""
+
+    def test_whitespace_and_comments_share_a_key(self):
+        """Test formatting and comment differences map to the same entry"""
+        compact = "SELECT SUM(LINE_TOTAL) FROM SALES_FACT WHERE REGION = %(region)s"
+        formatted = """
+            -- Revenue for one region
+            SELECT  SUM(LINE_TOTAL)   /* summed line totals */
+            FROM SALES_FACT
+            WHERE REGION = %(region)s;
+        """
+
+        assert normalize_sql(formatted) == compact
+        assert cache_key(formatted, {'region': 'West'}) == cache_key(compact, {'region': 'West'})
+
+    def test_string_literals_are_preserved(self):
+        """Test whitespace and comment markers inside literals still distinguish queries"""
+        assert normalize_sql("SELECT 'a  b'") == "SELECT 'a  b'"
+        assert normalize_sql("SELECT '-- not a comment' -- it's a comment") == "SELECT '-- not a comment'"
+        assert cache_key("SELECT 'a  b'") != cache_key("SELECT 'a b'")
+
+    def test_params_change_the_key(self):
+        """Test bound parameters are part of the key"""
+        sql = "SELECT * FROM SALES_FACT WHERE REGION = %(region)s"
+
+        assert cache_key(sql, {'region': 'West'}) != cache_key(sql, {'region': 'East'})
+
+    def test_version_changes_the_key(self):
+        """Test a new data version maps every query to a fresh entry"""
+        sql = "SELECT * FROM SALES_FACT"
+
+        assert cache_key(sql, version='2026-10-18') != cache_key(sql, version='2026-10-19')
+
+class TestQueryCache:
+    """Test memory-bounded LRU eviction and TTL expiry"""
+
+    def test_evicts_least_recently_used_by_memory(self):
+        """Test entries are evicted by deep memory use, oldest access first"""
+        size = int(frame(100).memory_usage(index=True, deep=True).sum())
+        cache = QueryCache(max_bytes=int(size * 2.5))
+        cache.put('a', frame(100))
+        cache.put('b', frame(100))
+        assert cache.get('a') is not None
+
+        cache.put('c', frame(100))
+
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+        assert cache.stats()['bytes'] <= cache.max_bytes
+
+    def test_deep_memory_counts_object_columns(self):
+        """Test long strings count towards the budget rather than just their pointers"""
+        cache = QueryCache(max_bytes=int(frame(100).memory_usage(index=True, deep=True).sum()) + 1)
+        cache.put('short', frame(100))
+
+        cache.put('long', frame(100, 'x' * 500))
+
+        assert cache.get('long') is None
+        assert cache.get('short') is not None
+
+    def test_entries_expire_after_ttl(self):
+        """Test an entry is served until its TTL passes, then dropped"""
+        cache = QueryCache(default_ttl=60)
+        cache.put('fresh', frame(1))
+        cache.put('stale', frame(1), ttl=0.05)
+
+        time.sleep(0.1)
+
+        assert cache.get('stale') is None
+        assert cache.get('fresh') is not None
+        assert cache.stats()['entries'] == 1
+
+class TestQueryLayer:
+    """Test cached query execution"""
+
+    def test_repeat_queries_hit_the_cache(self):
+        """Test equivalent queries run once against the warehouse"""
+        pool = StubPool()
+        layer = QueryLayer(pool, QueryCache())
+
+        first = layer.query("SELECT TOTAL_REVENUE FROM SALES_FACT", {'year': 2026})
+        second = layer.query("SELECT  TOTAL_REVENUE\nFROM SALES_FACT", {'year': 2026})
+
+        assert len(pool.executed) == 1
+        assert list(first.columns) == ['total_revenue']
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_query_returns_a_copy(self):
+        """Test callers can modify results without corrupting the cached entry"""
+        layer = QueryLayer(StubPool(), QueryCache())
+        result = layer.query("SELECT TOTAL_REVENUE FROM SALES_FACT")
+
+        result['total_revenue'] = 0.0
+        result['extra'] = 1
+
+        cached = layer.query("SELECT TOTAL_REVENUE FROM SALES_FACT")
+        assert cached['total_revenue'].tolist() == [100.0, 250.0]
+        assert 'extra' not in cached.columns
+
+    def test_concurrent_misses_run_one_query(self):
+        """Test sessions missing on the same key wait for a single warehouse query"""
+        pool = StubPool(delay=0.2)
+        layer = QueryLayer(pool, QueryCache())
+        results = []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(layer.query("SELECT TOTAL_REVENUE FROM SALES_FACT")))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(pool.executed) == 1
+        assert len(results) == 5
+        assert all(result['total_revenue'].tolist() == [100.0, 250.0] for result in results)
+
+    def test_failed_fetch_is_retried(self):
+        """Test an error reaches the caller and is not cached"""
+        def suspended(sql, params=None):
+            raise RuntimeError("warehouse suspended")
+
+        layer = QueryLayer(StubPool(), QueryCache())
+        layer.execute = suspended
+
+        with pytest.raises(RuntimeError):
+            layer.query("SELECT TOTAL_REVENUE FROM SALES_FACT")
+
+        del layer.execute
+        assert len(layer.query("SELECT TOTAL_REVENUE FROM SALES_FACT")) == 2
+
+    def test_clear_keeps_shared_disk_tier(self, tmp_path):
+        """Test a refresh drops this process's results but not the files other replicas read"""
+        pool = StubPool()
+        layer = QueryLayer(pool, QueryCache(), DiskCache(str(tmp_path)))
+        layer.query("SELECT TOTAL_REVENUE FROM SALES_FACT")
+
+        layer.clear()
+        layer.query("SELECT TOTAL_REVENUE FROM SALES_FACT")
+
+        assert len(pool.executed) == 1
+        assert layer.cache.stats()['entries'] == 1
+
+    def test_new_cache_version_misses_disk_tier(self, tmp_path):
+        """Test a layer with a newer data version ignores results cached under the old one"""
+        pool = StubPool()
+        QueryLayer(pool, QueryCache(), DiskCache(str(tmp_path)), cache_version='1').query("SELECT TOTAL_REVENUE FROM SALES_FACT")
+
+        QueryLayer(pool, QueryCache(), DiskCache(str(tmp_path)), cache_version='2').query("SELECT TOTAL_REVENUE FROM SALES_FACT")
+
+        assert len(pool.executed) == 2
+
+class TestDailyQueries:
+    """Test per-day caching of daily-grain queries"""
+
+    SQL = "SELECT DATE_ACTUAL, SUM(LINE_TOTAL) AS DAILY_REVENUE FROM SALES_FACT WHERE DATE_ACTUAL BETWEEN %(start_date)s AND %(end_date)s"
+
+    def make_layer(self, disk_cache=None, cache_version=''):
+        """Create a layer whose warehouse returns one row per requested day"""
+        layer = QueryLayer(StubPool(), QueryCache(), disk_cache, cache_version=cache_version)
+        layer.fetched = []
+
+        def execute(sql, params=None):
+            layer.fetched.append((params['start_date'], params['end_date']))
+            days = pd.date_range(params['start_date'], params['end_date'], freq='D')
+            return pd.DataFrame({'date_actual': days.date, 'daily_revenue': [float(d.day) for d in days]})
+
+        layer.execute = execute
+        return layer
+
+    @pytest.fixture
+    def layer(self):
+        """Create a layer with no disk tier"""
+        return self.make_layer()
+
+    def test_missing_runs_groups_contiguous_days(self, layer):
+        """Test uncached and expired days are returned as contiguous ranges"""
+        now = time.monotonic()
+        expires = {
+            date(2026, 1, 2): float('inf'),
+            date(2026, 1, 3): float('inf'),
+            date(2026, 1, 5): now - 1,
+            date(2026, 1, 7): now + 60
+        }
+
+        runs = layer._missing_runs(expires, date(2026, 1, 1), date(2026, 1, 8))
+
+        assert runs == [
+            (date(2026, 1, 1), date(2026, 1, 1)),
+            (date(2026, 1, 4), date(2026, 1, 6)),
+            (date(2026, 1, 8), date(2026, 1, 8))
+        ]
+
+    def test_widened_range_fetches_only_new_days(self, layer):
+        """Test widening a cached range queries just the days not already held"""
+        layer.query_daily(self.SQL, date(2025, 6, 15), date(2025, 6, 30), 'date_actual')
+        result = layer.query_daily(self.SQL, date(2025, 6, 1), date(2025, 6, 30), 'date_actual')
+
+        assert layer.fetched == [(date(2025, 6, 15), date(2025, 6, 30)), (date(2025, 6, 1), date(2025, 6, 14))]
+        assert len(result) == 30
+        assert result['date_actual'].is_monotonic_increasing
+
+    def test_daily_store_is_bounded(self, layer):
+        """Test least recently used daily results are evicted beyond daily_max_bytes"""
+        layer.daily_max_bytes = 1
+        layer.query_daily(self.SQL, date(2025, 6, 1), date(2025, 6, 30), 'date_actual', {'region': 'East'})
+        layer.query_daily(self.SQL, date(2025, 6, 1), date(2025, 6, 30), 'date_actual', {'region': 'West'})
+
+        assert len(layer._daily) == 1
+        layer.query_daily(self.SQL, date(2025, 6, 1), date(2025, 6, 30), 'date_actual', {'region': 'West'})
+        assert len(layer.fetched) == 2
+
+    def test_days_are_shared_through_the_disk_tier(self, tmp_path):
+        """Test a second layer, as in another replica or after a restart, reads the days from disk"""
+        first = self.make_layer(DiskCache(str(tmp_path)))
+        expected = first.query_daily(self.SQL, date(2025, 6, 1), date(2025, 6, 30), 'date_actual')
+
+        second = self.make_layer(DiskCache(str(tmp_path)))
+        result = second.query_daily(self.SQL, date(2025, 5, 25), date(2025, 6, 30), 'date_actual')
+
+        assert second.fetched == [(date(2025, 5, 25), date(2025, 5, 31))]
+        assert len(result) == 37
+        pd.testing.assert_frame_equal(result.iloc[7:].reset_index(drop=True), expected)
+
+    def test_new_cache_version_refetches_days(self, tmp_path):
+        """Test days cached on disk under an old version are not reused"""
+        self.make_layer(DiskCache(str(tmp_path)), '1').query_daily(self.SQL, date(2025, 6, 1), date(2025, 6, 30), 'date_actual')
+
+        layer = self.make_layer(DiskCache(str(tmp_path)), '2')
+        layer.query_daily(self.SQL, date(2025, 6, 1), date(2025, 6, 30), 'date_actual')
+
+        assert layer.fetched == [(date(2025, 6, 1), date(2025, 6, 30))]
@@ -0,0 +1,156 @@
+"""
+Snowflake Connection Tests
+Description: Unit tests for the pooled Snowflake connections shared by the dashboards
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pytest
+import threading
+import time
+import sys
+import os
+
+# Add utils to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+pytest.importorskip("snowflake.connector")
+pytest.importorskip("streamlit")
+
+import snowflake.connector
+from snowflake_connection import SnowflakeConnectionPool
+
+class StubCursor:
+    """Cursor whose health check result is controlled by its connection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.queries += 1
+        if self.conn.broken:
+            raise snowflake.connector.errors.OperationalError("connection reset")
+        if self.conn.query_delay:
+            time.sleep(self.conn.query_delay)
+
+    def close(self):
+        pass
+
+class StubConnection:
+    """In-memory stand-in for a Snowflake connection"""
+
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+        self.broken = False
+        self.query_delay = 0
+        self.queries = 0
+
+    def cursor(self):
+        return StubCursor(self)
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+class StubConnect:
+    """connect() replacement that records every connection it opens"""
+
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self, **options):
+        conn = StubConnection(f"conn-{len(self.opened)}")
+        self.opened.append(conn)
+        return conn
+
+class TestSnowflakeConnectionPool:
+    """Test connection reuse, limits and failure handling"""
+
+    @pytest.fixture
+    def connect(self):
+        """Create a stub connect function"""
+        return StubConnect()
+
+    def test_reuses_most_recently_returned_connection(self, connect):
+        """Test idle connections are handed out last in, first out"""
+        pool = SnowflakeConnectionPool(max_size=3, connect=connect)
+        first, second = pool.acquire(), pool.acquire()
+        pool.release(first)
+        pool.release(second)
+
+        assert pool.acquire() is second
+        assert pool.acquire() is first
+        assert len(connect.opened) == 2
+
+    def test_exhausted_pool_times_out(self, connect):
+        """Test acquire blocks while every connection is in use, then raises"""
+        pool = SnowflakeConnectionPool(max_size=1, acquire_timeout=0.2, connect=connect)
+        pool.acquire()
+
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            pool.acquire()
+        assert time.monotonic() - start >= 0.2
+
+    def test_waiter_gets_released_connection(self, connect):
+        """Test a blocked acquire receives a connection as soon as one is returned"""
+        pool = SnowflakeConnectionPool(max_size=1, acquire_timeout=5, connect=connect)
+        conn = pool.acquire()
+        threading.Timer(0.1, pool.release, args=(conn,)).start()
+
+        assert pool.acquire() is conn
+
+    def test_operational_error_discards_connection(self, connect):
+        """Test a connection that failed mid-query is closed rather than returned to the pool"""
+        pool = SnowflakeConnectionPool(max_size=2, connect=connect)
+
+        with pytest.raises(snowflake.connector.errors.OperationalError):
+            with pool.connection() as conn:
+                raise snowflake.connector.errors.OperationalError("network down")
+
+        assert conn.closed
+        assert pool.acquire() is not conn
+
+    def test_other_errors_return_connection(self, connect):
+        """Test query errors unrelated to the connection keep it in the pool"""
+        pool = SnowflakeConnectionPool(max_size=2, connect=connect)
+
+        with pytest.raises(ValueError):
+            with pool.connection() as conn:
+                raise ValueError("bad result")
+
+        assert pool.acquire() is conn
+
+    def test_unhealthy_idle_connection_is_replaced(self, connect):
+        """Test a stale connection failing its health check is discarded and a new one opened"""
+        pool = SnowflakeConnectionPool(max_size=1, health_check_interval=0, connect=connect)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.broken = True
+
+        replacement = pool.acquire()
+
+        assert replacement is not conn
+        assert conn.closed
+        assert len(connect.opened) == 2
+
+    def test_health_check_runs_outside_lock(self, connect):
+        """Test a slow health check does not block other threads returning connections"""
+        pool = SnowflakeConnectionPool(max_size=2, health_check_interval=0, connect=connect)
+        slow, other = pool.acquire(), pool.acquire()
+        pool.release(slow)
+        slow.query_delay = 0.5
+
+        checker = threading.Thread(target=pool.acquire)
+        checker.start()
+        time.sleep(0.1)
+        start = time.monotonic()
+        pool.release(other)
+        released_in = time.monotonic() - start
+        checker.join()
+
+        assert released_in < 0.1
+        assert slow.queries == 1
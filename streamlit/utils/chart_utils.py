@@ -7,12 +7,200 @@ Date: 2025-07-19
 
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 import pandas as pd
 import streamlit as st
 from datetime import datetime
+from functools import lru_cache, wraps
+from collections import OrderedDict
+import hashlib
+import threading
 import numpy as np
 
+# Line charts with more points than this are downsampled before being sent to the browser
+DEFAULT_POINT_BUDGET = 2000
+
+# Scatters with more points than this render through WebGL (Scattergl) rather than one SVG node per point
+WEBGL_POINT_THRESHOLD = 1000
+
+# Built figures kept per server process so reruns with unchanged data skip figure construction
+FIGURE_CACHE_SIZE = 64
+
+THEMES = {
+    "default": {
+        "plot_bgcolor": "rgba(0,0,0,0)",
+        "paper_bgcolor": "rgba(0,0,0,0)",
+        "font_family": "Arial, sans-serif",
+        "font_color": "#2E2E2E",
+        "gridcolor": "#E5E5E5"
+    },
+    "dark": {
+        "plot_bgcolor": "#2E2E2E",
+        "paper_bgcolor": "#1E1E1E",
+        "font_family": "Arial, sans-serif",
+        "font_color": "#FFFFFF",
+        "gridcolor": "#404040"
+    },
+    "minimal": {
+        "plot_bgcolor": "rgba(0,0,0,0)",
+        "paper_bgcolor": "rgba(0,0,0,0)",
+        "font_family": "Helvetica, sans-serif",
+        "font_color": "#333333",
+        "gridcolor": "#F0F0F0",
+        "showgrid": False
+    }
+}
+
+def _build_template(theme_config):
+    """Plotly template for a theme, layered over plotly's default template"""
+    template = go.layout.Template(pio.templates["plotly"])
+    show_grid = theme_config.get("showgrid", True)
+    axis = dict(gridcolor=theme_config["gridcolor"], showgrid=show_grid)
+    template.layout.update(
+        plot_bgcolor=theme_config["plot_bgcolor"],
+        paper_bgcolor=theme_config["paper_bgcolor"],
+        font=dict(family=theme_config["font_family"], color=theme_config["font_color"]),
+        xaxis=axis,
+        yaxis=axis
+    )
+    return template
+
+# Registered once at import; apply_custom_theme refers to them by name
+THEME_TEMPLATES = {}
+for _name, _config in THEMES.items():
+    THEME_TEMPLATES[_name] = f"retailworks_{_name}"
+    pio.templates[THEME_TEMPLATES[_name]] = _build_template(_config)
+
+# Builders only set transparent backgrounds; fonts and grids keep plotly's defaults until a theme is applied
+BASE_TEMPLATE = "retailworks_base"
+pio.templates[BASE_TEMPLATE] = go.layout.Template(pio.templates["plotly"])
+pio.templates[BASE_TEMPLATE].layout.update(plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+
+_figure_cache = OrderedDict()
+_figure_cache_lock = threading.Lock()
+
+def _cache_token(value):
+    """Hashable stand-in for a builder argument; data is reduced to a digest of its contents"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest = hashlib.sha1(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        columns = tuple(map(str, value.columns)) if isinstance(value, pd.DataFrame) else value.name
+        return (type(value).__name__, columns, str(getattr(value, 'dtypes', '')), digest.hexdigest())
+    if isinstance(value, np.ndarray):
+        return ('ndarray', value.dtype.str, value.shape, hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest())
+    if isinstance(value, (list, tuple)):
+        return tuple(_cache_token(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _cache_token(v)) for k, v in value.items()))
+    return value
+
+def cached_figure(chart_type):
+    """
+    Cache a chart builder's figure spec by chart type, data hash, arguments and theme
+
+    The decorated builder gains a theme argument. Each call returns a new figure built from the
+    cached spec, so callers may modify it without affecting later reruns. Arguments that cannot be
+    hashed, such as frames with list or dict cells, are built without caching.
+    """
+    def decorator(builder):
+        def build(args, theme, kwargs):
+            fig = builder(*args, **kwargs)
+            if theme is not None:
+                apply_custom_theme(fig, theme)
+            return fig
+
+        @wraps(builder)
+        def wrapper(*args, theme=None, **kwargs):
+            try:
+                key = (chart_type, theme, _cache_token(args), _cache_token(kwargs))
+                hash(key)
+            except TypeError:
+                return build(args, theme, kwargs)
+
+            with _figure_cache_lock:
+                spec = _figure_cache.get(key)
+                if spec is not None:
+                    _figure_cache.move_to_end(key)
+
+            if spec is None:
+                fig = build(args, theme, kwargs)
+                # to_dict() base64-encodes arrays on newer plotly, so keep the traces' own values
+                spec = {
+                    'data': [trace.to_plotly_json() for trace in fig.data],
+                    'layout': fig.layout.to_plotly_json()
+                }
+                with _figure_cache_lock:
+                    _figure_cache[key] = spec
+                    while len(_figure_cache) > FIGURE_CACHE_SIZE:
+                        _figure_cache.popitem(last=False)
+
+            # The spec came from a validated figure, so skip plotly's per-property validation; the
+            # constructor copies the spec, so callers never share it
+            return go.Figure(spec, _validate=False)
+        return wrapper
+    return decorator
+
+def clear_figure_cache():
+    """Drop every cached figure spec"""
+    with _figure_cache_lock:
+        _figure_cache.clear()
+
+def _as_float(values):
+    """Numeric view of an axis column; datetimes become nanoseconds since the epoch"""
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype='datetime64[ns]').view('int64').astype(float)
+    if values.dtype == object:
+        # Snowflake DATE columns arrive as datetime.date objects
+        return pd.to_datetime(values).to_numpy(dtype='datetime64[ns]').view('int64').astype(float)
+    return values.to_numpy(dtype=float)
+
+def lttb_indices(x, y, n_out):
+    """Row positions kept by largest-triangle-three-buckets (LTTB) downsampling"""
+    # Each bucket keeps the point forming the largest triangle with the previously kept point and
+    # the next bucket's mean, so peaks and troughs survive where striding would drop them
+    x = _as_float(x)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket boundaries over the interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    # Means of every bucket at once; the last bucket's successor is the final point
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    kept = np.empty(n_out, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle areas for every candidate in the bucket
+        areas = np.abs(
+            (x[a] - mean_x[i + 1]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y[i + 1] - y[a])
+        )
+        a = lo + int(np.argmax(areas))
+        kept[i + 1] = a
+
+    return kept
+
+def downsample_lttb(df, x_col, y_cols, max_points=DEFAULT_POINT_BUDGET):
+    """Rows of df to plot when it has more than max_points rows; the caller's frame is left intact"""
+    # Each line keeps its own LTTB points from an equal share of the budget
+    if isinstance(y_cols, str):
+        y_cols = [y_cols]
+    if max_points is None or len(df) <= max_points:
+        return df
+
+    df = df.sort_values(x_col)
+    per_line = max(3, max_points // len(y_cols))
+    kept = np.unique(np.concatenate([lttb_indices(df[x_col], df[y_col], per_line) for y_col in y_cols]))
+    return df.iloc[kept]
+
 def format_currency(value, currency_symbol="$"):
     """Format numeric value as currency"""
     if pd.isna(value) or value is None:
@@ -47,6 +235,76 @@ def format_percentage(value, decimal_places=1):
         return "0.0%"
     return f"{value:.{decimal_places}f}%"
 
+@lru_cache(maxsize=None)
+def _fixed_point_table(decimals, limit=1000):
+    """Strings of 0 to limit in steps of 10**-decimals, indexed by the value times 10**decimals"""
+    step = 10 ** decimals
+    if decimals == 0:
+        return np.array([str(i) for i in range(limit + 1)])
+    return np.array([f"{i // step}.{i % step:0{decimals}d}" for i in range(limit * step + 1)])
+
+def _fixed_point_strings(magnitudes, decimals, limit=1000):
+    """Unsigned fixed-point strings of non-negative values, and the entries to format exactly"""
+    scaled = magnitudes * 10 ** decimals
+    table = _fixed_point_table(decimals, limit)
+    # Values past the table, infinities and NaNs go through the scalar path
+    in_table = np.isfinite(scaled) & (scaled < len(table) - 0.5)
+    rounded = np.rint(np.where(in_table, scaled, 0)).astype(np.intp)
+    text = table[rounded]
+    if decimals == 0:
+        return text, ~in_table
+    
+    # Scaling can round differently from Python's formatting when a value sits on a half
+    with np.errstate(invalid='ignore'):
+        near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    return text, ~in_table | near_half
+
+def _finish_formatting(values, numbers, text, inexact, scalar_format):
+    """Patch entries the vectorized path cannot match with the scalar formatter"""
+    text = text.astype(object)
+    if inexact.any():
+        text[inexact] = [scalar_format(value) for value in numbers[inexact]]
+    return pd.Series(text, index=values.index) if isinstance(values, pd.Series) else text
+
+def _format_suffixed(values, prefix, scalar_format):
+    """Vectorized body of format_currency and format_number"""
+    numbers = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    magnitudes = np.abs(numbers)
+    tiers = [magnitudes >= 1e9, magnitudes >= 1e6, magnitudes >= 1e3]
+    scaled = np.select(tiers, [magnitudes / 1e9, magnitudes / 1e6, magnitudes / 1e3], default=magnitudes)
+    suffix = np.select(tiers, ['B', 'M', 'K'], default='')
+    
+    # Scaled magnitudes stay below 1000 (bar rounding), so their strings come from a lookup table
+    large = magnitudes >= 1e3
+    tenths, tenths_inexact = _fixed_point_strings(np.where(large, scaled, 0), 1)
+    units, units_inexact = _fixed_point_strings(np.where(large, 0, scaled), 0)
+    # Below a thousand only a value rounding up to 1000 picks up a thousands separator
+    body = np.where(large, tenths, np.where(units == '1000', '1,000', units))
+    
+    text = np.char.add(np.char.add(np.where(np.signbit(numbers), prefix + '-', prefix), body), suffix)
+    missing = np.isnan(numbers)
+    text = np.where(missing, prefix + '0', text)
+    inexact = ~missing & np.where(large, tenths_inexact, units_inexact)
+    return _finish_formatting(values, numbers, text, inexact, scalar_format)
+
+def format_currency_series(values, currency_symbol="$"):
+    """Format a Series or array as currency; matches format_currency value for value"""
+    return _format_suffixed(values, currency_symbol, lambda value: format_currency(value, currency_symbol))
+
+def format_number_series(values):
+    """Format a Series or array with suffixes; matches format_number value for value"""
+    return _format_suffixed(values, '', format_number)
+
+def format_percentage_series(values, decimal_places=1):
+    """Format a Series or array as percentages; matches format_percentage value for value"""
+    numbers = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+    digits, inexact = _fixed_point_strings(np.abs(numbers), decimal_places)
+    text = np.char.add(np.char.add(np.where(np.signbit(numbers), '-', ''), digits), '%')
+    missing = np.isnan(numbers)
+    text = np.where(missing, '0.0%', text)
+    return _finish_formatting(values, numbers, text, ~missing & inexact,
+                              lambda value: format_percentage(value, decimal_places))
+
 def create_kpi_card(title, value, delta=None, delta_color="normal"):
     """Create a KPI card with optional delta"""
     return st.metric(
@@ -56,8 +314,10 @@ def create_kpi_card(title, value, delta=None, delta_color="normal"):
         delta_color=delta_color
     )
 
-def create_trend_chart(df, x_col, y_col, title="Trend Chart", color="#1f77b4"):
+@cached_figure("trend")
+def create_trend_chart(df, x_col, y_col, title="Trend Chart", color="#1f77b4", max_points=DEFAULT_POINT_BUDGET):
     """Create a trend line chart"""
+    df = downsample_lttb(df, x_col, y_col, max_points)
     fig = px.line(
         df, 
         x=x_col, 
@@ -70,12 +330,12 @@ def create_trend_chart(df, x_col, y_col, title="Trend Chart", color="#1f77b4"):
     fig.update_layout(
         hovermode='x unified',
         showlegend=False,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
+        template=BASE_TEMPLATE
     )
     
     return fig
 
+@cached_figure("bar")
 def create_bar_chart(df, x_col, y_col, title="Bar Chart", orientation='v', color_col=None):
     """Create a bar chart"""
     if orientation == 'h':
@@ -99,13 +359,13 @@ def create_bar_chart(df, x_col, y_col, title="Bar Chart", orientation='v', color
         )
     
     fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
+        template=BASE_TEMPLATE,
         showlegend=False
     )
     
     return fig
 
+@cached_figure("pie")
 def create_pie_chart(df, values_col, names_col, title="Distribution"):
     """Create a pie chart"""
     fig = px.pie(
@@ -124,6 +384,7 @@ def create_pie_chart(df, values_col, names_col, title="Distribution"):
     
     return fig
 
+@cached_figure("donut")
 def create_donut_chart(df, values_col, names_col, title="Distribution"):
     """Create a donut chart"""
     fig = px.pie(
@@ -143,8 +404,15 @@ def create_donut_chart(df, values_col, names_col, title="Distribution"):
     
     return fig
 
-def create_scatter_plot(df, x_col, y_col, size_col=None, color_col=None, title="Scatter Plot"):
-    """Create a scatter plot"""
+@cached_figure("scatter")
+def create_scatter_plot(df, x_col, y_col, size_col=None, color_col=None, title="Scatter Plot",
+                        hover_name=None, hover_cols=None, labels=None, webgl_threshold=WEBGL_POINT_THRESHOLD):
+    """
+    Create a scatter plot, drawn with WebGL once it has more than webgl_threshold points
+
+    Hover shows the plotted columns plus any whitelisted in hover_cols; every extra column is
+    shipped to the browser once per point.
+    """
     fig = px.scatter(
         df,
         x=x_col,
@@ -152,16 +420,19 @@ def create_scatter_plot(df, x_col, y_col, size_col=None, color_col=None, title="
         size=size_col,
         color=color_col,
         title=title,
-        hover_data=df.columns
+        hover_name=hover_name,
+        hover_data=list(hover_cols) if hover_cols else None,
+        labels=labels,
+        render_mode='webgl' if len(df) > webgl_threshold else 'svg'
     )
     
     fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
+        template=BASE_TEMPLATE
     )
     
     return fig
 
+@cached_figure("heatmap")
 def create_heatmap(df, x_col, y_col, values_col, title="Heatmap"):
     """Create a heatmap"""
     pivot_df = df.pivot(index=y_col, columns=x_col, values=values_col)
@@ -175,6 +446,7 @@ def create_heatmap(df, x_col, y_col, values_col, title="Heatmap"):
     
     return fig
 
+@cached_figure("gauge")
 def create_gauge_chart(value, title="Gauge", max_value=100, threshold_colors=None):
     """Create a gauge chart"""
     if threshold_colors is None:
@@ -203,6 +475,7 @@ def create_gauge_chart(value, title="Gauge", max_value=100, threshold_colors=Non
     
     return fig
 
+@cached_figure("waterfall")
 def create_waterfall_chart(categories, values, title="Waterfall Chart"):
     """Create a waterfall chart"""
     fig = go.Figure(go.Waterfall(
@@ -211,7 +484,7 @@ def create_waterfall_chart(categories, values, title="Waterfall Chart"):
         measure = ["relative"] * (len(categories) - 1) + ["total"],
         x = categories,
         textposition = "outside",
-        text = [format_currency(v) for v in values],
+        text = format_currency_series(values),
         y = values,
         connector = {"line":{"color":"rgb(63, 63, 63)"}},
     ))
@@ -220,6 +493,7 @@ def create_waterfall_chart(categories, values, title="Waterfall Chart"):
     
     return fig
 
+@cached_figure("funnel")
 def create_funnel_chart(df, x_col, y_col, title="Funnel Chart"):
     """Create a funnel chart"""
     fig = go.Figure(go.Funnel(
@@ -232,8 +506,10 @@ def create_funnel_chart(df, x_col, y_col, title="Funnel Chart"):
     
     return fig
 
-def create_multi_line_chart(df, x_col, y_cols, title="Multi-Line Chart"):
+@cached_figure("multi_line")
+def create_multi_line_chart(df, x_col, y_cols, title="Multi-Line Chart", max_points=DEFAULT_POINT_BUDGET):
     """Create a multi-line chart"""
+    df = downsample_lttb(df, x_col, y_cols, max_points)
     fig = go.Figure()
     
     colors = px.colors.qualitative.Set1
@@ -251,14 +527,15 @@ def create_multi_line_chart(df, x_col, y_cols, title="Multi-Line Chart"):
     fig.update_layout(
         title=title,
         hovermode='x unified',
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
+        template=BASE_TEMPLATE
     )
     
     return fig
 
-def create_combo_chart(df, x_col, y1_col, y2_col, title="Combo Chart"):
+@cached_figure("combo")
+def create_combo_chart(df, x_col, y1_col, y2_col, title="Combo Chart", max_points=DEFAULT_POINT_BUDGET):
     """Create a combination chart with dual y-axes"""
+    df = downsample_lttb(df, x_col, [y1_col, y2_col], max_points)
     fig = make_subplots(specs=[[{"secondary_y": True}]])
     
     # Add bar chart
@@ -280,58 +557,35 @@ def create_combo_chart(df, x_col, y1_col, y2_col, title="Combo Chart"):
     
     return fig
 
+@cached_figure("box")
 def create_box_plot(df, x_col, y_col, title="Box Plot"):
     """Create a box plot"""
     fig = px.box(df, x=x_col, y=y_col, title=title)
     
     fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
+        template=BASE_TEMPLATE
     )
     
     return fig
 
+@cached_figure("violin")
 def create_violin_plot(df, x_col, y_col, title="Violin Plot"):
     """Create a violin plot"""
     fig = px.violin(df, x=x_col, y=y_col, title=title, box=True)
     
     fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)'
+        template=BASE_TEMPLATE
     )
     
     return fig
 
 def apply_custom_theme(fig, theme="default"):
     """Apply custom theme to plotly figure"""
-    themes = {
-        "default": {
-            "plot_bgcolor": "rgba(0,0,0,0)",
-            "paper_bgcolor": "rgba(0,0,0,0)",
-            "font_family": "Arial, sans-serif",
-            "font_color": "#2E2E2E",
-            "gridcolor": "#E5E5E5"
-        },
-        "dark": {
-            "plot_bgcolor": "#2E2E2E",
-            "paper_bgcolor": "#1E1E1E",
-            "font_family": "Arial, sans-serif",
-            "font_color": "#FFFFFF",
-            "gridcolor": "#404040"
-        },
-        "minimal": {
-            "plot_bgcolor": "rgba(0,0,0,0)",
-            "paper_bgcolor": "rgba(0,0,0,0)",
-            "font_family": "Helvetica, sans-serif",
-            "font_color": "#333333",
-            "gridcolor": "#F0F0F0",
-            "showgrid": False
-        }
-    }
-    
-    if theme in themes:
-        theme_config = themes[theme]
+    if theme in THEMES:
+        theme_config = THEMES[theme]
+        # Explicit values still override layouts set directly on the figure
         fig.update_layout(
+            template=THEME_TEMPLATES[theme],
             plot_bgcolor=theme_config["plot_bgcolor"],
             paper_bgcolor=theme_config["paper_bgcolor"],
             font_family=theme_config["font_family"],
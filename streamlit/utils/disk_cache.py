@@ -0,0 +1,122 @@
+"""
+Disk Cache Utility
+Description: Size-bounded Parquet result cache shared across Streamlit workers over a mounted volume
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class DiskCache:
+    """
+    Query results stored as one Parquet file per cache key
+
+    Files are written to a temporary name and renamed into place, so concurrent readers in other
+    processes or replicas only ever see complete files. Expiry is stored in the file's metadata as a
+    wall-clock time because monotonic clocks are not comparable across processes.
+    """
+
+    EXPIRES_KEY = b'retailworks.expires_at'
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 * 1024 * 1024, default_ttl: int = 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._evict_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        """File holding one cache key"""
+        return os.path.join(self.directory, f'{key}.parquet')
+
+    def get(self, key: str) -> Optional[Tuple[pd.DataFrame, float]]:
+        """
+        Cached result and its remaining lifetime in seconds, or None when missing or expired
+        """
+        path = self._path(key)
+        try:
+            metadata = pq.read_schema(path).metadata or {}
+            remaining = float(metadata.get(self.EXPIRES_KEY, 0)) - time.time()
+            if remaining <= 0:
+                # Leave the file to eviction: another replica may have just replaced it with a fresh
+                # result, and it stops being touched by reads so it ages out by modification time
+                return None
+
+            df = pq.read_table(path).to_pandas()
+            # Reads refresh the modification time, which eviction uses as last access
+            os.utime(path)
+            return df, remaining
+
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Treat unreadable files as misses; another replica may have just evicted them
+            logger.warning(f"Ignoring unreadable disk cache entry {key[:12]}: {str(e)}")
+            return None
+
+    def put(self, key: str, df: pd.DataFrame, ttl: Optional[int] = None) -> None:
+        """Write a result atomically, then evict least recently used files over max_bytes"""
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        tmp_path = os.path.join(self.directory, f'.{key}.{uuid.uuid4().hex}.tmp')
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                self.EXPIRES_KEY: str(expires_at).encode()
+            })
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, self._path(key))
+        except Exception as e:
+            logger.warning(f"Failed to write disk cache entry {key[:12]}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used files until the cache fits in max_bytes"""
+        with self._evict_lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.parquet'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+
+            total = sum(size for _, size, _ in files)
+            removed = 0
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+            if removed:
+                logger.info(f"Evicted {removed} disk cache entries")
+            return removed
+
+    def clear(self) -> None:
+        """Delete every cached file"""
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.parquet'):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
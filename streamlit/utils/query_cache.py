@@ -0,0 +1,373 @@
+"""
+Query Cache Utility
+Description: Parameterized dashboard queries returning DataFrames with a memory-bounded result cache
+Version: 1.0
+Date: 2026-10-18
+"""
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from disk_cache import DiskCache
+from snowflake_connection import SnowflakeConnectionPool, get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+# Single-quoted SQL string literals, including '' escapes
+_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+# Literals and comments matched in one left-to-right pass, so quotes inside comments and comment
+# markers inside literals are both read correctly
+_LITERAL_OR_COMMENT = re.compile(r"('(?:[^']|'')*')|--[^\n]*|/\*.*?\*/", re.S)
+
+def normalize_sql(sql: str) -> str:
+    """
+    Drop comments and collapse whitespace outside string literals so formatting differences share a cache entry
+    """
+    sql = _LITERAL_OR_COMMENT.sub(lambda match: match.group(1) or ' ', sql)
+    parts = _STRING_LITERAL.split(sql.strip().rstrip(';'))
+    return ''.join(part if i % 2 else re.sub(r'\s+', ' ', part) for i, part in enumerate(parts)).strip()
+
+def cache_key(sql: str, params: Optional[Dict] = None, version: str = '') -> str:
+    """
+    Cache key of a query: hash of its normalized SQL, bound parameters and the data version
+    """
+    payload = '\x00'.join([version, normalize_sql(sql), json.dumps(params or {}, sort_keys=True, default=str)])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of query results bounded by the total memory of the cached DataFrames
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, default_ttl: int = 600):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _drop(self, key: str) -> None:
+        """Remove one entry; caller holds the lock"""
+        _, _, nbytes = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Cached result for a key, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, df: pd.DataFrame, ttl: Optional[int] = None) -> None:
+        """Store a result, evicting least recently used entries to stay within max_bytes"""
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (df, expires_at, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Entry count, memory use and hit rate"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+class QueryLayer:
+    """
+    Run parameterized queries over the connection pool and cache the resulting DataFrames
+    """
+
+    def __init__(self, pool: SnowflakeConnectionPool, cache: Optional[QueryCache] = None,
+                 disk_cache: Optional[DiskCache] = None, recent_days: int = 2, recent_ttl: int = 300,
+                 daily_max_bytes: int = 64 * 1024 * 1024, cache_version: str = ''):
+        self.pool = pool
+        self.cache = cache or QueryCache()
+        self.disk_cache = disk_cache
+        self.recent_days = recent_days
+        self.recent_ttl = recent_ttl
+        self.daily_max_bytes = daily_max_bytes
+        # Part of every key; bumping it after an ETL load makes all replicas miss the disk tier
+        self.cache_version = cache_version
+        # Daily-grain results per query, least recently used first:
+        # {key: {'rows': DataFrame, 'expires': {day: expires_at}, 'bytes': int}}
+        self._daily = OrderedDict()
+        self._daily_lock = threading.Lock()
+        # Results being fetched, so concurrent misses on one key wait for a single query
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+
+    def execute(self, sql: str, params: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        Run a query with %(name)s parameters bound by the connector, bypassing the cache
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                df = cursor.fetch_pandas_all()
+            finally:
+                cursor.close()
+
+        # Unquoted Snowflake identifiers come back upper case
+        return df.rename(columns=str.lower)
+
+    def query(self, sql: str, params: Optional[Dict] = None, ttl: Optional[int] = None) -> pd.DataFrame:
+        """
+        Cached DataFrame of a query's results
+
+        Args:
+            sql (str): SQL with %(name)s placeholders
+            params (dict): Values bound to the placeholders
+            ttl (int): Seconds to keep the result, defaults to the cache's default_ttl
+
+        Returns:
+            A copy of the result that callers may modify freely
+        """
+        key = cache_key(sql, params, self.cache_version)
+        with self._inflight_lock:
+            df = self.cache.get(key)
+            if df is None:
+                future = self._inflight.get(key)
+                leader = future is None
+                if leader:
+                    future = self._inflight[key] = Future()
+
+        if df is None and not leader:
+            # Another session is already fetching this result; share it instead of querying again
+            df = future.result()
+        elif df is None:
+            try:
+                df = self._fetch(key, sql, params, ttl)
+                future.set_result(df)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with self._inflight_lock:
+                    del self._inflight[key]
+
+        return df.copy()
+
+    def _fetch(self, key: str, sql: str, params: Optional[Dict], ttl: Optional[int]) -> pd.DataFrame:
+        """Result of a memory cache miss, from the disk tier or the warehouse"""
+        if self.disk_cache is not None:
+            # Another worker or an earlier process may already have run the query
+            cached = self.disk_cache.get(key)
+            if cached is not None:
+                df, remaining = cached
+                self.cache.put(key, df, remaining)
+                return df
+
+        start = time.perf_counter()
+        df = self.execute(sql, params)
+        self.cache.put(key, df, ttl)
+        if self.disk_cache is not None:
+            self.disk_cache.put(key, df, self.cache.default_ttl if ttl is None else ttl)
+        logger.info(f"Query {key[:12]} returned {len(df)} rows in {time.perf_counter() - start:.2f}s")
+        return df
+
+    def clear(self) -> None:
+        """
+        Drop this process's cached results, including cached days
+
+        The disk tier is shared by every replica, so it is left to expire by TTL or to be bypassed by
+        a new cache_version rather than being deleted by one user's refresh.
+        """
+        self.cache.clear()
+        with self._daily_lock:
+            self._daily.clear()
+
+    def _evict_daily(self) -> None:
+        """Drop least recently used daily results beyond daily_max_bytes; caller holds the lock"""
+        total = sum(entry['bytes'] for entry in self._daily.values())
+        # The most recent entry is always kept, even when it alone exceeds the budget
+        while total > self.daily_max_bytes and len(self._daily) > 1:
+            _, evicted = self._daily.popitem(last=False)
+            total -= evicted['bytes']
+
+    @staticmethod
+    def _day_key(key: str, day: date) -> str:
+        """Disk cache key of one day of a daily-grain query"""
+        return hashlib.sha256(f'{key}:{day.isoformat()}'.encode('utf-8')).hexdigest()
+
+    def _missing_runs(self, expires: Dict, start_date: date, end_date: date) -> List[Tuple[date, date]]:
+        """Contiguous runs of days in the range that are not cached or have expired"""
+        now = time.monotonic()
+        runs = []
+        day = start_date
+        while day <= end_date:
+            if expires.get(day, 0) < now:
+                if runs and runs[-1][1] == day - timedelta(days=1):
+                    runs[-1] = (runs[-1][0], day)
+                else:
+                    runs.append((day, day))
+            day += timedelta(days=1)
+        return runs
+
+    def query_daily(self, sql: str, start_date: date, end_date: date, date_column: str,
+                    params: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        Cached results of a daily-grain query, fetching only the days not already cached
+
+        Days are held in memory and, when there is a disk tier, written to it one file per day under
+        the same cache_version, so other replicas and restarted workers reuse them too.
+
+        Args:
+            sql (str): SQL bounded by %(start_date)s and %(end_date)s that returns one group per day
+            start_date (date): First day of the range
+            end_date (date): Last day of the range
+            date_column (str): Lower-case name of the result's day column
+            params (dict): Any other bound parameters
+
+        Returns:
+            Rows for the range, stitched from cached days and newly fetched ones
+        """
+        key = cache_key(sql, params, self.cache_version)
+        with self._daily_lock:
+            entry = self._daily.setdefault(key, {'rows': pd.DataFrame(), 'expires': {}, 'bytes': 0})
+            self._daily.move_to_end(key)
+            runs = self._missing_runs(entry['expires'], start_date, end_date)
+
+        # Closed days are final; the last few may still receive late-arriving sales
+        recent_from = date.today() - timedelta(days=self.recent_days - 1)
+        # (first day, last day, rows, {day: expires_at}) for every day not held in memory
+        fetched = []
+        if self.disk_cache is not None and runs:
+            # Other workers, replicas or the warming job may already hold some of the days on disk
+            on_disk = {}
+            for run_start, run_end in runs:
+                day = run_start
+                while day <= run_end:
+                    cached = self.disk_cache.get(self._day_key(key, day))
+                    if cached is not None:
+                        df, remaining = cached
+                        on_disk[day] = float('inf')
+                        fetched.append((day, day, df, {day: time.monotonic() + remaining}))
+                    day += timedelta(days=1)
+            runs = [missing for run_start, run_end in runs
+                    for missing in self._missing_runs(on_disk, run_start, run_end)]
+
+        for run_start, run_end in runs:
+            df = self.execute(sql, {**(params or {}), 'start_date': run_start, 'end_date': run_end})
+            df[date_column] = pd.to_datetime(df[date_column])
+            expires_at = time.monotonic() + self.recent_ttl
+            expires = {}
+            day = run_start
+            while day <= run_end:
+                recent = day >= recent_from
+                expires[day] = expires_at if recent else float('inf')
+                if self.disk_cache is not None:
+                    # One file per day, so later ranges can reuse any subset of the days
+                    self.disk_cache.put(self._day_key(key, day), df[df[date_column].dt.date == day],
+                                        self.recent_ttl if recent else None)
+                day += timedelta(days=1)
+            fetched.append((run_start, run_end, df, expires))
+
+        with self._daily_lock:
+            if fetched:
+                rows = entry['rows']
+                for run_start, run_end, df, expires in fetched:
+                    if not rows.empty:
+                        days = rows[date_column].dt.date
+                        rows = rows[(days < run_start) | (days > run_end)]
+                    rows = pd.concat([rows, df], ignore_index=True) if not rows.empty else df
+                    entry['expires'].update(expires)
+                entry['rows'] = rows.sort_values(date_column, ignore_index=True)
+                entry['bytes'] = int(entry['rows'].memory_usage(index=True, deep=True).sum())
+                logger.info(f"Query {key[:12]} loaded {len(fetched) - len(runs)} days from disk, "
+                            f"{len(runs)} day ranges from the warehouse")
+                # Re-insert in case another thread evicted the entry while the days were fetched
+                self._daily[key] = entry
+                self._daily.move_to_end(key)
+                self._evict_daily()
+
+            rows = entry['rows']
+            if rows.empty:
+                return rows.copy()
+            in_range = rows[date_column].between(pd.Timestamp(start_date), pd.Timestamp(end_date))
+            return rows[in_range].reset_index(drop=True)
+
+@st.cache_resource
+def get_query_layer() -> QueryLayer:
+    """
+    Query layer shared across all sessions in the Streamlit server process
+    """
+    cache = QueryCache(
+        max_bytes=int(os.getenv('DASHBOARD_CACHE_MAX_MB', '256')) * 1024 * 1024,
+        default_ttl=int(os.getenv('DASHBOARD_CACHE_TTL', '600'))
+    )
+    # Point DASHBOARD_CACHE_DIR at a volume mounted on every replica to share results between them
+    cache_dir = os.getenv('DASHBOARD_CACHE_DIR')
+    disk_cache = DiskCache(
+        cache_dir, max_bytes=int(os.getenv('DASHBOARD_DISK_CACHE_MAX_MB', '2048')) * 1024 * 1024
+    ) if cache_dir else None
+    # Set DASHBOARD_CACHE_VERSION from the ETL run (e.g. its load timestamp) to invalidate shared results
+    return QueryLayer(get_connection_pool(), cache, disk_cache,
+                      cache_version=os.getenv('DASHBOARD_CACHE_VERSION', ''))
+
+def load_concurrently(loaders: Dict[str, Callable], max_workers: Optional[int] = None) -> Dict:
+    """
+    Run independent data loaders in parallel and gather their results before rendering
+
+    Args:
+        loaders (dict): Zero-argument callables keyed by name
+        max_workers (int): Thread count, defaults to one per loader up to the connection pool size
+
+    Returns:
+        Dict of each loader's result under its name
+    """
+    if not loaders:
+        return {}
+
+    # Loaders report errors with st.error, which needs the session's script context in the worker thread
+    ctx = get_script_run_ctx()
+
+    def run(loader: Callable):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return loader()
+
+    workers = max_workers or min(len(loaders), get_connection_pool().max_size)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {name: executor.submit(run, loader) for name, loader in loaders.items()}
+        return {name: future.result() for name, future in futures.items()}
@@ -8,14 +8,17 @@ Date: 2025-07-19
 import snowflake.connector
 import streamlit as st
 import os
-from typing import Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_snowflake_connection():
+def get_snowflake_connection(**connect_options):
     """
     Create and return a Snowflake connection using Streamlit secrets or environment variables
     """
@@ -44,7 +47,7 @@ def get_snowflake_connection():
             }
         
         # Create connection
-        conn = snowflake.connector.connect(**connection_params)
+        conn = snowflake.connector.connect(**connection_params, **connect_options)
         
         logger.info("Successfully connected to Snowflake")
         return conn
@@ -100,6 +103,128 @@ def init_connection():
     """
     return get_snowflake_connection()
 
+class SnowflakeConnectionPool:
+    """
+    Thread-safe pool of Snowflake connections shared by all sessions of the Streamlit server
+    """
+    
+    def __init__(self, max_size: int = 8, health_check_interval: int = 60, acquire_timeout: int = 30,
+                 connect=get_snowflake_connection):
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._connect = connect
+        self._idle: List[Tuple[object, float]] = []
+        self._in_use = 0
+        self._condition = threading.Condition()
+    
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        """Check a connection before handing it out; recently used ones skip the round trip"""
+        if conn.is_closed():
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding unhealthy Snowflake connection: {str(e)}")
+            return False
+    
+    def _discard(self, conn) -> None:
+        """Close a connection that is leaving the pool"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def acquire(self):
+        """
+        Borrow a connection, reusing an idle one when possible
+        
+        Blocks while max_size connections are in use and raises TimeoutError after acquire_timeout seconds
+        """
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._condition:
+                while True:
+                    if self._idle:
+                        # Most recently returned first: its session is the least likely to have expired
+                        conn, idle_since = self._idle.pop()
+                        break
+                    
+                    if self._in_use < self.max_size:
+                        conn = None
+                        break
+                    
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No Snowflake connection available within {self.acquire_timeout}s")
+                    self._condition.wait(remaining)
+                
+                # The slot is held while the connection is checked or opened outside the lock
+                self._in_use += 1
+            
+            try:
+                if conn is None:
+                    return self._connect(client_session_keep_alive=True)
+                if self._is_healthy(conn, idle_since):
+                    return conn
+                self._discard(conn)
+            except Exception:
+                self._free_slot()
+                raise
+            
+            # Unhealthy connection discarded: give its slot back and try again
+            self._free_slot()
+    
+    def _free_slot(self) -> None:
+        """Give back a slot taken by acquire without a connection to show for it"""
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+    
+    def release(self, conn, discard: bool = False) -> None:
+        """Return a borrowed connection to the pool"""
+        with self._condition:
+            self._in_use -= 1
+            if discard or conn.is_closed():
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+    
+    @contextmanager
+    def connection(self) -> Iterator:
+        """Borrow a connection for the duration of a with block"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except snowflake.connector.errors.OperationalError:
+            # Network or session failures leave the connection unusable
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+    
+    def close_all(self) -> None:
+        """Close every idle connection"""
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+@st.cache_resource
+def get_connection_pool() -> SnowflakeConnectionPool:
+    """
+    Connection pool shared across all sessions in the Streamlit server process
+    """
+    return SnowflakeConnectionPool(max_size=int(os.getenv('SNOWFLAKE_POOL_SIZE', '8')))
+
 @st.cache_data(ttl=600)  # Cache for 10 minutes
 def run_query(query: str, _conn=None) -> Optional[list]:
     """
@@ -114,7 +239,12 @@ def run_query(query: str, _conn=None) -> Optional[list]:
     """
     try:
         if _conn is None:
-            _conn = init_connection()
+            with get_connection_pool().connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query)
+                results = cursor.fetchall()
+                cursor.close()
+            return results
         
         cursor = _conn.cursor()
         cursor.execute(query)